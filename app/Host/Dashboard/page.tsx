@@ -72,15 +72,15 @@ const HostDashboard = () => {
       const statsData = await statsRes.json();
       setStats(statsData);
 
-      const reservationsRes = await fetch(`${API_HOST}/api/booking/reservations/`, { headers, credentials: 'include' });
+      const reservationsRes = await fetch(`${API_HOST}/api/booking/reservations/?page_size=5`, { headers, credentials: 'include' });
       if (!reservationsRes.ok) throw new Error('Failed to fetch reservations');
       const reservationsData = await reservationsRes.json();
-      setRecentReservations(Array.isArray(reservationsData) ? reservationsData.slice(0, 5) : []);
+      setRecentReservations((reservationsData.results || []).slice(0, 5));
 
       const pendingRes = await fetch(`${API_HOST}/api/booking/reservations/?status=pending`, { headers, credentials: 'include' });
       if (!pendingRes.ok) throw new Error('Failed to fetch pending reservations');
       const pendingData = await pendingRes.json();
-      setPendingRequests(Array.isArray(pendingData) ? pendingData : []);
+      setPendingRequests(pendingData.results || []);
 
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch dashboard data');
@@ -174,6 +174,7 @@ const SearchPage = () => {
                 <option value="price_asc">💰 Price: Low to High</option>
                 <option value="price_desc">💎 Price: High to Low</option>
                 <option value="rating_desc">⭐ Highest Rated</option>
+                <option value="sustainability">🌱 Most Sustainable</option>
                 <option value="popular">🔥 Most Popular</option>
               </select>
 
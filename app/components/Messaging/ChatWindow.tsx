@@ -108,6 +108,21 @@ export default function ChatWindow({ conversation, onClose, onMessageSent }: Cha
           console.warn('Messages not in expected format:', data);
           setMessages([]);
         }
+
+        // Viewing the conversation no longer marks it read; move the read cursor explicitly
+        if (data.unread_count > 0 && data.messages?.length) {
+          await fetch(
+            `${process.env.NEXT_PUBLIC_API_HOST}/api/messaging/conversations/${conversation.id}/mark-all-read/`,
+            {
+              method: 'POST',
+              headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+              },
+              body: JSON.stringify({ up_to: data.messages[data.messages.length - 1].id }),
+            }
+          );
+        }
       } else {
         const errorData = await response.json().catch(() => ({}));
         console.error('Error fetching messages:', response.status, errorData);
@@ -109,6 +109,21 @@ export default function GuestChatWindow({ conversation, onClose, onMessageSent }
         } else {
           setMessages([]);
         }
+
+        // Viewing the conversation no longer marks it read; move the read cursor explicitly
+        if (data.unread_count > 0 && data.messages?.length) {
+          await fetch(
+            `${apiHost}/api/messaging/conversations/${conversation.id}/mark-all-read/`,
+            {
+              method: 'POST',
+              headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+              },
+              body: JSON.stringify({ up_to: data.messages[data.messages.length - 1].id }),
+            }
+          );
+        }
       }
     } catch (error) {
       console.error('[GUEST CHAT] Error fetching messages:', error);
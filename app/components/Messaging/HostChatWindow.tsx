@@ -110,6 +110,21 @@ export default function HostChatWindow({ conversation, onClose, onMessageSent, q
         } else {
           setMessages([]);
         }
+
+        // Viewing the conversation no longer marks it read; move the read cursor explicitly
+        if (data.unread_count > 0 && data.messages?.length) {
+          await fetch(
+            `${apiHost}/api/messaging/conversations/${conversation.id}/mark-all-read/`,
+            {
+              method: 'POST',
+              headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json',
+              },
+              body: JSON.stringify({ up_to: data.messages[data.messages.length - 1].id }),
+            }
+          );
+        }
       }
     } catch (error) {
       console.error('[HOST CHAT] Error fetching messages:', error);
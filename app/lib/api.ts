@@ -59,6 +59,17 @@ export const hostAPI = {
     return response.json();
   },
 
+  bulkUpdateReservationStatus: async (reservationIds: string[], action: 'approve' | 'decline' | 'cancel') => {
+    const headers = await getAuthHeaders();
+    const response = await fetch(`${API_BASE_URL}/booking/reservations/bulk-status/`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({ reservation_ids: reservationIds, action }),
+    });
+    if (!response.ok) throw new Error('Failed to update reservation statuses');
+    return response.json();
+  },
+
   // Earnings
   getEarnings: async (startDate?: string, endDate?: string) => {
     const headers = await getAuthHeaders();
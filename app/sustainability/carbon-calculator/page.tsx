@@ -31,6 +31,7 @@ export default function CarbonCalculatorPage() {
   const [distanceKm, setDistanceKm] = useState('');
   const [stayDuration, setStayDuration] = useState('');
   const [numberOfGuests, setNumberOfGuests] = useState('1');
+  const [saveToHistory, setSaveToHistory] = useState(false);
   
   // Result state
   const [result, setResult] = useState<CalculationResult | null>(null);
@@ -74,6 +75,7 @@ export default function CarbonCalculatorPage() {
             distance_km: parseFloat(distanceKm),
             stay_duration_days: parseInt(stayDuration),
             number_of_guests: parseInt(numberOfGuests),
+            save_to_history: !!isSignedIn && saveToHistory,
           }),
         }
       );
@@ -99,6 +101,7 @@ export default function CarbonCalculatorPage() {
     setStayDuration('');
     setNumberOfGuests('1');
     setTransportType('car');
+    setSaveToHistory(false);
     setResult(null);
   };
 
@@ -202,6 +205,22 @@ export default function CarbonCalculatorPage() {
                 />
               </div>
 
+              {/* Save to History (signed-in users only; off unless chosen) */}
+              {isSignedIn && (
+                <div className="flex items-center space-x-2">
+                  <input
+                    type="checkbox"
+                    id="saveToHistory"
+                    checked={saveToHistory}
+                    onChange={(e) => setSaveToHistory(e.target.checked)}
+                    className="h-4 w-4 text-blue-600 focus:ring-blue-500 border-gray-300 rounded"
+                  />
+                  <label htmlFor="saveToHistory" className="text-sm text-gray-700">
+                    Save to history
+                  </label>
+                </div>
+              )}
+
               {/* Submit Button */}
               <button
                 type="submit"
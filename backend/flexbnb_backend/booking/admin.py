@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import (
     Reservation, 
     HostEarnings, 
+    HostEarningsRollup,
     HostMessage, 
     PropertyAnalytics, 
     PropertyReview
@@ -26,6 +27,15 @@ class HostEarningsAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
 
 
+@admin.register(HostEarningsRollup)
+class HostEarningsRollupAdmin(admin.ModelAdmin):
+    list_display = ['host', 'property', 'granularity', 'period_start', 'gross_earnings', 'net_earnings', 'bookings_count']
+    list_filter = ['granularity', 'period_start']
+    search_fields = ['host__email', 'property__title']
+    readonly_fields = ['updated_at']
+    ordering = ['-period_start']
+
+
 @admin.register(HostMessage)
 class HostMessageAdmin(admin.ModelAdmin):
     list_display = ['id', 'sender', 'receiver', 'reservation', 'is_read', 'created_at']
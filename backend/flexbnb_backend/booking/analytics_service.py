@@ -0,0 +1,211 @@
+"""
+Property Analytics Service - incremental counters and occupancy for PropertyAnalytics
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+from property.models import Property
+from .models import HostEarnings, PropertyAnalytics, PropertyReview, Reservation
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PropertyAnalyticsService:
+    """
+    Maintains PropertyAnalytics from view, reservation and earnings events.
+    
+    Each page view is one atomic F('views_count') + 1 update, so no count is
+    held in process memory. Reservation and earnings events are applied as
+    soon as the surrounding transaction commits.
+    """
+    
+    BOOKED_STATUSES = ('approved', 'completed')
+    
+    @classmethod
+    def record_view(cls, property_id):
+        """Count a property page view"""
+        updated = PropertyAnalytics.objects.filter(property_id=property_id).update(
+            views_count=F('views_count') + 1, last_updated=timezone.now()
+        )
+        if not updated:
+            cls.apply_deltas({property_id: {'views_count': 1}})
+    
+    @classmethod
+    def record_booking_requests(cls, reservations):
+        """A guest requested these reservations"""
+        deltas = defaultdict(Counter)
+        for reservation in reservations:
+            deltas[reservation.property_id]['booking_requests'] += 1
+        transaction.on_commit(lambda: cls.apply_deltas(deltas))
+    
+    @classmethod
+    def record_bookings_confirmed(cls, reservations, earnings_list=()):
+        """
+        The host approved these reservations, creating `earnings_list`.
+        Bumps successful_bookings and total_earnings and refreshes occupancy.
+        """
+        cls._record_booking_outcome(reservations, earnings_list, sign=1)
+    
+    @classmethod
+    def record_bookings_cancelled(cls, reservations, earnings_list=()):
+        """Previously approved reservations were cancelled; reverses record_bookings_confirmed"""
+        cls._record_booking_outcome(reservations, earnings_list, sign=-1)
+    
+    @classmethod
+    def _record_booking_outcome(cls, reservations, earnings_list, sign):
+        deltas = defaultdict(Counter)
+        for reservation in reservations:
+            deltas[reservation.property_id]['successful_bookings'] += sign
+        for earnings in earnings_list:
+            deltas[earnings.reservation.property_id]['total_earnings'] += Decimal(earnings.net_earnings) * sign
+        
+        def apply():
+            cls.apply_deltas(deltas)
+            cls.refresh_occupancy(deltas.keys())
+        transaction.on_commit(apply)
+    
+    @classmethod
+    def ensure_rows(cls, property_ids):
+        """
+        Create missing analytics rows for the given properties in one insert.
+        Rows created concurrently by another request are skipped by the
+        unique constraint on property.
+        """
+        property_ids = set(property_ids)
+        existing = set(
+            PropertyAnalytics.objects.filter(property_id__in=property_ids)
+            .values_list('property_id', flat=True)
+        )
+        PropertyAnalytics.objects.bulk_create([
+            PropertyAnalytics(property_id=property_id) for property_id in property_ids - existing
+        ], ignore_conflicts=True)
+    
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Apply {property_id: {field: delta}} with one F() update per property"""
+        if not deltas:
+            return
+        cls.ensure_rows(deltas.keys())
+        now = timezone.now()
+        for property_id, fields in deltas.items():
+            updates = {field: F(field) + amount for field, amount in fields.items() if amount}
+            if updates:
+                PropertyAnalytics.objects.filter(property_id=property_id).update(last_updated=now, **updates)
+    
+    @staticmethod
+    def current_period(today=None):
+        """The calendar month containing `today`, as a half-open [start, end) date range"""
+        today = today or timezone.localdate()
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+    
+    @classmethod
+    def occupancy_rates(cls, property_ids, period_start, period_end):
+        """
+        Occupancy percentage per property over [period_start, period_end),
+        from the nights of booked reservations that fall inside the period.
+        """
+        days = (period_end - period_start).days
+        booked_nights = Counter()
+        reservations = Reservation.objects.filter(
+            property_id__in=property_ids,
+            status__in=cls.BOOKED_STATUSES,
+            check_in_date__lt=period_end,
+            check_out_date__gt=period_start,
+        ).values_list('property_id', 'check_in_date', 'check_out_date')
+        for property_id, check_in, check_out in reservations.iterator():
+            booked_nights[property_id] += (min(check_out, period_end) - max(check_in, period_start)).days
+        
+        return {
+            property_id: min(Decimal(booked_nights[property_id] * 100) / days, Decimal(100)).quantize(Decimal('0.01'))
+            for property_id in property_ids
+        }
+    
+    @classmethod
+    def refresh_occupancy(cls, property_ids, period_start=None, period_end=None):
+        """Recompute occupancy_rate for the given properties"""
+        property_ids = list(property_ids)
+        if not property_ids:
+            return
+        if period_start is None or period_end is None:
+            period_start, period_end = cls.current_period()
+        cls.ensure_rows(property_ids)
+        rates = cls.occupancy_rates(property_ids, period_start, period_end)
+        rows = list(PropertyAnalytics.objects.filter(property_id__in=property_ids))
+        for row in rows:
+            row.occupancy_rate = rates[row.property_id]
+        PropertyAnalytics.objects.bulk_update(rows, ['occupancy_rate'])
+    
+    @classmethod
+    def recompute(cls, property_ids, period_start=None, period_end=None):
+        """
+        Rebuild every derived figure except views_count (which only exists
+        as events) for a chunk of properties, with one grouped query per table.
+        """
+        property_ids = list(property_ids)
+        if period_start is None or period_end is None:
+            period_start, period_end = cls.current_period()
+        cls.ensure_rows(property_ids)
+        
+        bookings = {
+            row['property_id']: row
+            for row in Reservation.objects.filter(property_id__in=property_ids)
+            .values('property_id')
+            .annotate(
+                requests=Count('id'),
+                successful=Count('id', filter=Q(status__in=cls.BOOKED_STATUSES)),
+            )
+            .order_by()
+        }
+        earnings = dict(
+            HostEarnings.objects.filter(reservation__property_id__in=property_ids)
+            .values('reservation__property_id')
+            .annotate(total=Sum('net_earnings'))
+            .values_list('reservation__property_id', 'total')
+            .order_by()
+        )
+        reviews = {
+            row['property_id']: row
+            for row in PropertyReview.objects.filter(property_id__in=property_ids)
+            .values('property_id')
+            .annotate(avg=Avg('rating'), count=Count('id'))
+            .order_by()
+        }
+        rates = cls.occupancy_rates(property_ids, period_start, period_end)
+        
+        rows = list(PropertyAnalytics.objects.filter(property_id__in=property_ids))
+        for row in rows:
+            booking_row = bookings.get(row.property_id, {})
+            review_row = reviews.get(row.property_id, {})
+            row.booking_requests = booking_row.get('requests', 0)
+            row.successful_bookings = booking_row.get('successful', 0)
+            row.total_earnings = earnings.get(row.property_id) or 0
+            row.average_rating = Decimal(review_row.get('avg') or 0).quantize(Decimal('0.01'))
+            row.total_reviews = review_row.get('count', 0)
+            row.occupancy_rate = rates[row.property_id]
+        PropertyAnalytics.objects.bulk_update(rows, [
+            'booking_requests', 'successful_bookings', 'total_earnings',
+            'average_rating', 'total_reviews', 'occupancy_rate',
+        ])
+        return len(rows)
+    
+    @classmethod
+    def recompute_all(cls, chunk_size=500, period_start=None, period_end=None):
+        """Recompute analytics for every property, keyset-paginating over property ids"""
+        properties = Property.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        total = 0
+        while True:
+            chunk_qs = properties if last_pk is None else properties.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:chunk_size])
+            if not chunk:
+                break
+            total += cls.recompute(chunk, period_start, period_end)
+            last_pk = chunk[-1]
+        logger.info(f"Recomputed analytics for {total} properties")
+        return total
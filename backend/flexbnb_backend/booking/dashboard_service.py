@@ -0,0 +1,71 @@
+"""
+Host Dashboard Service - aggregated, cached dashboard statistics for hosts
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+from property.models import Property
+from .models import Reservation, HostEarnings, HostMessage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HostDashboardService:
+    """Computes host dashboard stats with one aggregate query per source table"""
+    
+    CACHE_SECONDS = 300
+    
+    @staticmethod
+    def cache_key(host_id):
+        return f'host_dashboard:{host_id}'
+    
+    @classmethod
+    def get_stats(cls, host):
+        """Return the dashboard stats for `host`, served from cache when possible"""
+        key = cls.cache_key(host.pk)
+        stats = cache.get(key)
+        if stats is None:
+            stats = cls.compute_stats(host)
+            cache.set(key, stats, cls.CACHE_SECONDS)
+        return stats
+    
+    @classmethod
+    def compute_stats(cls, host):
+        """Compute the stats from the database (four queries in total)"""
+        this_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        
+        # Properties and their analytics rows in one LEFT JOIN
+        properties = Property.objects.filter(Host=host).aggregate(
+            total_properties=Count('id', distinct=True),
+            occupancy_rate=Avg('analytics__occupancy_rate'),
+            average_rating=Avg('analytics__average_rating'),
+        )
+        reservations = Reservation.objects.filter(host=host).aggregate(
+            total_reservations=Count('id'),
+            pending_requests=Count('id', filter=Q(status='pending')),
+        )
+        earnings = HostEarnings.objects.filter(host=host).aggregate(
+            total_earnings=Sum('net_earnings'),
+            this_month_earnings=Sum('net_earnings', filter=Q(created_at__gte=this_month_start)),
+        )
+        unread_messages = HostMessage.objects.filter(receiver=host, is_read=False).count()
+        
+        return {
+            'total_properties': properties['total_properties'],
+            'total_reservations': reservations['total_reservations'],
+            'pending_requests': reservations['pending_requests'],
+            'total_earnings': earnings['total_earnings'] or 0,
+            'this_month_earnings': earnings['this_month_earnings'] or 0,
+            'occupancy_rate': properties['occupancy_rate'] or 0,
+            'average_rating': properties['average_rating'] or 0,
+            'unread_messages': unread_messages,
+        }
+    
+    @classmethod
+    def invalidate(cls, *host_ids):
+        """Drop cached stats for the given hosts once the current transaction commits"""
+        keys = [cls.cache_key(host_id) for host_id in host_ids if host_id is not None]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
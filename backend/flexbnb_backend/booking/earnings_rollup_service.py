@@ -0,0 +1,137 @@
+"""
+Earnings Rollup Service - daily and monthly earnings totals per host and property
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import HostEarnings, HostEarningsRollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EarningsRollupService:
+    """Maintains HostEarningsRollup incrementally and answers range queries from it"""
+    
+    GRANULARITIES = ('day', 'month')
+    
+    @staticmethod
+    def bucket_start(value, granularity):
+        day = timezone.localdate(value)
+        return day.replace(day=1) if granularity == 'month' else day
+    
+    @classmethod
+    def record(cls, earnings):
+        cls.record_many([earnings])
+    
+    @classmethod
+    def record_many(cls, earnings_list, sign=1):
+        """
+        Add (sign=1) or remove (sign=-1) earnings records from the rollups.
+        Records are summed in memory per bucket, missing buckets are created
+        in one bulk insert, and each bucket then gets a single F() update.
+        """
+        buckets = defaultdict(lambda: [Decimal('0'), Decimal('0'), Decimal('0'), 0])
+        for earnings in earnings_list:
+            property_id = earnings.reservation.property_id
+            for granularity in cls.GRANULARITIES:
+                key = (earnings.host_id, property_id, granularity, cls.bucket_start(earnings.created_at, granularity))
+                totals = buckets[key]
+                totals[0] += Decimal(earnings.gross_earnings) * sign
+                totals[1] += Decimal(earnings.platform_fee) * sign
+                totals[2] += Decimal(earnings.net_earnings) * sign
+                totals[3] += sign
+        if not buckets:
+            return
+        
+        with transaction.atomic():
+            HostEarningsRollup.objects.bulk_create([
+                HostEarningsRollup(host_id=host_id, property_id=property_id, granularity=granularity, period_start=period_start)
+                for host_id, property_id, granularity, period_start in buckets
+            ], ignore_conflicts=True)
+            for (host_id, property_id, granularity, period_start), (gross, fee, net, count) in buckets.items():
+                HostEarningsRollup.objects.filter(
+                    host_id=host_id, property_id=property_id, granularity=granularity, period_start=period_start
+                ).update(
+                    gross_earnings=F('gross_earnings') + gross,
+                    platform_fee=F('platform_fee') + fee,
+                    net_earnings=F('net_earnings') + net,
+                    bookings_count=F('bookings_count') + count,
+                    updated_at=timezone.now(),
+                )
+    
+    @classmethod
+    def rebuild(cls, host=None):
+        """Recompute all rollups (optionally for one host) from HostEarnings. Returns rows written."""
+        earnings = HostEarnings.objects.all()
+        rollups = HostEarningsRollup.objects.all()
+        if host is not None:
+            earnings = earnings.filter(host=host)
+            rollups = rollups.filter(host=host)
+        
+        truncs = {
+            'day': TruncDate('created_at'),
+            'month': TruncMonth('created_at', output_field=DateField()),
+        }
+        rows = []
+        for granularity, trunc in truncs.items():
+            grouped = (
+                earnings.annotate(period=trunc)
+                .values('host_id', 'reservation__property_id', 'period')
+                .annotate(
+                    gross=Sum('gross_earnings'),
+                    fee=Sum('platform_fee'),
+                    net=Sum('net_earnings'),
+                    count=Count('id'),
+                )
+                .order_by()
+            )
+            rows.extend(
+                HostEarningsRollup(
+                    host_id=row['host_id'],
+                    property_id=row['reservation__property_id'],
+                    granularity=granularity,
+                    period_start=row['period'],
+                    gross_earnings=row['gross'],
+                    platform_fee=row['fee'],
+                    net_earnings=row['net'],
+                    bookings_count=row['count'],
+                )
+                for row in grouped.iterator()
+            )
+        
+        with transaction.atomic():
+            rollups.delete()
+            HostEarningsRollup.objects.bulk_create(rows, batch_size=1000)
+        
+        logger.info(f"Rebuilt {len(rows)} earnings rollup rows")
+        return len(rows)
+    
+    @classmethod
+    def series(cls, host, granularity, start_date=None, end_date=None, property_id=None):
+        """Totals per period for a host, summed across properties unless one is given"""
+        rollups = HostEarningsRollup.objects.filter(host=host, granularity=granularity)
+        if start_date:
+            rollups = rollups.filter(period_start__gte=cls.bucket_floor(start_date, granularity))
+        if end_date:
+            rollups = rollups.filter(period_start__lte=end_date)
+        if property_id:
+            rollups = rollups.filter(property_id=property_id)
+        
+        return list(
+            rollups.values('period_start')
+            .annotate(
+                gross_earnings=Sum('gross_earnings'),
+                platform_fee=Sum('platform_fee'),
+                net_earnings=Sum('net_earnings'),
+                bookings_count=Sum('bookings_count'),
+            )
+            .order_by('period_start')
+        )
+    
+    @staticmethod
+    def bucket_floor(day, granularity):
+        return day.replace(day=1) if granularity == 'month' else day
@@ -0,0 +1,91 @@
+"""
+Streaming CSV and NDJSON exports for host reservations and earnings
+"""
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, ORM lookup) pairs; exports read these through values() only
+RESERVATION_EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('property_id', 'property_id'),
+    ('property_title', 'property__title'),
+    ('guest_name', 'guest__name'),
+    ('guest_email', 'guest__email'),
+    ('check_in_date', 'check_in_date'),
+    ('check_out_date', 'check_out_date'),
+    ('guests_count', 'guests_count'),
+    ('total_price', 'total_price'),
+    ('booking_fee', 'booking_fee'),
+    ('host_earnings', 'host_earnings'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+]
+
+EARNINGS_EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('reservation_id', 'reservation_id'),
+    ('property_title', 'reservation__property__title'),
+    ('check_in_date', 'reservation__check_in_date'),
+    ('gross_earnings', 'gross_earnings'),
+    ('platform_fee', 'platform_fee'),
+    ('net_earnings', 'net_earnings'),
+    ('payout_status', 'payout_status'),
+    ('payout_date', 'payout_date'),
+    ('created_at', 'created_at'),
+]
+
+
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_safe(value):
+    """Prefix text that a spreadsheet would run as a formula with an apostrophe"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer"""
+    
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield each row as a tuple of values, fetching chunk_size rows at a time"""
+    lookups = [lookup for _, lookup in fields]
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in fields])
+    for row in iter_rows(queryset, fields, chunk_size):
+        yield writer.writerow([csv_safe(value) for value in row])
+
+
+def iter_ndjson(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    names = [name for name, _ in fields]
+    encoder = DjangoJSONEncoder()
+    for row in iter_rows(queryset, fields, chunk_size):
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def export_response(queryset, fields, export_format, filename):
+    """A StreamingHttpResponse that writes `queryset` row by row in the given format"""
+    if export_format == 'ndjson':
+        content = iter_ndjson(queryset, fields)
+        content_type = 'application/x-ndjson'
+    else:
+        content = iter_csv(queryset, fields)
+        content_type = 'text/csv'
+    
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,74 @@
+"""
+Guest Trips Service - upcoming, current and past trips for a guest, cached per guest
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+from .models import Reservation
+from .serializers import ReservationSerializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GuestTripsService:
+    """Partitions a guest's trips with a single annotated query"""
+    
+    CACHE_SECONDS = 60 * 60 * 24
+    TRIP_STATUSES = ('approved', 'completed')
+    PHASES = ('upcoming', 'current', 'past')
+    
+    @staticmethod
+    def cache_key(guest_id, today):
+        # The date is part of the key so trips move between partitions at midnight
+        return f'guest_trips:{guest_id}:{today.isoformat()}'
+    
+    @classmethod
+    def get_trips(cls, guest):
+        today = timezone.localdate()
+        key = cls.cache_key(guest.pk, today)
+        trips = cache.get(key)
+        if trips is None:
+            trips = cls.compute_trips(guest, today)
+            cache.set(key, trips, cls.CACHE_SECONDS)
+        return trips
+    
+    @classmethod
+    def compute_trips(cls, guest, today=None):
+        """Serialized trips per phase plus counts, from one query"""
+        today = today or timezone.localdate()
+        reservations = (
+            Reservation.objects.filter(guest=guest, status__in=cls.TRIP_STATUSES)
+            .annotate(phase=cls.phase_expression(today))
+            .select_related('property', 'guest', 'host')
+            .order_by('check_in_date')
+        )
+        
+        partitions = {phase: [] for phase in cls.PHASES}
+        for reservation in reservations:
+            partitions[reservation.phase].append(reservation)
+        # Most recent past trips first
+        partitions['past'].reverse()
+        
+        trips = {
+            phase: list(ReservationSerializer(rows, many=True).data)
+            for phase, rows in partitions.items()
+        }
+        trips['counts'] = {phase: len(rows) for phase, rows in partitions.items()}
+        return trips
+    
+    @staticmethod
+    def phase_expression(today):
+        return Case(
+            When(check_out_date__lt=today, then=Value('past')),
+            When(check_in_date__gt=today, then=Value('upcoming')),
+            default=Value('current'),
+            output_field=CharField(),
+        )
+    
+    @classmethod
+    def invalidate(cls, guest_id):
+        """Drop the guest's cached trips once the current transaction commits"""
+        key = cls.cache_key(guest_id, timezone.localdate())
+        transaction.on_commit(lambda: cache.delete(key))
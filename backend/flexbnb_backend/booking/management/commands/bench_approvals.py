@@ -0,0 +1,83 @@
+"""
+Benchmark reservation approvals through the state machine
+Run this with: python manage.py bench_approvals --reservations 2000 --batch-size 50
+
+Synthetic data is created inside a transaction that is rolled back at the end.
+Notifications are only queued in the outbox, so nothing is sent.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking.models import Reservation
+from booking.state_machine import ReservationStateMachine
+from property.models import Property
+from useraccount.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark approvals per second, one at a time and in batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=2000)
+        parser.add_argument('--properties', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=50)
+    
+    def handle(self, *args, **options):
+        count = options['reservations']
+        batch_size = options['batch_size']
+        
+        with transaction.atomic():
+            host, ids = self.seed(count, options['properties'])
+            half = len(ids) // 2
+            
+            started = time.perf_counter()
+            for pk in ids[:half]:
+                ReservationStateMachine.apply([pk], 'approved', actor=host, host=host)
+            self.report('One at a time', half, time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            approved = 0
+            for offset in range(half, len(ids), batch_size):
+                applied, _ = ReservationStateMachine.apply(ids[offset:offset + batch_size], 'approved', actor=host, host=host)
+                approved += len(applied)
+            self.report(f'Batches of {batch_size}', approved, time.perf_counter() - started)
+            
+            transaction.set_rollback(True)
+    
+    def report(self, label, approved, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:<16} {approved} approvals in {elapsed:.2f}s ({approved / elapsed:,.0f} approvals/s)'
+        ))
+    
+    def seed(self, count, property_count):
+        password = make_password(None)
+        host = User.objects.create(email='approval-bench-host@example.com', name='Bench Host', password=password)
+        guests = User.objects.bulk_create([
+            User(email=f'approval-bench-guest-{i}@example.com', name=f'Guest {i}', password=password)
+            for i in range(50)
+        ])
+        properties = Property.objects.bulk_create([
+            Property(
+                title=f'Bench property {i}', description='Benchmark', price_per_night=100,
+                bedrooms=1, bathrooms=1, guests=2, country='Pakistan', country_code='PK',
+                category='bench', image='uploads/properties/bench.jpg', Host=host
+            )
+            for i in range(property_count)
+        ])
+        start = date.today() + timedelta(days=7)
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                property=properties[i % property_count], guest=guests[i % len(guests)], host=host,
+                check_in_date=start + timedelta(days=i % 300),
+                check_out_date=start + timedelta(days=i % 300 + 2),
+                guests_count=1, total_price=Decimal('200'), booking_fee=Decimal('20'),
+                host_earnings=Decimal('180'), status='pending'
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        return host, [r.pk for r in reservations]
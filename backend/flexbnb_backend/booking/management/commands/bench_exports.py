@@ -0,0 +1,89 @@
+"""
+Benchmark streaming reservation exports and enforce a memory ceiling
+Run this with: python manage.py bench_exports --rows 500000 --max-memory-mb 32
+
+Synthetic data is created inside a transaction that is rolled back at the end.
+Fails with a non-zero exit if peak Python memory while streaming exceeds the ceiling.
+"""
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from booking.exports import EXPORT_FORMATS, RESERVATION_EXPORT_FIELDS, export_response
+from booking.models import Reservation
+from property.models import Property
+from useraccount.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark streaming CSV/NDJSON exports'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--max-memory-mb', type=float, default=32)
+    
+    def handle(self, *args, **options):
+        rows = options['rows']
+        failures = []
+        
+        with transaction.atomic():
+            host = self.seed(rows)
+            reservations = Reservation.objects.filter(host=host).order_by('-created_at')
+            
+            for export_format in EXPORT_FORMATS:
+                response = export_response(reservations, RESERVATION_EXPORT_FIELDS, export_format, 'reservations')
+                tracemalloc.start()
+                started = time.perf_counter()
+                size = 0
+                lines = 0
+                for chunk in response.streaming_content:
+                    size += len(chunk)
+                    lines += 1
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                
+                peak_mb = peak / (1024 * 1024)
+                self.stdout.write(
+                    f'{export_format:<7} {lines - (export_format == "csv"):,} rows, {size / (1024 * 1024):.1f} MB '
+                    f'in {elapsed:.2f}s, peak memory {peak_mb:.1f} MB'
+                )
+                if peak_mb > options['max_memory_mb']:
+                    failures.append(f'{export_format} peaked at {peak_mb:.1f} MB')
+            
+            transaction.set_rollback(True)
+        
+        if failures:
+            raise CommandError(f"Memory ceiling of {options['max_memory_mb']} MB exceeded: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(f"All exports stayed under {options['max_memory_mb']} MB"))
+    
+    def seed(self, count):
+        started = time.perf_counter()
+        password = make_password(None)
+        host = User.objects.create(email='export-bench-host@example.com', name='Bench Host', password=password)
+        guest = User.objects.create(email='export-bench-guest@example.com', name='Bench Guest', password=password)
+        prop = Property.objects.create(
+            title='Export bench property', description='Benchmark', price_per_night=100,
+            bedrooms=1, bathrooms=1, guests=2, country='Pakistan', country_code='PK',
+            category='bench', image='uploads/properties/bench.jpg', Host=host
+        )
+        today = date.today()
+        batch = 10000
+        for offset in range(0, count, batch):
+            Reservation.objects.bulk_create([
+                Reservation(
+                    property=prop, guest=guest, host=host,
+                    check_in_date=today + timedelta(days=i % 365),
+                    check_out_date=today + timedelta(days=i % 365 + 2),
+                    guests_count=1, total_price=Decimal('200'), booking_fee=Decimal('20'),
+                    host_earnings=Decimal('180'), status='approved'
+                )
+                for i in range(offset, min(offset + batch, count))
+            ])
+        self.stdout.write(f'Seeded {count:,} reservations in {time.perf_counter() - started:.2f}s')
+        return host
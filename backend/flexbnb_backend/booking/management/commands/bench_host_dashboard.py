@@ -0,0 +1,120 @@
+"""
+Benchmark host dashboard stats for a host with many reservations
+Run this with: python manage.py bench_host_dashboard --reservations 5000
+
+Synthetic data is created inside a transaction that is rolled back at the end.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Avg, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking.dashboard_service import HostDashboardService
+from booking.models import Reservation, HostEarnings, HostMessage, PropertyAnalytics
+from property.models import Property
+from useraccount.models import User
+
+
+def per_query_stats(user):
+    """The previous implementation: one query per figure"""
+    host_properties = Property.objects.filter(Host=user)
+    earnings = HostEarnings.objects.filter(host=user)
+    analytics = PropertyAnalytics.objects.filter(property__in=host_properties)
+    this_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'total_properties': host_properties.count(),
+        'total_reservations': Reservation.objects.filter(host=user).count(),
+        'pending_requests': Reservation.objects.filter(host=user, status='pending').count(),
+        'total_earnings': earnings.aggregate(total=Sum('net_earnings'))['total'] or 0,
+        'this_month_earnings': earnings.filter(created_at__gte=this_month_start).aggregate(total=Sum('net_earnings'))['total'] or 0,
+        'occupancy_rate': analytics.aggregate(avg_rate=Avg('occupancy_rate'))['avg_rate'] or 0,
+        'average_rating': analytics.aggregate(avg_rating=Avg('average_rating'))['avg_rating'] or 0,
+        'unread_messages': HostMessage.objects.filter(receiver=user, is_read=False).count(),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark host dashboard statistics'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=5000)
+        parser.add_argument('--properties', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=50)
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            host = self.seed(options['reservations'], options['properties'])
+            
+            self.measure('Per-query (previous)', lambda: per_query_stats(host), options['iterations'])
+            self.measure('Aggregated, uncached', lambda: HostDashboardService.compute_stats(host), options['iterations'])
+            
+            cache.delete(HostDashboardService.cache_key(host.pk))
+            self.measure('Aggregated, cached', lambda: HostDashboardService.get_stats(host), options['iterations'])
+            
+            cache.delete(HostDashboardService.cache_key(host.pk))
+            transaction.set_rollback(True)
+    
+    def seed(self, count, property_count):
+        started = time.perf_counter()
+        password = make_password(None)
+        host = User.objects.create(email='dashboard-bench-host@example.com', name='Bench Host', password=password)
+        guest = User.objects.create(email='dashboard-bench-guest@example.com', name='Bench Guest', password=password)
+        properties = Property.objects.bulk_create([
+            Property(
+                title=f'Bench property {i}', description='Benchmark', price_per_night=100,
+                bedrooms=1, bathrooms=1, guests=2, country='Pakistan', country_code='PK',
+                category='bench', image='uploads/properties/bench.jpg', Host=host
+            )
+            for i in range(property_count)
+        ])
+        PropertyAnalytics.objects.bulk_create([
+            PropertyAnalytics(property=p, occupancy_rate=Decimal('50'), average_rating=Decimal('4.5'))
+            for p in properties
+        ])
+        
+        statuses = ['pending', 'approved', 'completed', 'declined']
+        today = date.today()
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                property=properties[i % property_count], guest=guest, host=host,
+                check_in_date=today + timedelta(days=i % 365),
+                check_out_date=today + timedelta(days=i % 365 + 2),
+                guests_count=1, total_price=Decimal('200'), booking_fee=Decimal('20'),
+                host_earnings=Decimal('180'), status=statuses[i % len(statuses)]
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        HostEarnings.objects.bulk_create([
+            HostEarnings(host=host, reservation=r, gross_earnings=Decimal('200'),
+                         platform_fee=Decimal('20'), net_earnings=Decimal('180'))
+            for r in reservations if r.status in ('approved', 'completed')
+        ], batch_size=1000)
+        HostMessage.objects.bulk_create([
+            HostMessage(reservation=r, sender=guest, receiver=host, message='Hello', is_read=i % 3 == 0)
+            for i, r in enumerate(reservations[:count // 2])
+        ], batch_size=1000)
+        self.stdout.write(f'Seeded {count} reservations in {time.perf_counter() - started:.2f}s')
+        return host
+    
+    def measure(self, label, fn, iterations):
+        timings = []
+        fn()  # warm up
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        queries = len(ctx.captured_queries)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{label:<24} queries={queries:<3} '
+            f'median={statistics.median(timings):.2f}ms p95={sorted(timings)[int(len(timings) * 0.95) - 1]:.2f}ms'
+        )
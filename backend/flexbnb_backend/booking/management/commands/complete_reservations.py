@@ -0,0 +1,43 @@
+"""
+Management command to complete approved reservations whose stay has ended
+Run this with: python manage.py complete_reservations
+Schedule it daily (cron) or keep it running: python manage.py complete_reservations --loop
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from booking.state_machine import ReservationStateMachine
+
+
+class Command(BaseCommand):
+    help = 'Move approved reservations past their check-out date to completed'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reservations completed per transaction')
+        parser.add_argument('--max-rows', type=int, default=None, help='Stop after completing this many')
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking again every --interval seconds')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between runs in loop mode')
+    
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options['batch_size'], options['max_rows'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+    
+    def run_once(self, batch_size, max_rows):
+        started = time.perf_counter()
+        total = 0
+        while max_rows is None or total < max_rows:
+            size = batch_size if max_rows is None else min(batch_size, max_rows - total)
+            completed = ReservationStateMachine.complete_finished_stays(batch_size=size)
+            if not completed:
+                break
+            total += completed
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'Completed {total} reservations ({total / elapsed:,.0f} rows/s)')
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Completed {total} reservations in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
@@ -0,0 +1,31 @@
+"""
+Management command to rebuild the earnings rollup table from HostEarnings
+Run this with: python manage.py rebuild_earnings_rollups [--host-id <uuid>]
+"""
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from booking.earnings_rollup_service import EarningsRollupService
+from useraccount.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily and monthly earnings rollups'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--host-id', help='Only rebuild rollups for this host')
+    
+    def handle(self, *args, **options):
+        host = None
+        if options['host_id']:
+            try:
+                host = User.objects.get(pk=options['host_id'])
+            except (User.DoesNotExist, ValidationError):
+                raise CommandError(f"Host {options['host_id']} not found")
+        
+        started = time.perf_counter()
+        rows = EarningsRollupService.rebuild(host)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {rows} rollup rows in {time.perf_counter() - started:.2f}s')
+        )
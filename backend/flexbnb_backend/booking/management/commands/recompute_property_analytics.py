@@ -0,0 +1,48 @@
+"""
+Management command to recompute PropertyAnalytics for every property
+Run this with: python manage.py recompute_property_analytics [--period-start 2025-01-01 --period-end 2025-02-01]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from booking.analytics_service import PropertyAnalyticsService
+
+
+class Command(BaseCommand):
+    help = 'Recompute booking counters, earnings, ratings and occupancy for all properties'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Properties recomputed per chunk')
+        parser.add_argument('--period-start', help='Occupancy period start (YYYY-MM-DD), defaults to this month')
+        parser.add_argument('--period-end', help='Occupancy period end, exclusive (YYYY-MM-DD)')
+    
+    def handle(self, *args, **options):
+        period_start = self.parse(options['period_start'])
+        period_end = self.parse(options['period_end'])
+        if (period_start is None) != (period_end is None):
+            raise CommandError('--period-start and --period-end must be given together')
+        if period_start and period_end <= period_start:
+            raise CommandError('--period-end must be after --period-start')
+        
+        started = time.perf_counter()
+        total = PropertyAnalyticsService.recompute_all(
+            chunk_size=options['chunk_size'],
+            period_start=period_start,
+            period_end=period_end,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Recomputed analytics for {total} properties in {time.perf_counter() - started:.2f}s')
+        )
+    
+    @staticmethod
+    def parse(value):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'Invalid date: {value}. Use YYYY-MM-DD')
+        return parsed
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_alter_propertyreview_property'),
+        ('property', '0004_property_air_conditioning_property_breakfast_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostEarningsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('gross_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('platform_fee', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('bookings_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_rollups', to=settings.AUTH_USER_MODEL)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_rollups', to='property.property')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['host', 'granularity', 'period_start'], name='booking_hos_host_id_602ca9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('host', 'property', 'granularity', 'period_start'), name='unique_earnings_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_reservation_listing_indexes'),
+        ('property', '0004_property_air_conditioning_property_breakfast_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['guest', 'status', 'check_in_date'], name='booking_res_guest_i_e82523_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_reservation_guest_status_index'),
+        ('property', '0004_property_air_conditioning_property_breakfast_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'check_out_date'], name='booking_res_status_a4ae29_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:43
+
+from django.db import migrations, models
+from django.db.models import Count
+
+COUNTERS = ('views_count', 'booking_requests', 'successful_bookings', 'total_earnings')
+
+
+def merge_duplicates(apps, schema_editor):
+    """Fold duplicate analytics rows into one per property so the constraint can be added"""
+    PropertyAnalytics = apps.get_model('booking', 'PropertyAnalytics')
+    duplicated = (
+        PropertyAnalytics.objects.values('property_id').annotate(rows=Count('id'))
+        .filter(rows__gt=1).values_list('property_id', flat=True)
+    )
+    for property_id in list(duplicated):
+        keep, *extra = PropertyAnalytics.objects.filter(property_id=property_id).order_by('last_updated')
+        for row in extra:
+            for field in COUNTERS:
+                setattr(keep, field, getattr(keep, field) + getattr(row, field))
+        keep.save(update_fields=list(COUNTERS))
+        PropertyAnalytics.objects.filter(pk__in=[row.pk for row in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_reservation_status_checkout_index'),
+        ('property', '0006_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='propertyanalytics',
+            constraint=models.UniqueConstraint(fields=('property',), name='unique_property_analytics'),
+        ),
+    ]
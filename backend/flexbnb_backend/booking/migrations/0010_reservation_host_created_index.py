@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_unique_property_analytics'),
+        ('property', '0006_image_derivatives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['host', '-created_at', '-id'], name='booking_res_host_id_b567da_idx'),
+        ),
+    ]
@@ -41,6 +41,13 @@ class Reservation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['host', 'status', 'check_in_date']),
+            models.Index(fields=['guest', 'check_in_date']),
+            models.Index(fields=['guest', 'status', 'check_in_date']),
+            models.Index(fields=['status', 'check_out_date']),
+            models.Index(fields=['host', '-created_at', '-id']),
+        ]
 
 
 class HostEarnings(models.Model):
@@ -69,6 +76,41 @@ class HostEarnings(models.Model):
         ordering = ['-created_at']
 
 
+class HostEarningsRollup(models.Model):
+    """Earnings totals per host, property and day/month bucket"""
+    GRANULARITY_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+    
+    host = models.ForeignKey(User, related_name='earnings_rollups', on_delete=models.CASCADE)
+    property = models.ForeignKey(Property, related_name='earnings_rollups', on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    
+    gross_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    platform_fee = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    bookings_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.granularity} {self.period_start} earnings for {self.host.email} - {self.net_earnings}"
+    
+    class Meta:
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['host', 'property', 'granularity', 'period_start'],
+                name='unique_earnings_rollup_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['host', 'granularity', 'period_start']),
+        ]
+
+
 class HostMessage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     reservation = models.ForeignKey(Reservation, related_name='messages', on_delete=models.CASCADE)
@@ -108,6 +150,9 @@ class PropertyAnalytics(models.Model):
     
     class Meta:
         ordering = ['-last_updated']
+        constraints = [
+            models.UniqueConstraint(fields=['property'], name='unique_property_analytics'),
+        ]
 
 
 class PropertyReview(models.Model):
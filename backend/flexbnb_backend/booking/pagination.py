@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first
+"""
+import base64
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(obj):
+    raw = f'{obj.created_at.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, pk). Raises ValueError for a malformed cursor."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+def page_size_param(request):
+    try:
+        size = int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def cursor_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return (items, next_cursor) for one page of `queryset`, ordered by
+    -created_at, -id. Each page is a single range query no matter how deep
+    the client has paged; for a host's reservations it is served by the
+    (host, -created_at, -id) index on Reservation.
+    """
+    queryset = queryset.order_by('-created_at', '-pk')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        try:
+            pk = queryset.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ValueError('Invalid cursor')
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+    return items[:page_size], next_cursor
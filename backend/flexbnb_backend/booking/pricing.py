@@ -0,0 +1,230 @@
+"""
+Pricing engine - per-night price vectors with offers, weekend/seasonal rules and eco incentives
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Offer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    'PLATFORM_FEE_RATE': '0.10',
+    'WEEKEND_MULTIPLIER': 1.0,
+    # Nights starting on these weekdays (Monday=0) get the weekend multiplier
+    'WEEKEND_DAYS': [4, 5],
+    # [{'start': 'MM-DD', 'end': 'MM-DD', 'multiplier': 1.2}], inclusive; may wrap the new year
+    'SEASONS': [],
+    'QUOTE_CACHE_SECONDS': 600,
+    # Longest stay a quote is computed for; longer ranges are rejected with 400
+    'MAX_NIGHTS': 365,
+}
+
+CENT = Decimal('0.01')
+
+
+def pricing_setting(name):
+    return getattr(settings, 'PRICING', {}).get(name, DEFAULTS[name])
+
+
+def to_money(value):
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def night_dates(check_in, check_out):
+    """numpy datetime64[D] array with one entry per night of the stay"""
+    return np.arange(np.datetime64(check_in, 'D'), np.datetime64(check_out, 'D'), dtype='datetime64[D]')
+
+
+def weekday(dates):
+    # 1970-01-01 was a Thursday
+    return (dates.astype('int64') + 3) % 7
+
+
+def month_day(dates):
+    """MMDD as an integer per date, for season matching"""
+    months = dates.astype('datetime64[M]')
+    month = months.astype('int64') % 12 + 1
+    day = (dates - months.astype('datetime64[D]')).astype('int64') + 1
+    return month * 100 + day
+
+
+def rule_multipliers(dates):
+    """Weekend and seasonal multipliers per night"""
+    multipliers = np.ones(len(dates))
+    weekend = np.isin(weekday(dates), pricing_setting('WEEKEND_DAYS'))
+    multipliers[weekend] *= float(pricing_setting('WEEKEND_MULTIPLIER'))
+
+    md = month_day(dates)
+    for season in pricing_setting('SEASONS'):
+        start = int(season['start'].replace('-', ''))
+        end = int(season['end'].replace('-', ''))
+        in_season = (md >= start) & (md <= end) if start <= end else (md >= start) | (md <= end)
+        multipliers[in_season] *= float(season['multiplier'])
+    return multipliers
+
+
+def offer_discounts(property_ids, dates):
+    """
+    Best offer discount percentage per (property, night), shape (len(property_ids), len(dates)).
+    One query for all properties.
+    """
+    index = {pk: i for i, pk in enumerate(property_ids)}
+    discounts = np.zeros((len(property_ids), len(dates)))
+    if not len(dates):
+        return discounts
+    offers = Offer.objects.filter(
+        property_id__in=property_ids,
+        valid_from__lte=dates[-1].item(),
+        valid_to__gte=dates[0].item(),
+    ).values_list('property_id', 'discount_percentage', 'valid_from', 'valid_to')
+    for property_id, percentage, valid_from, valid_to in offers:
+        active = (dates >= np.datetime64(valid_from, 'D')) & (dates <= np.datetime64(valid_to, 'D'))
+        row = index[property_id]
+        discounts[row] = np.maximum(discounts[row], np.where(active, float(percentage), 0.0))
+    return np.clip(discounts, 0, 100)
+
+
+class PricingEngine:
+    """
+    Builds nightly price vectors for stays. Quotes for one property and date
+    range are cached; the cache key carries a per-property version that is
+    bumped whenever the property or its offers change, plus a global version
+    for incentives.
+    """
+
+    @staticmethod
+    def version(property_id):
+        return cache.get_or_set(f'pricing_version:{property_id}', 1, None)
+
+    @staticmethod
+    def bump_version(property_id=None):
+        """Invalidate cached quotes for one property, or all of them (incentive changes)"""
+        key = f'pricing_version:{property_id}' if property_id else 'pricing_version:global'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+    @classmethod
+    def cache_key(cls, property_id, check_in, check_out):
+        return (
+            f'pricing_quote:{property_id}:{check_in}:{check_out}:'
+            f'v{cls.version(property_id)}:g{cls.version("global")}'
+        )
+
+    @classmethod
+    def quote(cls, prop, check_in, check_out, user=None):
+        """
+        Price a stay at `prop` from `check_in` to `check_out` (dates). With
+        `user`, the best eco incentive they have not used up is applied.
+        """
+        key = cls.cache_key(prop.pk, check_in, check_out)
+        base = cache.get(key)
+        if base is None:
+            base = cls.quote_many([prop], check_in, check_out)[prop.pk]
+            cache.set(key, base, pricing_setting('QUOTE_CACHE_SECONDS'))
+        return cls.finalize(base, user)
+
+    @classmethod
+    def quote_many(cls, properties, check_in, check_out):
+        """
+        Price the same stay for many properties at once (search results).
+        Nightly prices for all properties are one (properties x nights)
+        matrix. Returns {property_id: quote} without user-specific incentives.
+        """
+        properties = list(properties)
+        property_ids = [p.pk for p in properties]
+        dates = night_dates(check_in, check_out)
+        nights = len(dates)
+
+        base = np.array([float(p.price_per_night) for p in properties])[:, None]
+        multipliers = rule_multipliers(dates)[None, :]
+        discounts = offer_discounts(property_ids, dates)
+        nightly = np.round(base * multipliers * (1 - discounts / 100), 2)
+        subtotals = nightly.sum(axis=1)
+        undiscounted = np.round(base * multipliers, 2).sum(axis=1)
+
+        incentives = cls.incentive_options(properties, check_in, nights)
+        iso_dates = [str(d) for d in dates]
+        quotes = {}
+        for i, prop in enumerate(properties):
+            subtotal = to_money(subtotals[i])
+            options = [
+                {
+                    'id': incentive['id'],
+                    'name': incentive['name'],
+                    'max_uses_per_user': incentive['max_uses_per_user'],
+                    'amount': min(
+                        to_money(subtotal * incentive['percentage'] / 100) if incentive['percentage'] else incentive['value'],
+                        subtotal
+                    ),
+                }
+                for incentive in incentives.get(prop.pk, [])
+            ]
+            options.sort(key=lambda option: option['amount'], reverse=True)
+            quotes[prop.pk] = {
+                'property_id': str(prop.pk),
+                'check_in': str(check_in),
+                'check_out': str(check_out),
+                'nights': nights,
+                'nightly': [
+                    {'date': iso_dates[j], 'price': to_money(nightly[i, j]), 'discount_percentage': to_money(discounts[i, j])}
+                    for j in range(nights)
+                ],
+                'offer_savings': to_money(undiscounted[i] - subtotals[i]),
+                'subtotal': subtotal,
+                'incentive_options': options,
+            }
+        return quotes
+
+    @staticmethod
+    def incentive_options(properties, check_in, nights):
+        """Active discount incentives each property qualifies for, from the cached eligibility index"""
+        from sustainability.incentive_service import IncentiveEligibilityService
+
+        eligible = IncentiveEligibilityService.evaluate(properties, check_in, nights, types=('discount',))
+        return {
+            property_id: [
+                {
+                    'id': incentive['id'],
+                    'name': incentive['name'],
+                    'max_uses_per_user': incentive['max_uses_per_user'],
+                    'percentage': incentive['percentage'],
+                    'value': to_money(incentive['value']),
+                }
+                for incentive in incentives
+            ]
+            for property_id, incentives in eligible.items()
+        }
+
+    @staticmethod
+    def finalize(base, user=None):
+        """Pick the best incentive the user can still use and compute totals and fees"""
+        options = base['incentive_options']
+        incentive = None
+        if user is not None and options:
+            from sustainability.incentive_service import IncentiveEligibilityService
+
+            used = IncentiveEligibilityService.usage_counts(user)
+            incentive = next(
+                (o for o in options if used.get(o['id'], 0) < o['max_uses_per_user'] and o['amount'] > 0),
+                None
+            )
+
+        discount = incentive['amount'] if incentive else Decimal('0')
+        total = base['subtotal'] - discount
+        booking_fee = to_money(total * Decimal(str(pricing_setting('PLATFORM_FEE_RATE'))))
+        quote = {key: value for key, value in base.items() if key != 'incentive_options'}
+        quote.update({
+            'incentive': {'id': incentive['id'], 'name': incentive['name'], 'amount': discount} if incentive else None,
+            'total_price': total,
+            'booking_fee': booking_fee,
+            'host_earnings': total - booking_fee,
+        })
+        return quote
@@ -0,0 +1,52 @@
+"""
+Signal handlers that keep cached host dashboard stats, guest trips and price quotes fresh
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from property.models import Property
+from .dashboard_service import HostDashboardService
+from .guest_trips_service import GuestTripsService
+from .models import Reservation, HostEarnings, HostMessage, Offer
+from .pricing import PricingEngine
+from sustainability.models import EcoIncentive, GreenCertification
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+@receiver([post_save, post_delete], sender=HostEarnings)
+def invalidate_host_dashboard(sender, instance, **kwargs):
+    HostDashboardService.invalidate(instance.host_id)
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+def invalidate_guest_trips(sender, instance, **kwargs):
+    GuestTripsService.invalidate(instance.guest_id)
+
+
+@receiver([post_save, post_delete], sender=HostMessage)
+def invalidate_receiver_dashboard(sender, instance, **kwargs):
+    HostDashboardService.invalidate(instance.receiver_id)
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_property_host_dashboard(sender, instance, **kwargs):
+    HostDashboardService.invalidate(instance.Host_id)
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_property_quotes(sender, instance, **kwargs):
+    PricingEngine.bump_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Offer)
+def invalidate_offer_quotes(sender, instance, **kwargs):
+    PricingEngine.bump_version(instance.property_id)
+
+
+@receiver([post_save, post_delete], sender=GreenCertification)
+def invalidate_certified_property_quotes(sender, instance, **kwargs):
+    PricingEngine.bump_version(instance.property_obj_id)
+
+
+@receiver([post_save, post_delete], sender=EcoIncentive)
+def invalidate_all_quotes(sender, instance, **kwargs):
+    PricingEngine.bump_version()
@@ -0,0 +1,183 @@
+"""
+Reservation state machine - explicit status transitions with batched side effects
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from messaging.models import AutomatedReminder
+from messaging.notification_service import NotificationService
+from messaging.reminder_service import ReminderService
+from sustainability.models import EcoIncentiveUsage
+from .analytics_service import PropertyAnalyticsService
+from .dashboard_service import HostDashboardService
+from .earnings_rollup_service import EarningsRollupService
+from .guest_trips_service import GuestTripsService
+from .models import Reservation, HostEarnings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Allowed target statuses for each current status
+TRANSITIONS = {
+    'pending': {'approved', 'declined', 'cancelled'},
+    'approved': {'cancelled', 'completed'},
+    'declined': set(),
+    'cancelled': set(),
+    'completed': set(),
+}
+
+
+class InvalidTransition(Exception):
+    """Raised when a reservation cannot move to the requested status"""
+
+
+class ReservationStateMachine:
+    """
+    Moves reservations between statuses. Every call handles a batch: the
+    rows are locked, updated with one UPDATE, and each side effect (earnings,
+    rollups, reminders, notifications) is written with bulk operations in the
+    same transaction. Analytics, occupancy and cache invalidation run on commit;
+    notifications are delivered later by the outbox worker.
+    """
+    
+    PLATFORM_FEE_RATE = Decimal('0.1')
+    
+    @staticmethod
+    def can_transition(current, target):
+        return target in TRANSITIONS.get(current, set())
+    
+    @classmethod
+    def transition(cls, reservation, target, actor=None):
+        """Transition a single reservation, raising InvalidTransition if not allowed"""
+        applied, errors = cls.apply([reservation.pk], target, actor=actor)
+        if errors:
+            raise InvalidTransition(errors[reservation.pk])
+        return applied[0]
+    
+    @classmethod
+    def apply(cls, reservation_ids, target, actor=None, host=None):
+        """
+        Transition many reservations to `target`.
+        
+        With `host`, only that host's reservations are considered. Returns
+        (applied, errors): the updated reservations, and {id: reason} for
+        every id that was not transitioned.
+        """
+        if target not in TRANSITIONS:
+            raise InvalidTransition(f"Unknown status: {target}")
+        
+        reservation_ids = list(dict.fromkeys(reservation_ids))
+        with transaction.atomic():
+            reservations = Reservation.objects.select_for_update(of=('self',)).filter(pk__in=reservation_ids)
+            if host is not None:
+                reservations = reservations.filter(host=host)
+            found = {r.pk: r for r in reservations.select_related('property', 'guest', 'host')}
+            
+            errors = {}
+            applied = []
+            for pk in reservation_ids:
+                reservation = found.get(pk)
+                if reservation is None:
+                    errors[pk] = 'Reservation not found'
+                elif not cls.can_transition(reservation.status, target):
+                    errors[pk] = f"Cannot change status from {reservation.status} to {target}"
+                else:
+                    applied.append(reservation)
+            
+            if applied:
+                now = timezone.now()
+                previous = {r.pk: r.status for r in applied}
+                Reservation.objects.filter(pk__in=[r.pk for r in applied]).update(status=target, updated_at=now)
+                for reservation in applied:
+                    reservation.status = target
+                    reservation.updated_at = now
+                
+                getattr(cls, f'_on_{target}')(applied, previous, actor)
+                
+                HostDashboardService.invalidate(*{r.host_id for r in applied})
+                for guest_id in {r.guest_id for r in applied}:
+                    GuestTripsService.invalidate(guest_id)
+        
+        logger.info(f"Transitioned {len(applied)} reservations to {target} ({len(errors)} rejected)")
+        return applied, errors
+    
+    @classmethod
+    def _on_approved(cls, reservations, previous, actor):
+        has_earnings = set(
+            HostEarnings.objects.filter(reservation__in=reservations).values_list('reservation_id', flat=True)
+        )
+        earnings = HostEarnings.objects.bulk_create([
+            cls.build_earnings(reservation)
+            for reservation in reservations if reservation.pk not in has_earnings
+        ])
+        EarningsRollupService.record_many(earnings)
+        ReminderService.create_reminders_for_reservations(reservations)
+        NotificationService.notify_booking_status(reservations, 'approved')
+        PropertyAnalyticsService.record_bookings_confirmed(reservations, earnings)
+    
+    @classmethod
+    def _on_declined(cls, reservations, previous, actor):
+        cls.release_incentives(reservations)
+        NotificationService.notify_booking_status(reservations, 'declined')
+    
+    @classmethod
+    def _on_cancelled(cls, reservations, previous, actor):
+        AutomatedReminder.objects.filter(reservation__in=reservations, is_sent=False).delete()
+        cls.release_incentives(reservations)
+        
+        # Reverse what approval recorded
+        was_approved = [r for r in reservations if previous[r.pk] == 'approved']
+        if was_approved:
+            earnings = list(HostEarnings.objects.filter(reservation__in=was_approved).select_related('reservation'))
+            EarningsRollupService.record_many(earnings, sign=-1)
+            HostEarnings.objects.filter(pk__in=[e.pk for e in earnings]).delete()
+            PropertyAnalyticsService.record_bookings_cancelled(was_approved, earnings)
+        
+        # Tell whichever side did not cancel; both when the actor is unknown
+        for recipient in ('guest', 'host'):
+            notify = [r for r in reservations if actor is None or getattr(r, f'{recipient}_id') != actor.pk]
+            if notify:
+                NotificationService.notify_booking_status(notify, 'cancelled', recipients=(recipient,))
+    
+    @classmethod
+    def _on_completed(cls, reservations, previous, actor):
+        # The stay is over, so the host's payout can be processed
+        HostEarnings.objects.filter(reservation__in=reservations, payout_status='pending').update(
+            payout_status='processing'
+        )
+        NotificationService.notify_booking_status(reservations, 'completed')
+    
+    @staticmethod
+    def release_incentives(reservations):
+        """Give back the eco incentive uses of bookings that will not happen"""
+        EcoIncentiveUsage.objects.filter(reservation__in=reservations).delete()
+    
+    @classmethod
+    def complete_finished_stays(cls, batch_size=500, today=None):
+        """
+        Complete one batch of approved reservations whose check-out date has
+        passed. Returns the number completed; 0 means nothing is left. Each
+        batch commits on its own, so an interrupted run simply resumes.
+        """
+        today = today or timezone.localdate()
+        ids = list(
+            Reservation.objects.filter(status='approved', check_out_date__lt=today)
+            .order_by('check_out_date', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        applied, _ = cls.apply(ids, 'completed')
+        return len(applied)
+    
+    @classmethod
+    def build_earnings(cls, reservation):
+        platform_fee = reservation.total_price * cls.PLATFORM_FEE_RATE
+        return HostEarnings(
+            host_id=reservation.host_id,
+            reservation=reservation,
+            gross_earnings=reservation.total_price,
+            platform_fee=platform_fee,
+            net_earnings=reservation.total_price - platform_fee,
+        )
@@ -0,0 +1,532 @@
+import csv
+import io
+import json
+import os
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from property.models import Property
+from useraccount.models import User
+from .exports import RESERVATION_EXPORT_FIELDS, export_response
+from .models import Reservation
+
+
+def create_property(host, **fields):
+    return Property.objects.create(**{
+        'title': 'Test property', 'description': 'Test', 'price_per_night': 100,
+        'bedrooms': 1, 'bathrooms': 1, 'guests': 2, 'country': 'Pakistan', 'country_code': 'PK',
+        'category': 'test', 'image': 'uploads/properties/test.jpg', 'Host': host,
+        **fields,
+    })
+
+
+def create_reservations(prop, guest, count, batch_size=10000, start=None, **fields):
+    start = start or date.today()
+    fields = {'status': 'approved', **fields}
+    created = []
+    for offset in range(0, count, batch_size):
+        created += Reservation.objects.bulk_create([
+            Reservation(
+                property=prop, guest=guest, host=prop.Host,
+                check_in_date=start + timedelta(days=i % 365),
+                check_out_date=start + timedelta(days=i % 365 + 2),
+                guests_count=1, total_price=Decimal('200'), booking_fee=Decimal('20'),
+                host_earnings=Decimal('180'), **fields
+            )
+            for i in range(offset, min(offset + batch_size, count))
+        ])
+    return created
+
+
+def api_call(view, user=None, method='get', path='/', data=None, **kwargs):
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    factory = APIRequestFactory()
+    request = factory.get(path, data) if method == 'get' else getattr(factory, method)(path, data, format='json')
+    if user is not None:
+        force_authenticate(request, user=user)
+    return view(request, **kwargs)
+
+
+def stream(response):
+    return ''.join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in response.streaming_content)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='=HYPERLINK("http://evil")', email='guest@example.com', password='x')
+
+    def test_csv_escapes_formula_cells(self):
+        prop = create_property(self.host, title='@SUM(A1:A9)')
+        create_reservations(prop, self.guest, 1)
+        response = export_response(Reservation.objects.all(), RESERVATION_EXPORT_FIELDS, 'csv', 'reservations')
+
+        rows = list(csv.DictReader(io.StringIO(stream(response))))
+        self.assertEqual(rows[0]['guest_name'], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(rows[0]['property_title'], "'@SUM(A1:A9)")
+        self.assertEqual(rows[0]['total_price'], '200.00')
+
+    def test_ndjson_keeps_values(self):
+        prop = create_property(self.host, title='-Beach house')
+        create_reservations(prop, self.guest, 2)
+        response = export_response(Reservation.objects.all(), RESERVATION_EXPORT_FIELDS, 'ndjson', 'reservations')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in stream(response).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['property_title'], '-Beach house')
+
+    def assert_streams_under_ceiling(self, rows, ceiling_mb):
+        create_reservations(create_property(self.host), self.guest, rows)
+        reservations = Reservation.objects.filter(host=self.host).order_by('-created_at')
+
+        for export_format in ('csv', 'ndjson'):
+            response = export_response(reservations, RESERVATION_EXPORT_FIELDS, export_format, 'reservations')
+            lines = 0
+            tracemalloc.start()
+            try:
+                for chunk in response.streaming_content:
+                    lines += 1
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+            self.assertEqual(lines, rows + (export_format == 'csv'))
+            self.assertLess(peak / (1024 * 1024), ceiling_mb, f'{export_format} export peaked at {peak / 1024 / 1024:.1f} MB')
+
+    def test_5k_rows_stream_under_memory_ceiling(self):
+        # Rows are fetched in chunks, so 5k rows peak about where 500k do
+        self.assert_streams_under_ceiling(5000, 8)
+
+    @skipUnless(os.environ.get('RUN_SLOW_TESTS'), 'Set RUN_SLOW_TESTS=1 to export 500k rows (several minutes)')
+    def test_500k_rows_stream_under_memory_ceiling(self):
+        self.assert_streams_under_ceiling(500000, 32)
+
+
+class CursorPageTests(TestCase):
+    def test_pages_cover_every_reservation_once(self):
+        from .pagination import cursor_page
+
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        create_reservations(create_property(host), host, 5)
+        reservations = Reservation.objects.filter(host=host)
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = cursor_page(reservations, cursor, page_size=2)
+            seen.extend(r.pk for r in page)
+            if cursor is None:
+                break
+        expected = list(reservations.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_host_page_uses_host_created_index(self):
+        from django.db import connection
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan wording is backend specific')
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        plan = Reservation.objects.filter(host=host).order_by('-created_at', '-pk')[:51].explain()
+        self.assertIn('booking_res_host_id_b567da_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class HostEarningsTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+
+    def get(self, **params):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import host_earnings
+
+        request = APIRequestFactory().get('/api/booking/host/earnings/', params)
+        force_authenticate(request, user=self.host)
+        return host_earnings(request)
+
+    def test_granularity_rejects_invalid_property_id(self):
+        response = self.get(granularity='month', property_id='not-a-uuid')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Invalid property_id'})
+
+    def test_granularity_with_property_id(self):
+        prop = create_property(self.host)
+        response = self.get(granularity='day', property_id=str(prop.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class HostDashboardCacheTests(TestCase):
+    def test_reading_messages_refreshes_unread_count(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .dashboard_service import HostDashboardService
+        from .models import HostMessage
+        from .views import host_messages
+
+        cache.clear()
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        create_reservations(create_property(host), guest, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            HostMessage.objects.create(reservation=Reservation.objects.get(), sender=guest, receiver=host, message='Hi')
+        self.assertEqual(HostDashboardService.get_stats(host)['unread_messages'], 1)
+
+        request = APIRequestFactory().get('/api/booking/host/messages/')
+        force_authenticate(request, user=host)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(host_messages(request).status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(HostDashboardService.get_stats(host)['unread_messages'], 0)
+
+        # Nothing left to mark read, so the cache is kept
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            host_messages(request)
+        self.assertEqual(callbacks, [])
+
+
+class PropertyAnalyticsTests(TestCase):
+    def setUp(self):
+        from .analytics_service import PropertyAnalyticsService
+
+        self.service = PropertyAnalyticsService
+        self.prop = create_property(User.objects.create_user(name='Host', email='host@example.com', password='x'))
+
+    def test_views_are_written_immediately(self):
+        from .models import PropertyAnalytics
+
+        self.service.record_view(self.prop.pk)
+        self.assertEqual(PropertyAnalytics.objects.get(property=self.prop).views_count, 1)
+        self.service.record_view(self.prop.pk)
+        self.service.record_view(self.prop.pk)
+        self.assertEqual(PropertyAnalytics.objects.get(property=self.prop).views_count, 3)
+
+    def test_ensure_rows_is_idempotent(self):
+        from django.db import IntegrityError, transaction
+        from .models import PropertyAnalytics
+
+        self.service.ensure_rows([self.prop.pk])
+        self.service.ensure_rows([self.prop.pk])
+        self.assertEqual(PropertyAnalytics.objects.filter(property=self.prop).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PropertyAnalytics.objects.create(property=self.prop)
+
+
+@override_settings(PRICING={**settings.PRICING, 'MAX_NIGHTS': 30})
+class StayLengthLimitTests(TestCase):
+    def setUp(self):
+        self.prop = create_property(User.objects.create_user(name='Host', email='host@example.com', password='x'))
+        self.check_in = date.today() + timedelta(days=7)
+
+    def quote(self, nights):
+        from rest_framework.test import APIRequestFactory
+        from .views import price_quote
+
+        request = APIRequestFactory().get('/api/booking/quote/', {
+            'property_id': str(self.prop.pk),
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=nights)).isoformat(),
+        })
+        return price_quote(request)
+
+    def search(self, nights):
+        from rest_framework.test import APIRequestFactory
+        from property.api import search_properties
+
+        request = APIRequestFactory().get('/api/properties/search/', {
+            'check_in': self.check_in.isoformat(),
+            'check_out': (self.check_in + timedelta(days=nights)).isoformat(),
+        })
+        return search_properties(request)
+
+    def test_price_quote_rejects_long_stays(self):
+        self.assertEqual(self.quote(30).status_code, 200)
+        response = self.quote(31)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('30 nights', response.data['error'])
+
+    def test_search_rejects_long_stays(self):
+        response = self.search(30)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['results'][0]['quote']['nights'], 30)
+        self.assertEqual(self.search(31).status_code, 400)
+
+
+class CreateReservationTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        self.prop = create_property(self.host)
+        self.check_in = date.today() + timedelta(days=7)
+
+    def book(self, check_in, check_out):
+        from .views import create_reservation
+
+        return api_call(create_reservation, self.guest, 'post', '/api/booking/reservations/create/', {
+            'propertyId': str(self.prop.pk), 'startDate': str(check_in), 'endDate': str(check_out),
+        })
+
+    def create_incentive(self):
+        from django.utils import timezone
+        from sustainability.models import EcoIncentive
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return EcoIncentive.objects.create(
+                name='Green stay', description='10% off', type='discount', value=0, percentage=10,
+                requires_green_property=False, max_uses_per_user=1,
+                valid_from=timezone.now() - timedelta(days=1), valid_until=timezone.now() + timedelta(days=365),
+            )
+
+    def test_same_day_booking_is_charged_one_night(self):
+        response = self.book(self.check_in, self.check_in)
+        self.assertEqual(response.status_code, 201)
+        reservation = Reservation.objects.get()
+        self.assertEqual((reservation.total_price, reservation.booking_fee, reservation.host_earnings), (100, 10, 90))
+
+    def test_rejects_invalid_and_reversed_dates(self):
+        self.assertEqual(self.book('2026-02-30', '2026-03-02').status_code, 400)
+        self.assertEqual(self.book(self.check_in, self.check_in - timedelta(days=1)).status_code, 400)
+        self.assertFalse(Reservation.objects.exists())
+
+    @override_settings(PRICING={**settings.PRICING, 'MAX_NIGHTS': 30})
+    def test_rejects_stays_longer_than_max_nights(self):
+        self.assertEqual(self.book(self.check_in, self.check_in + timedelta(days=31)).status_code, 400)
+        self.assertEqual(self.book(self.check_in, self.check_in + timedelta(days=30)).status_code, 201)
+
+    def test_fee_comes_from_quote(self):
+        self.create_incentive()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.book(self.check_in, self.check_in + timedelta(days=2)).status_code, 201)
+        reservation = Reservation.objects.get()
+        self.assertEqual((reservation.total_price, reservation.booking_fee), (Decimal('180.00'), Decimal('18.00')))
+
+    def test_declined_or_cancelled_booking_gives_incentive_use_back(self):
+        from sustainability.models import EcoIncentiveUsage
+        from .state_machine import ReservationStateMachine
+
+        incentive = self.create_incentive()
+        for target in ('declined', 'cancelled'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.book(self.check_in, self.check_in + timedelta(days=2)).status_code, 201)
+            reservation = Reservation.objects.get(status='pending')
+            self.assertEqual(EcoIncentiveUsage.objects.get().reservation, reservation)
+            with self.captureOnCommitCallbacks(execute=True):
+                ReservationStateMachine.transition(reservation, target)
+            self.assertFalse(EcoIncentiveUsage.objects.filter(incentive=incentive).exists())
+
+
+class ReservationStateMachineTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        self.prop = create_property(self.host)
+        self.reservations = create_reservations(
+            self.prop, self.guest, 3, start=date.today() + timedelta(days=10), status='pending'
+        )
+        self.ids = [r.pk for r in self.reservations]
+
+    def apply(self, target, ids=None, **kwargs):
+        from .state_machine import ReservationStateMachine
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return ReservationStateMachine.apply(self.ids if ids is None else ids, target, **kwargs)
+
+    def rollups(self):
+        from .models import HostEarningsRollup
+
+        return {
+            r.granularity: (r.gross_earnings, r.net_earnings, r.bookings_count)
+            for r in HostEarningsRollup.objects.filter(host=self.host)
+        }
+
+    def test_illegal_transitions_are_rejected(self):
+        from .state_machine import InvalidTransition, ReservationStateMachine
+
+        applied, errors = self.apply('completed')
+        self.assertEqual(applied, [])
+        self.assertEqual(errors[self.ids[0]], 'Cannot change status from pending to completed')
+        self.assertFalse(Reservation.objects.exclude(status='pending').exists())
+
+        with self.assertRaises(InvalidTransition):
+            ReservationStateMachine.apply(self.ids, 'archived')
+        self.apply('declined', ids=self.ids[:1])
+        with self.assertRaises(InvalidTransition):
+            ReservationStateMachine.transition(Reservation.objects.get(pk=self.ids[0]), 'approved')
+
+    def test_other_hosts_reservations_are_not_found(self):
+        other = User.objects.create_user(name='Other', email='other@example.com', password='x')
+        applied, errors = self.apply('approved', host=other)
+        self.assertEqual(applied, [])
+        self.assertEqual(set(errors.values()), {'Reservation not found'})
+
+    def test_approve_records_earnings_rollups_reminders_and_analytics(self):
+        from messaging.models import AutomatedReminder
+        from .models import HostEarnings, PropertyAnalytics
+
+        applied, errors = self.apply('approved')
+        self.assertEqual((len(applied), errors), (3, {}))
+        self.assertEqual(Reservation.objects.filter(status='approved').count(), 3)
+
+        earnings = HostEarnings.objects.filter(reservation__in=self.ids)
+        self.assertEqual(earnings.count(), 3)
+        self.assertEqual(earnings.first().net_earnings, Decimal('180.00'))
+        self.assertEqual(self.rollups(), {
+            'day': (Decimal('600.00'), Decimal('540.00'), 3),
+            'month': (Decimal('600.00'), Decimal('540.00'), 3),
+        })
+        self.assertEqual(
+            set(AutomatedReminder.objects.filter(reservation_id=self.ids[0]).values_list('reminder_type', flat=True)),
+            {'check_in_24h', 'check_in_2h', 'check_out_24h', 'check_out_2h', 'payment_due_3d', 'payment_due_1d'}
+        )
+        analytics = PropertyAnalytics.objects.get(property=self.prop)
+        self.assertEqual((analytics.successful_bookings, analytics.total_earnings), (3, Decimal('540.00')))
+
+    def test_cancel_after_approve_reverses_earnings_and_rollups(self):
+        from messaging.models import AutomatedReminder
+        from .models import HostEarnings, PropertyAnalytics
+
+        self.apply('approved')
+        applied, _ = self.apply('cancelled', ids=self.ids[:1], actor=self.guest)
+        self.assertEqual(len(applied), 1)
+
+        self.assertFalse(HostEarnings.objects.filter(reservation_id=self.ids[0]).exists())
+        self.assertEqual(HostEarnings.objects.filter(reservation__in=self.ids).count(), 2)
+        self.assertEqual(self.rollups()['month'], (Decimal('400.00'), Decimal('360.00'), 2))
+        self.assertFalse(AutomatedReminder.objects.filter(reservation_id=self.ids[0]).exists())
+        analytics = PropertyAnalytics.objects.get(property=self.prop)
+        self.assertEqual((analytics.successful_bookings, analytics.total_earnings), (2, Decimal('360.00')))
+
+    def test_status_changes_with_one_update_under_row_locks(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.apply('declined')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "booking_reservation"')]
+        self.assertEqual(len(updates), 1)
+        if connection.features.has_select_for_update:
+            self.assertTrue(any(
+                'FOR UPDATE' in q['sql'] and 'FROM "booking_reservation"' in q['sql'] for q in queries
+            ))
+        self.assertEqual(Reservation.objects.filter(status='declined').count(), 3)
+
+
+class BulkReservationStatusTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        self.reservations = create_reservations(
+            create_property(self.host), self.guest, 3, start=date.today() + timedelta(days=10), status='pending'
+        )
+
+    def post(self, reservation_ids, action='approve', user=None):
+        from .views import bulk_update_reservation_status
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return api_call(
+                bulk_update_reservation_status, user or self.host, 'post', '/api/booking/reservations/bulk-status/',
+                {'reservation_ids': reservation_ids, 'action': action}
+            )
+
+    def test_reports_a_result_per_id_with_mixed_outcomes(self):
+        declined, pending, approvable = self.reservations
+        Reservation.objects.filter(pk=declined.pk).update(status='declined')
+        other = create_reservations(
+            create_property(self.guest), self.host, 1, start=date.today() + timedelta(days=10), status='pending'
+        )[0]
+
+        response = self.post([str(approvable.pk), str(declined.pk), 'not-a-uuid', str(other.pk)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['failed']), (1, 3))
+        self.assertEqual(response.data['results'], [
+            {'id': str(approvable.pk), 'success': True, 'status': 'approved'},
+            {'id': str(declined.pk), 'success': False, 'error': 'Cannot change status from declined to approved'},
+            {'id': 'not-a-uuid', 'success': False, 'error': 'Invalid reservation id'},
+            {'id': str(other.pk), 'success': False, 'error': 'Reservation not found'},
+        ])
+        self.assertEqual(Reservation.objects.get(pk=pending.pk).status, 'pending')
+        self.assertEqual(Reservation.objects.get(pk=other.pk).status, 'pending')
+
+    def test_same_id_in_another_case_is_processed_once(self):
+        pk = self.reservations[0].pk
+        response = self.post([str(pk), str(pk).upper(), pk.hex])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [{'id': str(pk), 'success': True, 'status': 'approved'}])
+
+    def test_limits_ids_per_request(self):
+        from .views import MAX_BULK_RESERVATIONS
+
+        ids = [str(uuid.uuid4()) for _ in range(MAX_BULK_RESERVATIONS)]
+        self.assertEqual(self.post(ids).status_code, 200)
+        self.assertEqual(self.post(ids + [str(uuid.uuid4())]).status_code, 400)
+        self.assertEqual(self.post([]).status_code, 400)
+        self.assertEqual(self.post([str(self.reservations[0].pk)], action='complete').status_code, 400)
+
+
+class CompleteReservationsTests(TestCase):
+    def setUp(self):
+        from .models import HostEarnings
+        from .state_machine import ReservationStateMachine
+
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        prop = create_property(host)
+        past = date.today() - timedelta(days=30)
+        self.finished = create_reservations(prop, guest, 3, start=past)
+        self.upcoming = create_reservations(prop, guest, 1, start=date.today() + timedelta(days=5))
+        self.in_progress = create_reservations(prop, guest, 1, start=date.today() - timedelta(days=1))
+        self.not_approved = (
+            create_reservations(prop, guest, 1, start=past, status='pending')
+            + create_reservations(prop, guest, 1, start=past, status='cancelled')
+        )
+        HostEarnings.objects.bulk_create([
+            ReservationStateMachine.build_earnings(r) for r in self.finished + self.upcoming + self.in_progress
+        ])
+
+    def run_command(self):
+        from django.core.management import call_command
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('complete_reservations', '--batch-size', '2', stdout=io.StringIO())
+
+    def statuses(self, reservations):
+        return list(Reservation.objects.filter(pk__in=[r.pk for r in reservations]).values_list('status', flat=True))
+
+    def test_completes_only_approved_stays_past_checkout(self):
+        self.run_command()
+        self.assertEqual(self.statuses(self.finished), ['completed'] * 3)
+        self.assertEqual(self.statuses(self.upcoming + self.in_progress), ['approved'] * 2)
+        self.assertEqual(sorted(self.statuses(self.not_approved)), ['cancelled', 'pending'])
+
+    def test_payouts_move_to_processing_once(self):
+        from messaging.models import Notification
+        from .models import HostEarnings
+
+        self.run_command()
+        finished = HostEarnings.objects.filter(reservation__in=self.finished)
+        self.assertEqual(set(finished.values_list('payout_status', flat=True)), {'processing'})
+        self.assertEqual(
+            set(HostEarnings.objects.exclude(reservation__in=self.finished).values_list('payout_status', flat=True)),
+            {'pending'}
+        )
+        notifications = Notification.objects.count()
+        self.assertGreater(notifications, 0)
+
+        # A payout that moved on is left alone, and nothing is completed or notified twice
+        finished.filter(reservation=self.finished[0]).update(payout_status='paid')
+        self.run_command()
+        self.assertEqual(finished.get(reservation=self.finished[0]).payout_status, 'paid')
+        self.assertEqual(finished.filter(payout_status='processing').count(), 2)
+        self.assertEqual(Notification.objects.count(), notifications)
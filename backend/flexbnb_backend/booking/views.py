@@ -3,15 +3,21 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.response import Response
 from django.db.models import Sum, Avg, Count, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from datetime import datetime, timedelta
+import uuid
 from useraccount.auth import ClerkAuthentication
 from .models import (
     Reservation, 
     HostEarnings, 
     HostMessage, 
     PropertyAnalytics, 
-    PropertyReview
+    PropertyReview,
+    Offer,
+    Invoice
 )
 from .serializers import (
     ReservationSerializer,
@@ -19,11 +25,53 @@ from .serializers import (
     HostMessageSerializer,
     PropertyAnalyticsSerializer,
     PropertyReviewSerializer,
-    HostDashboardStatsSerializer
+    HostDashboardStatsSerializer,
+    GuestDashboardStatsSerializer,
+    OfferSerializer,
+    InvoiceSerializer,
+    WishlistSerializer
+)
+from .analytics_service import PropertyAnalyticsService
+from .dashboard_service import HostDashboardService
+from .guest_trips_service import GuestTripsService
+from .earnings_rollup_service import EarningsRollupService
+from .pagination import cursor_page, page_size_param
+from .pricing import PricingEngine, pricing_setting, to_money
+from .state_machine import ReservationStateMachine
+from .exports import (
+    EXPORT_FORMATS,
+    RESERVATION_EXPORT_FIELDS,
+    EARNINGS_EXPORT_FIELDS,
+    export_response
 )
 from property.models import Property
 from decimal import Decimal
 from useraccount.models import Wishlist
+from sustainability.models import EcoIncentiveUsage
+
+
+# Columns ReservationSerializer reads, for .only() on list endpoints
+RESERVATION_LIST_FIELDS = [
+    'id', 'check_in_date', 'check_out_date', 'check_in_time', 'check_out_time',
+    'guests_count', 'total_price', 'booking_fee', 'host_earnings',
+    'status', 'special_requests', 'created_at', 'updated_at',
+    'property__id', 'property__title', 'property__image', 'property__price_per_night', 'property__category',
+    'guest__id', 'guest__email', 'guest__name',
+    'host__id', 'host__email', 'host__name',
+]
+
+
+def _date_range_params(request):
+    """Parse ?start_date= and ?end_date= (YYYY-MM-DD). Raises ValueError on bad input."""
+    parsed = []
+    for name in ('start_date', 'end_date'):
+        value = request.query_params.get(name)
+        day = parse_date(value) if value else None
+        if value and day is None:
+            raise ValueError(f'Invalid {name}: {value}')
+        parsed.append(day)
+    return tuple(parsed)
+
 
 @api_view(['POST'])
 @authentication_classes([ClerkAuthentication])
@@ -94,6 +142,7 @@ def create_reservation(request):
         total_price = Decimal('0')
         booking_fee = Decimal('0')
         host_earnings = Decimal('0')
+        quote = None
 
         if use_hourly and prop.is_hourly_booking and selected_start_time and selected_end_time and prop.price_per_hour:
             # Hourly price calculation to nearest minute
@@ -108,33 +157,54 @@ def create_reservation(request):
             except Exception:
                 total_price = Decimal(prop.price_per_night)
         else:
-            # Nightly booking: days difference
+            # Nightly booking: per-night price vector with offers, seasonal rules and incentives
             try:
-                nights = (timezone.datetime.fromisoformat(check_out_date_str) - timezone.datetime.fromisoformat(check_in_date_str)).days
-                nights = max(nights, 1)
-            except Exception:
-                nights = 1
-            total_price = Decimal(prop.price_per_night) * Decimal(nights)
-
-        # Platform fee 10%
-        booking_fee = total_price * Decimal('0.10')
+                check_in = parse_date(check_in_date_str)
+                check_out = parse_date(check_out_date_str)
+            except ValueError:
+                check_in = check_out = None
+            if not check_in or not check_out:
+                return Response({'error': 'startDate and endDate must be valid dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+            if check_out < check_in:
+                return Response({'error': 'endDate must not be before startDate'}, status=status.HTTP_400_BAD_REQUEST)
+            max_nights = pricing_setting('MAX_NIGHTS')
+            if (check_out - check_in).days > max_nights:
+                return Response({'error': f'Stays longer than {max_nights} nights cannot be booked'}, status=status.HTTP_400_BAD_REQUEST)
+            # A same-day booking is charged as one night
+            quote = PricingEngine.quote(prop, check_in, max(check_out, check_in + timedelta(days=1)), user=guest)
+            total_price = quote['total_price']
+
+        if quote:
+            booking_fee = quote['booking_fee']
+        else:
+            booking_fee = to_money(total_price * Decimal(str(pricing_setting('PLATFORM_FEE_RATE'))))
         host_earnings = total_price - booking_fee
 
-        reservation = Reservation.objects.create(
-            property=prop,
-            guest=guest,
-            host=host,
-            check_in_date=check_in_date_str,
-            check_out_date=check_out_date_str,
-            guests_count=guests_count,
-            total_price=total_price,
-            booking_fee=booking_fee,
-            host_earnings=host_earnings,
-            status='pending',
-            special_requests=data.get('specialRequests', ''),
-            check_in_time=selected_start_time if use_hourly else None,
-            check_out_time=selected_end_time if use_hourly else None,
-        )
+        with transaction.atomic():
+            reservation = Reservation.objects.create(
+                property=prop,
+                guest=guest,
+                host=host,
+                check_in_date=check_in_date_str,
+                check_out_date=check_out_date_str,
+                guests_count=guests_count,
+                total_price=total_price,
+                booking_fee=booking_fee,
+                host_earnings=host_earnings,
+                status='pending',
+                special_requests=data.get('specialRequests', ''),
+                check_in_time=selected_start_time if use_hourly else None,
+                check_out_time=selected_end_time if use_hourly else None,
+            )
+            PropertyAnalyticsService.record_booking_requests([reservation])
+            if quote and quote['incentive']:
+                EcoIncentiveUsage.objects.create(
+                    user=guest,
+                    incentive_id=quote['incentive']['id'],
+                    property_obj=prop,
+                    amount_saved=quote['incentive']['amount'],
+                    reservation=reservation
+                )
 
         print(f"[CREATE_RESERVATION] Reservation created successfully!")
         print(f"[CREATE_RESERVATION] Reservation ID: {reservation.id}")
@@ -159,55 +229,43 @@ def create_reservation(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.AllowAny])
+def price_quote(request):
+    """Nightly price breakdown and total for ?property_id=&check_in=&check_out="""
+    try:
+        check_in = parse_date(request.query_params.get('check_in') or '')
+        check_out = parse_date(request.query_params.get('check_out') or '')
+    except ValueError:
+        check_in = check_out = None
+    if not check_in or not check_out or check_out <= check_in:
+        return Response(
+            {'error': 'check_in and check_out (YYYY-MM-DD) are required, check_out after check_in'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    max_nights = pricing_setting('MAX_NIGHTS')
+    if (check_out - check_in).days > max_nights:
+        return Response(
+            {'error': f'Stays longer than {max_nights} nights cannot be quoted'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        prop = Property.objects.get(id=request.query_params.get('property_id'))
+    except (Property.DoesNotExist, ValidationError):
+        return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    user = request.user if request.user.is_authenticated else None
+    return Response(PricingEngine.quote(prop, check_in, check_out, user=user))
+
+
 @api_view(['GET'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def host_dashboard_stats(request):
     """Get comprehensive dashboard statistics for the host"""
-    user = request.user
-    
-    # Get all properties for this host
-    host_properties = Property.objects.filter(Host=user)
-    
-    # Calculate stats
-    total_properties = host_properties.count()
-    
-    # Reservations stats
-    all_reservations = Reservation.objects.filter(host=user)
-    total_reservations = all_reservations.count()
-    pending_requests = all_reservations.filter(status='pending').count()
-    
-    # Earnings stats
-    earnings = HostEarnings.objects.filter(host=user)
-    total_earnings = earnings.aggregate(total=Sum('net_earnings'))['total'] or 0
-    
-    # This month earnings
-    this_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    this_month_earnings = earnings.filter(
-        created_at__gte=this_month_start
-    ).aggregate(total=Sum('net_earnings'))['total'] or 0
-    
-    # Analytics aggregation
-    analytics = PropertyAnalytics.objects.filter(property__in=host_properties)
-    occupancy_rate = analytics.aggregate(avg_rate=Avg('occupancy_rate'))['avg_rate'] or 0
-    average_rating = analytics.aggregate(avg_rating=Avg('average_rating'))['avg_rating'] or 0
-    
-    # Unread messages
-    unread_messages = HostMessage.objects.filter(
-        receiver=user, 
-        is_read=False
-    ).count()
-    
-    stats_data = {
-        'total_properties': total_properties,
-        'total_reservations': total_reservations,
-        'pending_requests': pending_requests,
-        'total_earnings': total_earnings,
-        'this_month_earnings': this_month_earnings,
-        'occupancy_rate': occupancy_rate,
-        'average_rating': average_rating,
-        'unread_messages': unread_messages
-    }
+    stats_data = HostDashboardService.get_stats(request.user)
     
     serializer = HostDashboardStatsSerializer(stats_data)
     return Response(serializer.data)
@@ -217,87 +275,220 @@ def host_dashboard_stats(request):
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def host_reservations(request):
-    """Get all reservations for the host's properties"""
-    user = request.user
-    status_filter = request.query_params.get('status', None)
+    """
+    Get the host's reservations, newest first, one cursor page at a time.
     
-    print(f"[HOST_RESERVATIONS] User: {user} (ID: {user.id}, Email: {user.email})")
-    print(f"[HOST_RESERVATIONS] Status filter: {status_filter}")
+    Filters: ?status= (comma-separated), ?property_id=, ?start_date= and
+    ?end_date= (check-in date range). Paging: ?page_size= and ?cursor= (the
+    next_cursor of the previous page).
+    """
+    try:
+        start_date, end_date = _date_range_params(request)
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date format. Use YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Get all reservations for this host
-    reservations = Reservation.objects.filter(host=user)
+    reservations = Reservation.objects.filter(host=request.user)
     
-    print(f"[HOST_RESERVATIONS] Total reservations found: {reservations.count()}")
+    status_filter = request.query_params.get('status')
+    if status_filter:
+        reservations = reservations.filter(status__in=status_filter.split(','))
+    property_id = request.query_params.get('property_id')
+    if property_id:
+        try:
+            reservations = reservations.filter(property_id=property_id)
+        except ValidationError:
+            return Response({'error': 'Invalid property_id'}, status=status.HTTP_400_BAD_REQUEST)
+    if start_date:
+        reservations = reservations.filter(check_in_date__gte=start_date)
+    if end_date:
+        reservations = reservations.filter(check_in_date__lte=end_date)
+    
+    reservations = reservations.select_related('property', 'guest', 'host').only(
+        *RESERVATION_LIST_FIELDS
+    )
+    
+    try:
+        page, next_cursor = cursor_page(
+            reservations, request.query_params.get('cursor'), page_size_param(request)
+        )
+    except ValueError:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
     
+    serializer = ReservationSerializer(page, many=True)
+    return Response({
+        'results': serializer.data,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def export_host_reservations(request):
+    """Stream the host's reservations as CSV or NDJSON (?export_format=csv|ndjson)"""
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': 'Invalid export_format. Must be csv or ndjson'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    reservations = Reservation.objects.filter(host=request.user).order_by('-created_at')
+    status_filter = request.query_params.get('status')
     if status_filter:
         reservations = reservations.filter(status=status_filter)
-        print(f"[HOST_RESERVATIONS] After status filter: {reservations.count()}")
     
-    reservations = reservations.order_by('-created_at')[:50]  # Limit to latest 50
+    return export_response(reservations, RESERVATION_EXPORT_FIELDS, export_format, 'reservations')
+
+
+@api_view(['POST'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def update_reservation_status(request, reservation_id):
+    """Approve, decline or cancel a booking request"""
+    new_status = request.data.get('status')
     
-    # Convert to list to ensure it's serializable
-    reservations_list = list(reservations)
-    print(f"[HOST_RESERVATIONS] Returning {len(reservations_list)} reservations")
+    if new_status not in ['approved', 'declined', 'cancelled']:
+        return Response(
+            {'error': 'Invalid status. Must be approved, declined or cancelled'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    serializer = ReservationSerializer(reservations_list, many=True)
-    print(f"[HOST_RESERVATIONS] Serialized data: {len(serializer.data)} items")
+    applied, errors = ReservationStateMachine.apply(
+        [reservation_id], new_status, actor=request.user, host=request.user
+    )
+    if not applied:
+        error = errors[reservation_id]
+        return Response(
+            {'error': error},
+            status=status.HTTP_404_NOT_FOUND if error == 'Reservation not found' else status.HTTP_400_BAD_REQUEST
+        )
     
+    serializer = ReservationSerializer(applied[0])
     return Response(serializer.data)
 
 
+BULK_STATUS_ACTIONS = {
+    'approve': 'approved',
+    'decline': 'declined',
+    'cancel': 'cancelled',
+}
+MAX_BULK_RESERVATIONS = 200
+
+
 @api_view(['POST'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
-def update_reservation_status(request, reservation_id):
-    """Approve or decline a booking request"""
-    try:
-        reservation = Reservation.objects.get(id=reservation_id, host=request.user)
-        new_status = request.data.get('status')
-        
-        if new_status not in ['approved', 'declined']:
-            return Response(
-                {'error': 'Invalid status. Must be approved or declined'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        reservation.status = new_status
-        reservation.save()
-        
-        # If approved, create earnings record
-        if new_status == 'approved' and not hasattr(reservation, 'earnings_record'):
-            platform_fee = reservation.total_price * 0.1  # 10% platform fee
-            net_earnings = reservation.total_price - platform_fee
-            
-            HostEarnings.objects.create(
-                host=request.user,
-                reservation=reservation,
-                gross_earnings=reservation.total_price,
-                platform_fee=platform_fee,
-                net_earnings=net_earnings
-            )
-        
-        serializer = ReservationSerializer(reservation)
-        return Response(serializer.data)
-        
-    except Reservation.DoesNotExist:
+def bulk_update_reservation_status(request):
+    """
+    Approve, decline or cancel many booking requests at once.
+    
+    Body: {"reservation_ids": [...], "action": "approve" | "decline" | "cancel"}.
+    Returns a result per id; one bad id does not block the others.
+    """
+    action = request.data.get('action')
+    reservation_ids = request.data.get('reservation_ids')
+    
+    if action not in BULK_STATUS_ACTIONS:
         return Response(
-            {'error': 'Reservation not found'}, 
-            status=status.HTTP_404_NOT_FOUND
+            {'error': 'Invalid action. Must be approve, decline or cancel'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not isinstance(reservation_ids, list) or not reservation_ids:
+        return Response({'error': 'reservation_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(reservation_ids) > MAX_BULK_RESERVATIONS:
+        return Response(
+            {'error': f'At most {MAX_BULK_RESERVATIONS} reservations per request'},
+            status=status.HTTP_400_BAD_REQUEST
         )
+    
+    # Parse and de-duplicate ids, keeping the caller's order; the same UUID
+    # in another case or format is one id. Unparseable ids map to None.
+    parsed = {}
+    for raw_id in reservation_ids:
+        try:
+            pk = uuid.UUID(str(raw_id))
+        except ValueError:
+            parsed.setdefault(str(raw_id), None)
+        else:
+            parsed.setdefault(str(pk), pk)
+    
+    applied, errors = ReservationStateMachine.apply(
+        [pk for pk in parsed.values() if pk is not None],
+        BULK_STATUS_ACTIONS[action],
+        actor=request.user,
+        host=request.user
+    )
+    applied_by_id = {r.pk: r for r in applied}
+    
+    results = []
+    for raw_id, pk in parsed.items():
+        if pk in applied_by_id:
+            results.append({'id': str(pk), 'success': True, 'status': applied_by_id[pk].status})
+        else:
+            error = errors.get(pk, 'Invalid reservation id')
+            results.append({'id': raw_id, 'success': False, 'error': error})
+    
+    return Response({
+        'action': action,
+        'updated': len(applied),
+        'failed': len(results) - len(applied),
+        'results': results,
+    })
 
 
 @api_view(['GET'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def host_earnings(request):
-    """Get earnings and financial reports for the host"""
-    user = request.user
+    """
+    Get earnings and financial reports for the host.
     
-    earnings = HostEarnings.objects.filter(host=user).order_by('-created_at')
+    With ?granularity=day|month, returns per-period totals from the earnings
+    rollup table instead of individual earnings records.
+    """
+    user = request.user
     
     # Filter by date range if provided
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
+    granularity = request.query_params.get('granularity')
+    
+    if granularity:
+        if granularity not in EarningsRollupService.GRANULARITIES:
+            return Response(
+                {'error': 'Invalid granularity. Must be day or month'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start, end = _date_range_params(request)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            series = EarningsRollupService.series(
+                user, granularity, start, end, property_id=request.query_params.get('property_id')
+            )
+        except ValidationError:
+            return Response({'error': 'Invalid property_id'}, status=status.HTTP_400_BAD_REQUEST)
+        totals = {
+            field: sum((row[field] for row in series), 0)
+            for field in ('gross_earnings', 'platform_fee', 'net_earnings', 'bookings_count')
+        }
+        return Response({
+            'granularity': granularity,
+            'results': series,
+            'totals': totals,
+        })
+    
+    earnings = HostEarnings.objects.filter(host=user).order_by('-created_at')
     
     if start_date:
         earnings = earnings.filter(created_at__date__gte=start_date)
@@ -308,6 +499,35 @@ def host_earnings(request):
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def export_host_earnings(request):
+    """Stream the host's earnings and payouts as CSV or NDJSON (?export_format=csv|ndjson)"""
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': 'Invalid export_format. Must be csv or ndjson'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        start_date, end_date = _date_range_params(request)
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date format. Use YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    earnings = HostEarnings.objects.filter(host=request.user).order_by('-created_at')
+    if start_date:
+        earnings = earnings.filter(created_at__date__gte=start_date)
+    if end_date:
+        earnings = earnings.filter(created_at__date__lte=end_date)
+    
+    return export_response(earnings, EARNINGS_EXPORT_FIELDS, export_format, 'earnings')
+
+
 @api_view(['GET'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
@@ -319,9 +539,10 @@ def host_messages(request):
         Q(sender=user) | Q(receiver=user)
     ).order_by('-created_at')
     
-    # Mark messages as read if they're received by current user
-    unread_messages = messages.filter(receiver=user, is_read=False)
-    unread_messages.update(is_read=True)
+    # Mark messages as read if they're received by current user.
+    # update() sends no post_save, so drop the cached unread count here.
+    if messages.filter(receiver=user, is_read=False).update(is_read=True):
+        HostDashboardService.invalidate(user.id)
     
     serializer = HostMessageSerializer(messages, many=True)
     return Response(serializer.data)
@@ -388,18 +609,19 @@ def property_reviews(request):
 @permission_classes([permissions.IsAuthenticated])
 def guest_dashboard_stats(request):
     user = request.user
-    reservations = Reservation.objects.filter(guest=user)
-    total_reservations = reservations.count()
-    upcoming_trips = reservations.filter(check_in_date__gt=timezone.now(), status='approved').count()
-    total_spent = reservations.aggregate(total=Sum('total_price'))['total'] or 0
+    reservation_stats = Reservation.objects.filter(guest=user).aggregate(
+        total_reservations=Count('id'),
+        upcoming_trips=Count('id', filter=Q(status='approved', check_in_date__gt=timezone.localdate())),
+        total_spent=Sum('total_price'),
+    )
     wishlist_count = Wishlist.objects.filter(user=user).count()
     unread_messages = HostMessage.objects.filter(receiver=user, is_read=False).count()
     average_rating_given = PropertyReview.objects.filter(guest=user).aggregate(avg=Avg('rating'))['avg'] or 0
 
     stats_data = {
-        'total_reservations': total_reservations,
-        'upcoming_trips': upcoming_trips,
-        'total_spent': total_spent,
+        'total_reservations': reservation_stats['total_reservations'],
+        'upcoming_trips': reservation_stats['upcoming_trips'],
+        'total_spent': reservation_stats['total_spent'] or 0,
         'wishlist_count': wishlist_count,
         'unread_messages': unread_messages,
         'average_rating_given': average_rating_given
@@ -415,6 +637,13 @@ def guest_reservations(request):
     serializer = ReservationSerializer(reservations, many=True)
     return Response(serializer.data)
 
+@api_view(['GET'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+def guest_trips(request):
+    """Get the guest's approved and completed trips split into upcoming, current and past"""
+    return Response(GuestTripsService.get_trips(request.user))
+
 @api_view(['GET'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
@@ -0,0 +1,86 @@
+"""
+Media serving with long-lived caching: immutable hashed files, strong ETags and zero-copy bodies
+"""
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from .storage import digest_from_name, file_digest, media_setting
+
+
+def immutable_prefixes():
+    from property.images import image_setting
+
+    return tuple(directory.rstrip('/') + '/' for directory in (media_setting('DIRECTORY'), image_setting('DIRECTORY')))
+
+
+@lru_cache(maxsize=4096)
+def _hashed_etag(full_path, size, mtime_ns):
+    """Content hash of a name-addressed file; keyed on size and mtime so edits produce a new tag"""
+    with open(full_path, 'rb') as f:
+        return file_digest(iter(lambda: f.read(1024 * 1024), b''))
+
+
+def etag_for(name, full_path, stat):
+    digest = digest_from_name(name)
+    if digest is None and name.startswith(immutable_prefixes()):
+        # Derivatives are named <source hash>-<edge>.<ext>, unique per content and size
+        digest = os.path.splitext(os.path.basename(name))[0]
+    if digest is None:
+        digest = _hashed_etag(full_path, stat.st_size, stat.st_mtime_ns)
+    return f'"{digest}"'
+
+
+def cache_control(name):
+    if name.startswith(immutable_prefixes()):
+        return f"public, max-age={media_setting('IMMUTABLE_MAX_AGE')}, immutable"
+    return f"public, max-age={media_setting('MAX_AGE')}"
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT. Hashed paths (content-addressed uploads and
+    image derivatives) are cacheable for a year as immutable; every response
+    carries a strong ETag so revalidation is a 304. The body goes out through
+    FileResponse, which servers use sendfile for, or is handed to the front
+    server via X-Accel-Redirect / X-Sendfile when MEDIA_STORAGE asks for it.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+
+    name = path.replace(os.sep, '/')
+    etag = etag_for(name, full_path, stat)
+    headers = {'ETag': etag, 'Cache-Control': cache_control(name)}
+
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    elif media_setting('SENDFILE_HEADER'):
+        header = media_setting('SENDFILE_HEADER')
+        response = HttpResponse(content_type=mimetypes.guess_type(full_path)[0] or 'application/octet-stream')
+        if header.lower() == 'x-accel-redirect':
+            response[header] = media_setting('SENDFILE_PREFIX').rstrip('/') + '/' + name
+        else:
+            response[header] = full_path
+    else:
+        response = FileResponse(open(full_path, 'rb'))
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -83,6 +83,36 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Notification outbox (drained by `python manage.py process_notifications`)
+NOTIFICATION_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+    'CONCURRENCY': {'email': 4, 'sms': 2, 'push': 8},
+}
+
+# Pricing rules applied by booking.pricing.PricingEngine
+PRICING = {
+    'PLATFORM_FEE_RATE': '0.10',
+    # Neutral until the reservation sidebar shows the quote, e.g. 1.10 and
+    # [{'start': '06-15', 'end': '08-31', 'multiplier': 1.15}]
+    'WEEKEND_MULTIPLIER': 1.0,
+    'WEEKEND_DAYS': [4, 5],  # Friday and Saturday nights
+    'SEASONS': [],
+    'QUOTE_CACHE_SECONDS': 600,
+    'MAX_NIGHTS': 365,
+}
+
+# Resized copies of property photos rendered by property.images (thumb/card/full, WebP + JPEG)
+IMAGE_DERIVATIVES = {
+    'SIZES': {'thumb': 320, 'card': 800, 'full': 1920},
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': {'webp': 80, 'jpeg': 82},
+    'WORKERS': 2,
+}
+
 REST_AUTH = {
     "USE_JWT": True,
     "JWT_AUTH_HTTPONLY": False
@@ -212,6 +242,20 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/cas (see flexbnb_backend.storage)
+STORAGES = {
+    'default': {'BACKEND': 'flexbnb_backend.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+MEDIA_STORAGE = {
+    'DIRECTORY': 'cas',
+    'IMMUTABLE_MAX_AGE': 60 * 60 * 24 * 365,
+    'MAX_AGE': 60 * 60,
+    'SERVE': os.environ.get('SERVE_MEDIA', '0').lower() in ('1', 'true', 'yes'),
+    'SENDFILE_HEADER': os.environ.get('MEDIA_SENDFILE_HEADER') or None,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,95 @@
+"""
+Content-addressed media storage - uploads are stored once under the SHA-256 of their bytes
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    'DIRECTORY': 'cas',
+    # Cache lifetime for content-addressed files (their bytes can never change)
+    'IMMUTABLE_MAX_AGE': 60 * 60 * 24 * 365,
+    # Cache lifetime for legacy, name-addressed files
+    'MAX_AGE': 60 * 60,
+    # Serve MEDIA_URL from Django even when DEBUG is off (no CDN or web server in front)
+    'SERVE': False,
+    # 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache, lighttpd) to hand the body to the front server
+    'SENDFILE_HEADER': None,
+    # X-Accel-Redirect only: internal location that maps to MEDIA_ROOT
+    'SENDFILE_PREFIX': '/protected-media/',
+}
+
+HASH_CHARS = 64
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+def media_setting(name):
+    return getattr(settings, 'MEDIA_STORAGE', {}).get(name, DEFAULTS[name])
+
+
+def file_digest(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_name(digest, original_name=''):
+    """cas/ab/cd/<sha256><ext>; the extension is kept so content types still resolve"""
+    ext = os.path.splitext(original_name)[1].lower()
+    if not EXTENSION_RE.match(ext):
+        ext = ''
+    return f"{media_setting('DIRECTORY')}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def digest_from_name(name):
+    """The SHA-256 a content-addressed name was stored under, or None for other names"""
+    directory = media_setting('DIRECTORY').rstrip('/') + '/'
+    if not name.startswith(directory):
+        return None
+    digest = os.path.splitext(os.path.basename(name))[0]
+    if len(digest) == HASH_CHARS and all(c in '0123456789abcdef' for c in digest):
+        return digest
+    return None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that ignores the upload name and stores each distinct
+    file once, at a path derived from its hash. Saving bytes that are already
+    stored writes nothing and returns the existing name, so repeated seeds and
+    re-uploads share one file. Because several rows may point at one file,
+    delete() leaves content-addressed files in place; `dedupe_media --prune`
+    removes the ones nothing references.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content in _save, never from the upload name
+        return name
+
+    def _save(self, name, content):
+        name = content_name(file_digest(content.chunks()), name)
+        if self.exists(name):
+            return name
+
+        # Write under a unique name, then rename into place: concurrent saves of
+        # the same bytes race harmlessly and readers never see a partial file.
+        incoming = super()._save(f"{media_setting('DIRECTORY')}/incoming/{uuid.uuid4().hex}", content)
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(self.path(incoming), full_path)
+        return name
+
+    def delete(self, name):
+        if digest_from_name(name) is not None:
+            logger.debug(f"Keeping shared content-addressed file {name}")
+            return
+        super().delete(name)
@@ -1,7 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from .media_views import serve_media
+from .storage import media_setting
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,5 +14,7 @@ urlpatterns = [
     path('api/sustainability/', include('sustainability.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.DEBUG or media_setting('SERVE'):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Conversation, Message, QuickReplyTemplate, Notification, AutomatedReminder
+from .models import Conversation, Message, QuickReplyTemplate, Notification, AutomatedReminder, NotificationOutbox
 
 
 @admin.register(Conversation)
@@ -7,7 +7,11 @@ class ConversationAdmin(admin.ModelAdmin):
     list_display = ['id', 'property', 'guest', 'host', 'created_at', 'updated_at']
     list_filter = ['created_at', 'is_archived_by_guest', 'is_archived_by_host']
     search_fields = ['property__title', 'guest__email', 'host__email']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = [
+        'id', 'created_at', 'updated_at',
+        'guest_last_read_message', 'host_last_read_message',
+        'guest_unread_count', 'host_unread_count'
+    ]
 
 
 @admin.register(Message)
@@ -36,8 +40,16 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.register(AutomatedReminder)
 class AutomatedReminderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'reservation', 'reminder_type', 'scheduled_for', 'is_sent', 'sent_at']
-    list_filter = ['reminder_type', 'is_sent', 'scheduled_for']
+    list_display = ['id', 'reservation', 'reminder_type', 'scheduled_for', 'is_sent', 'sent_at', 'attempts', 'is_failed']
+    list_filter = ['reminder_type', 'is_sent', 'is_failed', 'scheduled_for']
     search_fields = ['reservation__id']
     readonly_fields = ['id', 'created_at', 'sent_at']
 
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'notification', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    search_fields = ['notification__user__email', 'last_error']
+    readonly_fields = ['id', 'created_at', 'sent_at', 'claim_token', 'claimed_at']
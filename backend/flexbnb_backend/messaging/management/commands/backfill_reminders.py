@@ -0,0 +1,42 @@
+"""
+Management command to create missing reminders for future approved reservations
+Run this with: python manage.py backfill_reminders
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from booking.models import Reservation
+from messaging.reminder_service import ReminderService
+
+
+class Command(BaseCommand):
+    help = 'Create missing automated reminders for all future approved reservations'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Reservations processed per chunk')
+    
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        reservations = Reservation.objects.filter(
+            status='approved',
+            check_out_date__gte=timezone.localdate()
+        ).order_by('pk').only(
+            'pk', 'check_in_date', 'check_out_date', 'check_in_time', 'check_out_time'
+        )
+        
+        last_pk = None
+        processed = 0
+        created = 0
+        while True:
+            # Keyset pagination keeps every chunk query cheap regardless of table size
+            chunk_qs = reservations if last_pk is None else reservations.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:chunk_size])
+            if not chunk:
+                break
+            created += len(ReminderService.create_reminders_for_reservations(chunk))
+            processed += len(chunk)
+            last_pk = chunk[-1].pk
+            self.stdout.write(f'Processed {processed} reservations, created {created} reminders')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Backfill complete: {created} reminders for {processed} reservations')
+        )
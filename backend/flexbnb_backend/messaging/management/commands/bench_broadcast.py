@@ -0,0 +1,73 @@
+"""
+Benchmark NotificationService.broadcast against the per-user notification path
+Run this with: python manage.py bench_broadcast --recipients 100000 [--email]
+
+Synthetic users are created inside a transaction that is rolled back at the end,
+and broadcast emails are only queued in the outbox, so nothing is persisted or sent.
+"""
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from messaging.models import Notification
+from messaging.notification_service import NotificationService
+from useraccount.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk notification fan-out'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--email', action='store_true', help='Also send (per-user path, locmem backend) or queue (broadcast) emails')
+        parser.add_argument('--baseline-sample', type=int, default=1000,
+                            help='Recipients to time through the per-user path for comparison')
+    
+    def handle(self, *args, **options):
+        recipients = options['recipients']
+        
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), transaction.atomic():
+            password = make_password(None)
+            started = time.perf_counter()
+            User.objects.bulk_create(
+                [User(email=f'broadcast-bench-{i}@example.com', name=f'Guest {i}', password=password)
+                 for i in range(recipients)],
+                batch_size=5000
+            )
+            self.stdout.write(f'Seeded {recipients} users in {time.perf_counter() - started:.2f}s')
+            users = User.objects.filter(email__startswith='broadcast-bench-')
+            
+            sample = list(users[:options['baseline_sample']])
+            started = time.perf_counter()
+            for user in sample:
+                # What a per-user loop did before broadcast(): one INSERT, one render, one SMTP session
+                message = f'Hi {user.name}, our policies changed.'
+                Notification.objects.create(
+                    user=user, notification_type='system', title='Policy update', message=message
+                )
+                if options['email']:
+                    html_content = NotificationService._generate_email_html('system', 'Policy update', message, user)
+                    NotificationService.send_email_notification(user, 'Policy update', message, html_content)
+            per_user = (time.perf_counter() - started) / max(len(sample), 1)
+            self.stdout.write(
+                f'Per-user path: {per_user * 1000:.3f} ms/recipient '
+                f'(~{per_user * recipients:.1f}s projected for {recipients})'
+            )
+            Notification.objects.filter(user__in=users).delete()
+            
+            started = time.perf_counter()
+            stats = NotificationService.broadcast(
+                users, 'system', 'Policy update', 'Hi $name, our policies changed.',
+                send_email=options['email'], chunk_size=options['chunk_size']
+            )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"broadcast(): {stats['notifications']} notifications, {stats['emails_queued']} emails queued "
+                f"in {elapsed:.2f}s ({stats['notifications'] / elapsed:,.0f} recipients/s)"
+            ))
+            
+            transaction.set_rollback(True)
@@ -0,0 +1,39 @@
+"""
+Management command to deliver queued email/SMS/push notifications
+Run this with: python manage.py process_notifications [--loop]
+"""
+from django.core.management.base import BaseCommand
+from messaging.outbox_worker import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = 'Drain the notification outbox, delivering email, SMS and push notifications'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new entries')
+        parser.add_argument('--batch-size', type=int, default=None, help='Entries claimed per batch')
+        parser.add_argument('--idle-sleep', type=float, default=5, help='Seconds to sleep when the outbox is empty')
+    
+    def handle(self, *args, **options):
+        worker = OutboxWorker(batch_size=options['batch_size'])
+        
+        if options['loop']:
+            self.stdout.write(self.style.SUCCESS('Draining notification outbox (Ctrl+C to stop)...'))
+            worker.run_forever(idle_sleep=options['idle_sleep'])
+            return
+        
+        self.stdout.write(self.style.SUCCESS('Processing notification outbox...'))
+        
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        while True:
+            stats = worker.run_once()
+            if not stats['claimed']:
+                break
+            for key in totals:
+                totals[key] += stats[key]
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {totals['sent']}, retrying {totals['retried']}, failed {totals['failed']}"
+            )
+        )
@@ -1,6 +1,7 @@
 """
 Management command to process automated reminders
 Run this with: python manage.py process_reminders
+Long-running scheduler: python manage.py process_reminders --loop --workers 4
 """
 from django.core.management.base import BaseCommand
 from messaging.reminder_service import ReminderService
@@ -9,12 +10,39 @@ from messaging.reminder_service import ReminderService
 class Command(BaseCommand):
     help = 'Process automated reminders that are due to be sent'
     
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Run as a long-lived scheduler')
+        parser.add_argument('--batch-size', type=int, default=100, help='Reminders claimed per batch')
+        parser.add_argument('--workers', type=int, default=1, help='Concurrent senders per batch')
+        parser.add_argument('--max-sleep', type=float, default=60, help='Longest idle sleep in seconds (scheduler mode)')
+        parser.add_argument('--report-every', type=float, default=60, help='Seconds between metrics reports (scheduler mode)')
+    
     def handle(self, *args, **options):
+        if options['loop']:
+            self.stdout.write(self.style.SUCCESS('Starting reminder scheduler (Ctrl+C to stop)...'))
+            ReminderService.run_scheduler(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                max_sleep=options['max_sleep'],
+                report_every=options['report_every'],
+                report=self.report,
+            )
+            return
+        
         self.stdout.write(self.style.SUCCESS('Processing reminders...'))
         
-        sent_count = ReminderService.process_due_reminders()
+        sent_count = ReminderService.process_due_reminders(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        )
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully processed {sent_count} reminders')
         )
-
+    
+    def report(self, metrics):
+        self.stdout.write(
+            f"sent={metrics['sent']} failed={metrics['failed']} "
+            f"throughput={metrics['per_second']}/s "
+            f"lag avg={metrics['avg_lag_seconds']}s max={metrics['max_lag_seconds']}s"
+        )
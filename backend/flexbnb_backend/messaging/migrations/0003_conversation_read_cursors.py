@@ -0,0 +1,55 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+
+    def unread_for(participant):
+        unread = Message.objects.filter(
+            conversation=OuterRef('pk'),
+            receiver=OuterRef(participant),
+            is_read=False
+        ).values('conversation').annotate(c=Count('id')).values('c')
+        return Coalesce(Subquery(unread, output_field=IntegerField()), Value(0))
+
+    Conversation.objects.update(
+        guest_unread_count=unread_for('guest'),
+        host_unread_count=unread_for('host'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_message_sender_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='guest_last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='guest_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='host_last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='host_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
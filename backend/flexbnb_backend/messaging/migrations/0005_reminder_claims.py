@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_alter_propertyreview_property'),
+        ('messaging', '0004_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='claim_token',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='automatedreminder',
+            index=models.Index(fields=['is_sent', 'scheduled_for'], name='messaging_a_is_sent_ef0c5e_idx'),
+        ),
+    ]
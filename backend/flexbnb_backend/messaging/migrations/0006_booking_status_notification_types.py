@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_reminder_claims'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('new_message', 'New Message'), ('booking_request', 'Booking Request'), ('booking_confirmed', 'Booking Confirmed'), ('booking_declined', 'Booking Declined'), ('booking_cancelled', 'Booking Cancelled'), ('check_in_reminder', 'Check-in Reminder'), ('check_out_reminder', 'Check-out Reminder'), ('payment_due', 'Payment Due'), ('payment_received', 'Payment Received'), ('review_request', 'Review Request'), ('system', 'System Notification')], max_length=30),
+        ),
+    ]
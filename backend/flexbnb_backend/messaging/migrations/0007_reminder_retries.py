@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_booking_status_notification_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='is_failed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='automatedreminder',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:21
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def delete_duplicates(apps, schema_editor):
+    """Keep one reminder per reservation and type, preferring one already sent, so the constraint can be added"""
+    AutomatedReminder = apps.get_model('messaging', 'AutomatedReminder')
+    duplicated = (
+        AutomatedReminder.objects.values('reservation_id', 'reminder_type').annotate(rows=Count('id'))
+        .filter(rows__gt=1).values_list('reservation_id', 'reminder_type')
+    )
+    for reservation_id, reminder_type in list(duplicated):
+        keep, *extra = AutomatedReminder.objects.filter(
+            reservation_id=reservation_id, reminder_type=reminder_type
+        ).order_by('-is_sent', 'created_at')
+        AutomatedReminder.objects.filter(pk__in=[row.pk for row in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_reservation_host_created_index'),
+        ('messaging', '0007_reminder_retries'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='automatedreminder',
+            constraint=models.UniqueConstraint(fields=('reservation', 'reminder_type'), name='unique_reminder_per_reservation'),
+        ),
+    ]
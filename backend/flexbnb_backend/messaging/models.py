@@ -19,6 +19,12 @@ class Conversation(models.Model):
     is_archived_by_guest = models.BooleanField(default=False)
     is_archived_by_host = models.BooleanField(default=False)
     
+    # Read cursors ("read up to message X") and denormalized unread counters per participant
+    guest_last_read_message = models.ForeignKey('Message', related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    host_last_read_message = models.ForeignKey('Message', related_name='+', on_delete=models.SET_NULL, null=True, blank=True)
+    guest_unread_count = models.PositiveIntegerField(default=0)
+    host_unread_count = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -28,6 +34,19 @@ class Conversation(models.Model):
     
     def __str__(self):
         return f"Conversation: {self.guest.email} <-> {self.host.email} about {self.property.title}"
+    
+    def participant_role(self, user):
+        """Return 'guest' or 'host' for a participant, None for anyone else"""
+        if user.id == self.guest_id:
+            return 'guest'
+        if user.id == self.host_id:
+            return 'host'
+        return None
+    
+    def unread_count_for(self, user):
+        """Unread messages for a participant, read from the denormalized counter"""
+        role = self.participant_role(user)
+        return getattr(self, f'{role}_unread_count') if role else 0
 
 
 class Message(models.Model):
@@ -61,11 +80,11 @@ class Message(models.Model):
         return f"Message from {self.sender.email} ({self.sender_role}) at {self.created_at}"
     
     def mark_as_read(self):
-        """Mark message as read"""
+        """Mark message (and everything received before it) as read"""
+        from .read_receipt_service import ReadReceiptService
         if not self.is_read:
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save()
+            ReadReceiptService.mark_read_up_to(self.conversation, self.receiver, self)
+            self.refresh_from_db(fields=['is_read', 'read_at'])
 
 
 class QuickReplyTemplate(models.Model):
@@ -116,6 +135,8 @@ class Notification(models.Model):
         ('new_message', 'New Message'),
         ('booking_request', 'Booking Request'),
         ('booking_confirmed', 'Booking Confirmed'),
+        ('booking_declined', 'Booking Declined'),
+        ('booking_cancelled', 'Booking Cancelled'),
         ('check_in_reminder', 'Check-in Reminder'),
         ('check_out_reminder', 'Check-out Reminder'),
         ('payment_due', 'Payment Due'),
@@ -194,11 +215,68 @@ class AutomatedReminder(models.Model):
     # Notification created
     notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, null=True, blank=True)
     
+    # Scheduler lease, so concurrent schedulers never send the same reminder twice
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Failed sends are retried with backoff until the scheduler gives up on them
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    is_failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['scheduled_for']
+        indexes = [
+            models.Index(fields=['is_sent', 'scheduled_for']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'reminder_type'], name='unique_reminder_per_reservation'),
+        ]
     
     def __str__(self):
         return f"{self.reminder_type} for Reservation {self.reservation.id}"
 
+
+
+class NotificationOutbox(models.Model):
+    """Durable queue of pending email/SMS/push deliveries, drained by process_notifications"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+        ('push', 'Push Notification'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    notification = models.ForeignKey(Notification, related_name='outbox_entries', on_delete=models.CASCADE)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    # Worker lease
+    claim_token = models.UUIDField(null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel} delivery for {self.notification_id} ({self.status})"
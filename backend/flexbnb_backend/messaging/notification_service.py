@@ -1,11 +1,14 @@
 """
 Notification Service for Email, SMS, and Push Notifications
 """
+from functools import lru_cache
+from itertools import islice
+from string import Template
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-from .models import Notification
+from .models import Notification, NotificationOutbox
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,32 +18,38 @@ class NotificationService:
     """Service for sending notifications via multiple channels"""
     
     @staticmethod
-    def send_email_notification(user, title, message, html_content=None):
+    def deliver_email(user, title, message, html_content=None, connection=None):
+        """Send an email, raising on failure. Pass `connection` to reuse an open SMTP session."""
+        subject = title
+        from_email = settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@flexbnb.com'
+        recipient_list = [user.email]
+        
+        if html_content:
+            text_content = strip_tags(html_content)
+            send_mail(
+                subject,
+                text_content,
+                from_email,
+                recipient_list,
+                html_message=html_content,
+                fail_silently=False,
+                connection=connection,
+            )
+        else:
+            send_mail(
+                subject,
+                message,
+                from_email,
+                recipient_list,
+                fail_silently=False,
+                connection=connection,
+            )
+    
+    @classmethod
+    def send_email_notification(cls, user, title, message, html_content=None, connection=None):
         """Send email notification"""
         try:
-            subject = title
-            from_email = settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@flexbnb.com'
-            recipient_list = [user.email]
-            
-            if html_content:
-                text_content = strip_tags(html_content)
-                send_mail(
-                    subject,
-                    text_content,
-                    from_email,
-                    recipient_list,
-                    html_message=html_content,
-                    fail_silently=False,
-                )
-            else:
-                send_mail(
-                    subject,
-                    message,
-                    from_email,
-                    recipient_list,
-                    fail_silently=False,
-                )
-            
+            cls.deliver_email(user, title, message, html_content, connection=connection)
             logger.info(f"Email sent to {user.email}: {title}")
             return True
         except Exception as e:
@@ -93,9 +102,13 @@ class NotificationService:
     def create_and_send_notification(cls, user, notification_type, title, message, 
                                      conversation=None, reservation=None, 
                                      send_email=False, send_sms=False, send_push=False):
-        """Create notification and send via specified channels"""
-        from django.utils import timezone
+        """
+        Create notification and queue delivery via specified channels.
         
+        Email/SMS/push are written to the outbox and sent by the
+        process_notifications worker, so a slow provider never blocks the
+        request. `email_sent`/`sms_sent`/`push_sent` flip once delivered.
+        """
         # Create in-app notification
         notification = Notification.objects.create(
             user=user,
@@ -107,42 +120,106 @@ class NotificationService:
             delivery_method='in_app'
         )
         
-        # Send email if requested
-        if send_email:
-            html_content = cls._generate_email_html(notification_type, title, message, user)
-            if cls.send_email_notification(user, title, message, html_content):
-                notification.email_sent = True
-                notification.email_sent_at = timezone.now()
+        channels = [
+            channel for channel, requested in (
+                ('email', send_email),
+                ('sms', send_sms),
+                ('push', send_push),
+            ) if requested
+        ]
+        cls.enqueue([notification], channels)
+        return notification
+    
+    @staticmethod
+    def enqueue(notifications, channels):
+        """Add outbox entries for each notification on each channel"""
+        if not channels:
+            return []
+        return NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(notification=notification, channel=channel)
+            for notification in notifications
+            for channel in channels
+        ])
+    
+    @classmethod
+    def deliver(cls, notification, channel, connection=None):
+        """Deliver a notification on one channel, raising on failure (used by the outbox worker)"""
+        user = notification.user
+        if channel == 'email':
+            html_content = cls._generate_email_html(notification.notification_type, notification.title, notification.message, user)
+            cls.deliver_email(user, notification.title, notification.message, html_content, connection=connection)
+        elif channel == 'sms':
+            if not cls.send_sms_notification(user, notification.message):
+                raise RuntimeError('SMS provider rejected the message')
+        elif channel == 'push':
+            if not cls.send_push_notification(user, notification.title, notification.message):
+                raise RuntimeError('Push provider rejected the message')
+        else:
+            raise ValueError(f"Unknown channel: {channel}")
+    
+    @classmethod
+    def broadcast(cls, users_qs, notification_type, title, message, send_email=False, chunk_size=1000):
+        """
+        Create the same notification for many users.
+        
+        Recipients are streamed from `users_qs` in chunks; each chunk is one
+        bulk_create. `$name` in the title or message is substituted per user.
+        With `send_email`, each chunk's email deliveries are queued in the
+        outbox with one more bulk_create, and the process_notifications worker
+        sends them with its retries and backoff.
         
-        # Send SMS if requested
-        if send_sms:
-            if cls.send_sms_notification(user, message):
-                notification.sms_sent = True
-                notification.sms_sent_at = timezone.now()
+        Meant for management commands and background jobs, not request handlers.
+        Returns a dict with notification and queued email counts.
+        """
+        stats = {'notifications': 0, 'emails_queued': 0}
+        title_template = Template(title)
+        message_template = Template(message)
         
-        # Send push if requested
-        if send_push:
-            if cls.send_push_notification(user, title, message):
-                notification.push_sent = True
-                notification.push_sent_at = timezone.now()
+        users = users_qs.only('id', 'email', 'name').order_by().iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(users, chunk_size))
+            if not chunk:
+                break
+            
+            notifications = []
+            for user in chunk:
+                substitutions = {'name': user.name or user.email}
+                notifications.append(Notification(
+                    user=user,
+                    notification_type=notification_type,
+                    title=title_template.safe_substitute(substitutions)[:200],
+                    message=message_template.safe_substitute(substitutions),
+                    delivery_method='in_app'
+                ))
+            Notification.objects.bulk_create(notifications, batch_size=chunk_size)
+            stats['notifications'] += len(notifications)
+            
+            if send_email:
+                stats['emails_queued'] += len(cls.enqueue(notifications, ['email']))
         
-        notification.save()
-        return notification
+        logger.info(f"Broadcast {notification_type}: {stats}")
+        return stats
     
-    @staticmethod
-    def _generate_email_html(notification_type, title, message, user):
+    @classmethod
+    def _generate_email_html(cls, notification_type, title, message, user):
         """Generate HTML content for email"""
-        html_template = f"""
+        return cls._email_template().safe_substitute(title=title, message=message)
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _email_template():
+        """Email layout with $title/$message placeholders, shared by every notification type, built once"""
+        html_template = """
         <!DOCTYPE html>
         <html>
         <head>
             <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #3b82f6; color: white; padding: 20px; text-align: center; }}
-                .content {{ background-color: #f9fafb; padding: 30px; border-radius: 8px; margin-top: 20px; }}
-                .button {{ display: inline-block; padding: 12px 24px; background-color: #3b82f6; color: white; text-decoration: none; border-radius: 6px; margin-top: 20px; }}
-                .footer {{ text-align: center; margin-top: 30px; color: #6b7280; font-size: 14px; }}
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background-color: #3b82f6; color: white; padding: 20px; text-align: center; }
+                .content { background-color: #f9fafb; padding: 30px; border-radius: 8px; margin-top: 20px; }
+                .button { display: inline-block; padding: 12px 24px; background-color: #3b82f6; color: white; text-decoration: none; border-radius: 6px; margin-top: 20px; }
+                .footer { text-align: center; margin-top: 30px; color: #6b7280; font-size: 14px; }
             </style>
         </head>
         <body>
@@ -151,8 +228,8 @@ class NotificationService:
                     <h1>FlexBNB</h1>
                 </div>
                 <div class="content">
-                    <h2>{title}</h2>
-                    <p>{message}</p>
+                    <h2>$title</h2>
+                    <p>$message</p>
                     <a href="http://localhost:3000/messages" class="button">View Messages</a>
                 </div>
                 <div class="footer">
@@ -163,7 +240,7 @@ class NotificationService:
         </body>
         </html>
         """
-        return html_template
+        return Template(html_template)
     
     @classmethod
     def send_new_message_notification(cls, message_obj):
@@ -204,24 +281,66 @@ class NotificationService:
             send_push=True
         )
     
+    # Reservation status -> (notification type, title, message, channels)
+    BOOKING_STATUS_NOTIFICATIONS = {
+        'approved': (
+            'booking_confirmed',
+            "Booking confirmed for {title}",
+            "Your booking for {title} from {check_in} to {check_out} has been confirmed!",
+            ['email', 'sms', 'push'],
+        ),
+        'declined': (
+            'booking_declined',
+            "Booking request declined for {title}",
+            "Your booking request for {title} from {check_in} to {check_out} was declined by the host.",
+            ['email', 'push'],
+        ),
+        'cancelled': (
+            'booking_cancelled',
+            "Booking cancelled for {title}",
+            "The booking for {title} from {check_in} to {check_out} has been cancelled.",
+            ['email', 'push'],
+        ),
+        'completed': (
+            'review_request',
+            "How was your stay at {title}?",
+            "Your stay at {title} has ended. Leave a review to help other guests.",
+            ['email'],
+        ),
+    }
+    
+    @classmethod
+    def notify_booking_status(cls, reservations, status, recipients=('guest',)):
+        """
+        Create status-change notifications for many reservations with one
+        bulk insert, and queue their email/SMS/push deliveries in the outbox.
+        `recipients` names the reservation participants to notify.
+        """
+        notification_type, title, message, channels = cls.BOOKING_STATUS_NOTIFICATIONS[status]
+        notifications = []
+        for reservation in reservations:
+            context = {
+                'title': reservation.property.title,
+                'check_in': reservation.check_in_date,
+                'check_out': reservation.check_out_date,
+            }
+            for recipient in recipients:
+                notifications.append(Notification(
+                    user=getattr(reservation, recipient),
+                    notification_type=notification_type,
+                    title=title.format(**context),
+                    message=message.format(**context),
+                    reservation=reservation,
+                    delivery_method='in_app'
+                ))
+        Notification.objects.bulk_create(notifications)
+        cls.enqueue(notifications, channels)
+        return notifications
+    
     @classmethod
     def send_booking_confirmed_notification(cls, reservation):
         """Send notification for confirmed booking"""
-        guest = reservation.guest
-        
-        title = f"Booking confirmed for {reservation.property.title}"
-        message = f"Your booking for {reservation.property.title} from {reservation.check_in_date} to {reservation.check_out_date} has been confirmed!"
-        
-        return cls.create_and_send_notification(
-            user=guest,
-            notification_type='booking_confirmed',
-            title=title,
-            message=message,
-            reservation=reservation,
-            send_email=True,
-            send_sms=True,
-            send_push=True
-        )
+        return cls.notify_booking_status([reservation], 'approved')[0]
     
     @classmethod
     def send_check_in_reminder(cls, reservation, hours_before):
@@ -0,0 +1,204 @@
+"""
+Outbox worker that drains NotificationOutbox and delivers email, SMS and push
+"""
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Notification, NotificationOutbox
+from .notification_service import NotificationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+    'CONCURRENCY': {'email': 4, 'sms': 2, 'push': 8},
+}
+
+
+def outbox_setting(name):
+    return getattr(settings, 'NOTIFICATION_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+class OutboxWorker:
+    """Claims outbox entries in batches and delivers them with per-channel concurrency limits"""
+
+    def __init__(self, batch_size=None, max_attempts=None, concurrency=None):
+        self.batch_size = batch_size or outbox_setting('BATCH_SIZE')
+        self.max_attempts = max_attempts or outbox_setting('MAX_ATTEMPTS')
+        self.concurrency = {**outbox_setting('CONCURRENCY'), **(concurrency or {})}
+
+    def claim_batch(self):
+        """
+        Atomically flip a batch of due entries to 'processing' under a fresh
+        claim token, so parallel workers never deliver the same entry twice.
+        Entries whose lease expired (crashed worker) are released first.
+        """
+        now = timezone.now()
+        self.release_expired(now)
+        claimable = Q(status='pending', next_attempt_at__lte=now)
+
+        ids = list(
+            NotificationOutbox.objects.filter(claimable)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:self.batch_size]
+        )
+        if not ids:
+            return []
+
+        token = uuid.uuid4()
+        NotificationOutbox.objects.filter(claimable, id__in=ids).update(
+            status='processing', claim_token=token, claimed_at=now
+        )
+        return list(
+            NotificationOutbox.objects.filter(claim_token=token)
+            .select_related('notification', 'notification__user')
+        )
+
+    def release_expired(self, now):
+        """
+        Count an expired lease as a failed attempt: the entry goes back to
+        'pending', or to 'failed' once it has used up max_attempts, so an
+        entry that keeps crashing the worker is not retried forever. Clearing
+        the token also stops the stale worker from recording a result.
+        """
+        stale = now - timedelta(seconds=outbox_setting('LEASE_SECONDS'))
+        return NotificationOutbox.objects.filter(status='processing', claimed_at__lt=stale).update(
+            status=Case(
+                When(attempts__gte=self.max_attempts - 1, then=Value('failed')),
+                default=Value('pending'),
+            ),
+            attempts=F('attempts') + 1,
+            next_attempt_at=now,
+            last_error='Lease expired before delivery was recorded',
+            claim_token=None,
+            claimed_at=None,
+        )
+
+    def run_once(self):
+        """Deliver one batch. Returns a dict of sent/retried/failed counts."""
+        entries = self.claim_batch()
+        stats = {'claimed': len(entries), 'sent': 0, 'retried': 0, 'failed': 0}
+        if not entries:
+            return stats
+
+        by_channel = defaultdict(list)
+        for entry in entries:
+            by_channel[entry.channel].append(entry)
+
+        results = []
+        executors = []
+        futures = []
+        try:
+            for channel, channel_entries in by_channel.items():
+                limit = max(1, self.concurrency.get(channel, 1))
+                executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f'outbox-{channel}')
+                executors.append(executor)
+                # One slice per worker thread; each slice reuses a single provider connection
+                for i in range(limit):
+                    chunk = channel_entries[i::limit]
+                    if chunk:
+                        futures.append(executor.submit(self._deliver_chunk, channel, chunk))
+            for future in futures:
+                results.extend(future.result())
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+        self._record_results(results, stats)
+        return stats
+
+    def run_forever(self, idle_sleep=5, stop_after=None):
+        """Drain the outbox continuously, sleeping when there is nothing due"""
+        started = time.monotonic()
+        while stop_after is None or time.monotonic() - started < stop_after:
+            stats = self.run_once()
+            if stats['claimed']:
+                logger.info(f"Outbox batch: {stats}")
+            else:
+                time.sleep(idle_sleep)
+
+    @staticmethod
+    def _deliver_chunk(channel, entries):
+        """Runs in a worker thread; only talks to the provider, never the database"""
+        connection = get_connection() if channel == 'email' else None
+        results = []
+        try:
+            if connection is not None:
+                try:
+                    connection.open()
+                except Exception as e:
+                    return [(entry, f"Could not open connection: {e}") for entry in entries]
+            for entry in entries:
+                try:
+                    NotificationService.deliver(entry.notification, channel, connection=connection)
+                    results.append((entry, None))
+                except Exception as e:
+                    results.append((entry, str(e) or type(e).__name__))
+        finally:
+            if connection is not None:
+                connection.close()
+        return results
+
+    def _record_results(self, results, stats):
+        now = timezone.now()
+        sent_by_channel = defaultdict(list)
+
+        for entry, error in results:
+            if error is None:
+                sent_by_channel[entry.channel, entry.claim_token].append(entry)
+                continue
+
+            attempts = entry.attempts + 1
+            if attempts >= self.max_attempts:
+                stats['failed'] += 1
+                new_status = 'failed'
+            else:
+                stats['retried'] += 1
+                new_status = 'pending'
+            # Matching the claim token ignores results from a lease that has since expired
+            recorded = NotificationOutbox.objects.filter(pk=entry.pk, claim_token=entry.claim_token).update(
+                status=new_status,
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + self.backoff(attempts),
+                last_error=error[:1000],
+                claim_token=None,
+                claimed_at=None,
+            )
+            if recorded:
+                logger.warning(f"Outbox {entry.channel} delivery {entry.pk} failed (attempt {attempts}): {error}")
+
+        for (channel, token), sent in sent_by_channel.items():
+            # Entries whose lease expired belong to another worker now, which records their outcome
+            owned = NotificationOutbox.objects.filter(pk__in=[e.pk for e in sent], claim_token=token)
+            with transaction.atomic():
+                notification_ids = list(owned.select_for_update().values_list('notification_id', flat=True))
+                recorded = owned.update(status='sent', sent_at=now, attempts=F('attempts') + 1, claim_token=None)
+                Notification.objects.filter(pk__in=notification_ids).update(
+                    **{f'{channel}_sent': True, f'{channel}_sent_at': now}
+                )
+            stats['sent'] += recorded
+            if recorded < len(sent):
+                logger.warning(f"Outbox {channel}: {len(sent) - recorded} deliveries finished after their lease expired")
+
+    @staticmethod
+    def backoff(attempts):
+        """Exponential backoff with jitter, capped at MAX_BACKOFF_SECONDS"""
+        base = outbox_setting('BACKOFF_SECONDS') * (2 ** (attempts - 1))
+        delay = min(base, outbox_setting('MAX_BACKOFF_SECONDS'))
+        return timedelta(seconds=delay * random.uniform(0.9, 1.1))
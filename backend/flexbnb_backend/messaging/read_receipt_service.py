@@ -0,0 +1,72 @@
+"""
+Read Receipt Service - read cursors and unread counters for conversations
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Conversation, Message
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReadReceiptService:
+    """Service for moving per-participant read cursors in bulk"""
+
+    @classmethod
+    def mark_read_up_to(cls, conversation, user, message=None):
+        """
+        Mark every message received by `user` up to and including `message`
+        as read. Defaults to the latest message in the conversation.
+
+        Applies one UPDATE to the messages, moves the participant's cursor
+        and decrements the unread counter. Returns the number of messages
+        marked read.
+        """
+        role = conversation.participant_role(user)
+        if role is None:
+            raise PermissionError('User is not a participant in this conversation')
+
+        if message is None:
+            message = conversation.messages.order_by('-created_at').first()
+            if message is None:
+                return 0
+        elif message.conversation_id != conversation.id:
+            raise ValueError('Message does not belong to this conversation')
+
+        cursor_field = f'{role}_last_read_message'
+        counter_field = f'{role}_unread_count'
+
+        with transaction.atomic():
+            marked = Message.objects.filter(
+                conversation=conversation,
+                receiver=user,
+                is_read=False,
+                created_at__lte=message.created_at
+            ).update(is_read=True, read_at=timezone.now())
+
+            # Never move a cursor backwards
+            Conversation.objects.filter(pk=conversation.pk).filter(
+                Q(**{f'{cursor_field}__isnull': True}) |
+                Q(**{f'{cursor_field}__created_at__lte': message.created_at})
+            ).update(**{cursor_field: message})
+
+            if marked:
+                Conversation.objects.filter(pk=conversation.pk).update(
+                    **{counter_field: Greatest(F(counter_field) - marked, 0)}
+                )
+
+        logger.info(f"Marked {marked} messages read in conversation {conversation.id} for {role}")
+        return marked
+
+    @classmethod
+    def record_new_message(cls, message):
+        """Bump the receiver's unread counter and the conversation timestamp"""
+        conversation = message.conversation
+        role = conversation.participant_role(message.receiver)
+        updates = {'updated_at': timezone.now()}
+        if role:
+            counter_field = f'{role}_unread_count'
+            updates[counter_field] = F(counter_field) + 1
+        Conversation.objects.filter(pk=conversation.pk).update(**updates)
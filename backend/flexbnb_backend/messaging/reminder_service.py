@@ -1,8 +1,15 @@
 """
 Automated Reminder Service for Check-in, Check-out, and Payment Reminders
 """
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_time
+from datetime import datetime, timedelta
 from .models import AutomatedReminder
 from .notification_service import NotificationService
 from booking.models import Reservation
@@ -14,144 +21,255 @@ logger = logging.getLogger(__name__)
 class ReminderService:
     """Service for creating and sending automated reminders"""
     
-    @classmethod
-    def create_reminders_for_reservation(cls, reservation):
-        """Create all automated reminders for a reservation"""
-        reminders_created = []
-        
-        # Check-in reminders
-        check_in_24h = cls.create_check_in_reminder(reservation, hours_before=24)
-        if check_in_24h:
-            reminders_created.append(check_in_24h)
-        
-        check_in_2h = cls.create_check_in_reminder(reservation, hours_before=2)
-        if check_in_2h:
-            reminders_created.append(check_in_2h)
-        
-        # Check-out reminders
-        check_out_24h = cls.create_check_out_reminder(reservation, hours_before=24)
-        if check_out_24h:
-            reminders_created.append(check_out_24h)
-        
-        check_out_2h = cls.create_check_out_reminder(reservation, hours_before=2)
-        if check_out_2h:
-            reminders_created.append(check_out_2h)
-        
-        # Payment reminders
-        payment_3d = cls.create_payment_reminder(reservation, days_before=3)
-        if payment_3d:
-            reminders_created.append(payment_3d)
+    # A claimed reminder that is still unsent after this long is considered abandoned
+    CLAIM_LEASE_SECONDS = 300
+    
+    # A reminder that fails this many times is marked failed instead of being retried
+    MAX_ATTEMPTS = 5
+    RETRY_BACKOFF_SECONDS = 60
+    MAX_RETRY_BACKOFF_SECONDS = 3600
+    
+    # (reminder_type, anchor, lead time before the anchor)
+    REMINDER_PLAN = [
+        ('check_in_24h', 'check_in', timedelta(hours=24)),
+        ('check_in_2h', 'check_in', timedelta(hours=2)),
+        ('check_out_24h', 'check_out', timedelta(hours=24)),
+        ('check_out_2h', 'check_out', timedelta(hours=2)),
+        ('payment_due_3d', 'payment_due', timedelta(days=3)),
+        ('payment_due_1d', 'payment_due', timedelta(days=1)),
+    ]
+    
+    @staticmethod
+    def _anchor_times(reservation):
+        """Aware check-in, check-out and payment-due datetimes for a reservation"""
+        def as_date(value):
+            return parse_date(value) if isinstance(value, str) else value
         
-        payment_1d = cls.create_payment_reminder(reservation, days_before=1)
-        if payment_1d:
-            reminders_created.append(payment_1d)
+        def as_time(value):
+            if isinstance(value, str):
+                value = parse_time(value)
+            return value or datetime.min.time()
         
-        logger.info(f"Created {len(reminders_created)} reminders for reservation {reservation.id}")
-        return reminders_created
+        check_in_date = as_date(reservation.check_in_date)
+        check_out_date = as_date(reservation.check_out_date)
+        return {
+            'check_in': timezone.make_aware(datetime.combine(check_in_date, as_time(reservation.check_in_time))),
+            'check_out': timezone.make_aware(datetime.combine(check_out_date, as_time(reservation.check_out_time))),
+            # Payment is due on the check-in date
+            'payment_due': timezone.make_aware(datetime.combine(check_in_date, datetime.min.time())),
+        }
     
     @classmethod
-    def create_check_in_reminder(cls, reservation, hours_before=24):
-        """Create check-in reminder"""
-        try:
-            # Calculate scheduled time
-            check_in_datetime = timezone.make_aware(
-                timezone.datetime.combine(reservation.check_in_date, reservation.check_in_time or timezone.datetime.min.time())
-            )
-            scheduled_for = check_in_datetime - timedelta(hours=hours_before)
-            
-            # Don't create if scheduled time is in the past
-            if scheduled_for < timezone.now():
-                return None
-            
-            reminder_type = 'check_in_24h' if hours_before == 24 else 'check_in_2h'
-            
-            reminder = AutomatedReminder.objects.create(
+    def plan_reminders(cls, reservation, reminder_types=None, now=None):
+        """
+        Build (unsaved) reminders for a reservation in memory. Reminders whose
+        scheduled time has already passed are left out.
+        """
+        now = now or timezone.now()
+        anchors = cls._anchor_times(reservation)
+        planned = []
+        for reminder_type, anchor, lead in cls.REMINDER_PLAN:
+            if reminder_types is not None and reminder_type not in reminder_types:
+                continue
+            scheduled_for = anchors[anchor] - lead
+            if scheduled_for < now:
+                continue
+            planned.append(AutomatedReminder(
                 reservation=reservation,
                 reminder_type=reminder_type,
                 scheduled_for=scheduled_for
-            )
-            
-            logger.info(f"Created check-in reminder ({hours_before}h) for reservation {reservation.id}")
-            return reminder
+            ))
+        return planned
+    
+    @classmethod
+    def create_reminders_for_reservations(cls, reservations, reminder_types=None, batch_size=500):
+        """
+        Create missing reminders for many reservations with a single bulk_create.
+        Reminder types a reservation already has are skipped, so this is safe
+        to re-run (backfills, repeated approvals); the unique constraint plus
+        ignore_conflicts covers two runs racing on the same reservation.
+        """
+        reservations = list(reservations)
+        if not reservations:
+            return []
+        
+        existing = set(
+            AutomatedReminder.objects.filter(reservation__in=[r.pk for r in reservations])
+            .values_list('reservation_id', 'reminder_type')
+        )
+        now = timezone.now()
+        planned = []
+        for reservation in reservations:
+            try:
+                reminders = cls.plan_reminders(reservation, reminder_types, now=now)
+            except Exception as e:
+                logger.error(f"Failed to plan reminders for reservation {reservation.pk}: {str(e)}")
+                continue
+            planned.extend(r for r in reminders if (reservation.pk, r.reminder_type) not in existing)
+        
+        created = AutomatedReminder.objects.bulk_create(planned, batch_size=batch_size, ignore_conflicts=True)
+        logger.info(f"Created {len(created)} reminders for {len(reservations)} reservations")
+        return created
+    
+    @classmethod
+    def create_reminders_for_reservation(cls, reservation):
+        """Create all automated reminders for a reservation"""
+        return cls.create_reminders_for_reservations([reservation])
+    
+    @classmethod
+    def _create_single(cls, reservation, reminder_type):
+        try:
+            created = cls.create_reminders_for_reservations([reservation], reminder_types={reminder_type})
+            return created[0] if created else None
         except Exception as e:
-            logger.error(f"Failed to create check-in reminder: {str(e)}")
+            logger.error(f"Failed to create {reminder_type} reminder: {str(e)}")
             return None
     
+    @classmethod
+    def create_check_in_reminder(cls, reservation, hours_before=24):
+        """Create check-in reminder"""
+        return cls._create_single(reservation, 'check_in_24h' if hours_before == 24 else 'check_in_2h')
+    
     @classmethod
     def create_check_out_reminder(cls, reservation, hours_before=24):
         """Create check-out reminder"""
-        try:
-            # Calculate scheduled time
-            check_out_datetime = timezone.make_aware(
-                timezone.datetime.combine(reservation.check_out_date, reservation.check_out_time or timezone.datetime.min.time())
-            )
-            scheduled_for = check_out_datetime - timedelta(hours=hours_before)
-            
-            # Don't create if scheduled time is in the past
-            if scheduled_for < timezone.now():
-                return None
-            
-            reminder_type = 'check_out_24h' if hours_before == 24 else 'check_out_2h'
-            
-            reminder = AutomatedReminder.objects.create(
-                reservation=reservation,
-                reminder_type=reminder_type,
-                scheduled_for=scheduled_for
-            )
-            
-            logger.info(f"Created check-out reminder ({hours_before}h) for reservation {reservation.id}")
-            return reminder
-        except Exception as e:
-            logger.error(f"Failed to create check-out reminder: {str(e)}")
-            return None
+        return cls._create_single(reservation, 'check_out_24h' if hours_before == 24 else 'check_out_2h')
     
     @classmethod
     def create_payment_reminder(cls, reservation, days_before=3):
         """Create payment due reminder"""
-        try:
-            # Calculate scheduled time (assuming payment due is check-in date)
-            payment_due_date = timezone.make_aware(
-                timezone.datetime.combine(reservation.check_in_date, timezone.datetime.min.time())
-            )
-            scheduled_for = payment_due_date - timedelta(days=days_before)
-            
-            # Don't create if scheduled time is in the past
-            if scheduled_for < timezone.now():
-                return None
-            
-            reminder_type = 'payment_due_3d' if days_before == 3 else 'payment_due_1d'
-            
-            reminder = AutomatedReminder.objects.create(
-                reservation=reservation,
-                reminder_type=reminder_type,
-                scheduled_for=scheduled_for
-            )
-            
-            logger.info(f"Created payment reminder ({days_before}d) for reservation {reservation.id}")
-            return reminder
-        except Exception as e:
-            logger.error(f"Failed to create payment reminder: {str(e)}")
-            return None
+        return cls._create_single(reservation, 'payment_due_3d' if days_before == 3 else 'payment_due_1d')
+    
+    @classmethod
+    def unclaimed(cls, now):
+        """Unsent, not yet failed reminders that no worker holds an active lease on"""
+        stale = now - timedelta(seconds=cls.CLAIM_LEASE_SECONDS)
+        return Q(is_sent=False, is_failed=False) & (Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale))
+    
+    @staticmethod
+    def due_at():
+        """When a reminder may next be sent: its scheduled time, or the retry time after a failure"""
+        return Coalesce('next_attempt_at', 'scheduled_for')
     
     @classmethod
-    def process_due_reminders(cls):
-        """Process all reminders that are due to be sent"""
+    def claim_due_reminders(cls, batch_size=100):
+        """
+        Claim a batch of due reminders for this worker.
+        
+        Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it,
+        otherwise an atomic conditional UPDATE (SQLite). Either way, concurrent
+        schedulers get disjoint batches.
+        """
         now = timezone.now()
+        claimable = cls.unclaimed(now) & Q(scheduled_for__lte=now) & (
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+        )
+        token = uuid.uuid4()
+        
+        due = AutomatedReminder.objects.filter(claimable).order_by('scheduled_for')
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size])
+                AutomatedReminder.objects.filter(id__in=ids).update(claim_token=token, claimed_at=now)
+        else:
+            ids = list(due.values_list('id', flat=True)[:batch_size])
+            AutomatedReminder.objects.filter(claimable, id__in=ids).update(claim_token=token, claimed_at=now)
+        
+        return list(
+            AutomatedReminder.objects.filter(claim_token=token)
+            .select_related('reservation', 'reservation__guest', 'reservation__property')
+        )
+    
+    @classmethod
+    def dispatch_reminders(cls, reminders, workers=1):
+        """Send claimed reminders, concurrently when workers > 1. Returns the number sent."""
+        if workers <= 1:
+            return sum(1 for reminder in reminders if cls.send_reminder(reminder))
         
-        # Get all unsent reminders that are due
-        due_reminders = AutomatedReminder.objects.filter(
-            is_sent=False,
-            scheduled_for__lte=now
-        ).select_related('reservation', 'reservation__guest', 'reservation__property')
+        # One slice per worker thread, so each thread opens and closes a single connection
+        def send_slice(chunk):
+            try:
+                return sum(1 for reminder in chunk if cls.send_reminder(reminder))
+            finally:
+                connection.close()
         
+        reminders = list(reminders)
+        chunks = [reminders[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminders') as executor:
+            return sum(executor.map(send_slice, [chunk for chunk in chunks if chunk]))
+    
+    @classmethod
+    def process_due_reminders(cls, batch_size=100, workers=1):
+        """Process all reminders that are due to be sent, one claimed batch at a time"""
         sent_count = 0
-        for reminder in due_reminders:
-            if cls.send_reminder(reminder):
-                sent_count += 1
+        while True:
+            batch = cls.claim_due_reminders(batch_size)
+            if not batch:
+                break
+            sent_count += cls.dispatch_reminders(batch, workers)
         
         logger.info(f"Processed {sent_count} reminders")
         return sent_count
     
+    @classmethod
+    def run_scheduler(cls, batch_size=100, workers=1, max_sleep=60, report_every=60, report=None, stop_after=None):
+        """
+        Long-running scheduler: claim and send due reminders in batches, then
+        sleep until the next scheduled_for among reminders no other worker holds
+        a lease on (capped at max_sleep seconds).
+        
+        Every `report_every` seconds, `report` is called with throughput and
+        lag metrics for the window: sent, failed, per_second, avg_lag_seconds
+        and max_lag_seconds (lag = send time - scheduled_for).
+        """
+        started = time.monotonic()
+        window_started = started
+        window = {'sent': 0, 'failed': 0, 'lags': []}
+        
+        def flush_window():
+            nonlocal window, window_started
+            elapsed = max(time.monotonic() - window_started, 1e-9)
+            lags = window['lags']
+            metrics = {
+                'sent': window['sent'],
+                'failed': window['failed'],
+                'per_second': round(window['sent'] / elapsed, 2),
+                'avg_lag_seconds': round(sum(lags) / len(lags), 2) if lags else 0,
+                'max_lag_seconds': round(max(lags), 2) if lags else 0,
+            }
+            logger.info(f"Reminder scheduler: {metrics}")
+            if report:
+                report(metrics)
+            window = {'sent': 0, 'failed': 0, 'lags': []}
+            window_started = time.monotonic()
+        
+        while stop_after is None or time.monotonic() - started < stop_after:
+            batch = cls.claim_due_reminders(batch_size)
+            if batch:
+                now = timezone.now()
+                sent = cls.dispatch_reminders(batch, workers)
+                window['sent'] += sent
+                window['failed'] += len(batch) - sent
+                window['lags'].extend((now - r.scheduled_for).total_seconds() for r in batch)
+            else:
+                # Rows another worker is still holding would make this wake immediately, over and over
+                next_due = (
+                    AutomatedReminder.objects.filter(cls.unclaimed(timezone.now()))
+                    .annotate(due_at=cls.due_at())
+                    .order_by('due_at')
+                    .values_list('due_at', flat=True)
+                    .first()
+                )
+                delay = max_sleep
+                if next_due is not None:
+                    delay = min(max((next_due - timezone.now()).total_seconds(), 1), max_sleep)
+                time.sleep(delay)
+            
+            if time.monotonic() - window_started >= report_every:
+                flush_window()
+        
+        flush_window()
+    
     @classmethod
     def send_reminder(cls, reminder):
         """Send a specific reminder"""
@@ -172,21 +290,48 @@ class ReminderService:
             elif reminder.reminder_type == 'payment_due_1d':
                 notification = NotificationService.send_payment_due_reminder(reservation, days_before=1)
             else:
-                logger.warning(f"Unknown reminder type: {reminder.reminder_type}")
+                # Retrying cannot fix an unknown type
+                cls._record_failure(reminder, f"Unknown reminder type: {reminder.reminder_type}", permanent=True)
                 return False
             
-            # Mark reminder as sent
-            reminder.is_sent = True
-            reminder.sent_at = timezone.now()
-            reminder.notification = notification
-            reminder.save()
-            
-            logger.info(f"Sent reminder {reminder.id} for reservation {reservation.id}")
+            # Matching the claim token ignores a send whose lease has since expired
+            recorded = AutomatedReminder.objects.filter(pk=reminder.pk, claim_token=reminder.claim_token).update(
+                is_sent=True,
+                sent_at=timezone.now(),
+                notification=notification,
+                attempts=F('attempts') + 1,
+                claim_token=None,
+            )
+            if recorded:
+                logger.info(f"Sent reminder {reminder.id} for reservation {reservation.id}")
+            else:
+                logger.warning(f"Sent reminder {reminder.id} after its claim expired")
             return True
         except Exception as e:
-            logger.error(f"Failed to send reminder {reminder.id}: {str(e)}")
+            cls._record_failure(reminder, str(e) or type(e).__name__)
             return False
     
+    @classmethod
+    def _record_failure(cls, reminder, error, permanent=False):
+        """
+        Release the claim and schedule a retry with exponential backoff, or
+        mark the reminder failed once it is out of attempts.
+        """
+        attempts = reminder.attempts + 1
+        failed = permanent or attempts >= cls.MAX_ATTEMPTS
+        delay = min(cls.RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1)), cls.MAX_RETRY_BACKOFF_SECONDS)
+        recorded = AutomatedReminder.objects.filter(pk=reminder.pk, claim_token=reminder.claim_token).update(
+            attempts=F('attempts') + 1,
+            is_failed=failed,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            last_error=error[:1000],
+            claim_token=None,
+            claimed_at=None,
+        )
+        if recorded:
+            outcome = 'giving up' if failed else f"retrying in {delay}s"
+            logger.error(f"Failed to send reminder {reminder.id} (attempt {attempts}, {outcome}): {error}")
+    
     @classmethod
     def cancel_reminders_for_reservation(cls, reservation):
         """Cancel all unsent reminders for a reservation"""
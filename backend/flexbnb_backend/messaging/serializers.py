@@ -77,11 +77,7 @@ class ConversationSerializer(serializers.ModelSerializer):
     def get_unread_count(self, obj):
         user = self.context.get('user')
         if user:
-            try:
-                return obj.messages.filter(receiver=user, is_read=False).count()
-            except Exception as e:
-                print(f"[SERIALIZER] Error getting unread count: {str(e)}")
-                return 0
+            return obj.unread_count_for(user)
         return 0
 
 
@@ -90,15 +86,31 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
     guest = UserBasicSerializer(read_only=True)
     host = UserBasicSerializer(read_only=True)
     messages = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    read_receipts = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
         fields = [
             'id', 'property', 'guest', 'host', 'reservation',
             'is_archived_by_guest', 'is_archived_by_host',
-            'created_at', 'updated_at', 'messages'
+            'created_at', 'updated_at', 'messages',
+            'unread_count', 'read_receipts'
         ]
     
+    def get_unread_count(self, obj):
+        user = self.context.get('user')
+        if user:
+            return obj.unread_count_for(user)
+        return 0
+    
+    def get_read_receipts(self, obj):
+        # Last message each participant has read, so senders can render "seen"
+        return {
+            'guest': str(obj.guest_last_read_message_id) if obj.guest_last_read_message_id else None,
+            'host': str(obj.host_last_read_message_id) if obj.host_last_read_message_id else None,
+        }
+    
     def get_messages(self, obj):
         # Get messages ordered by created_at (oldest first)
         try:
@@ -0,0 +1,393 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from useraccount.models import User
+from .models import AutomatedReminder, Conversation, Message, Notification, NotificationOutbox
+from .notification_service import NotificationService
+from .outbox_worker import OutboxWorker
+from .read_receipt_service import ReadReceiptService
+from .reminder_service import ReminderService
+
+
+OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+    'CONCURRENCY': {'email': 2, 'sms': 1, 'push': 3},
+}
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', NOTIFICATION_OUTBOX=OUTBOX)
+class OutboxWorkerTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(name=f'user{i}', email=f'user{i}@example.com', password='x')
+            for i in range(5)
+        ]
+
+    def notify(self, user, **channels):
+        return NotificationService.create_and_send_notification(
+            user, 'system', 'Hello', 'A message', **channels
+        )
+
+    def test_enqueue_does_not_send(self):
+        self.notify(self.users[0], send_email=True, send_sms=True)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.filter(status='pending').count(), 2)
+
+    def test_email_delivered_and_marked_sent(self):
+        notification = self.notify(self.users[0], send_email=True)
+        stats = OutboxWorker().run_once()
+
+        self.assertEqual(stats, {'claimed': 1, 'sent': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        notification.refresh_from_db()
+        self.assertTrue(notification.email_sent)
+        self.assertIsNotNone(notification.email_sent_at)
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ('sent', 1))
+        self.assertIsNone(entry.claim_token)
+
+    def test_claims_in_batches(self):
+        for user in self.users:
+            self.notify(user, send_email=True)
+        worker = OutboxWorker(batch_size=2)
+
+        first = worker.claim_batch()
+        second = worker.claim_batch()
+        self.assertEqual((len(first), len(second)), (2, 2))
+        self.assertFalse({e.pk for e in first} & {e.pk for e in second})
+        self.assertNotEqual(first[0].claim_token, second[0].claim_token)
+        self.assertEqual(NotificationOutbox.objects.filter(status='processing').count(), 4)
+        self.assertEqual(len(worker.claim_batch()), 1)
+        self.assertEqual(worker.claim_batch(), [])
+
+    def test_claimed_entries_are_not_reclaimed_within_lease(self):
+        self.notify(self.users[0], send_email=True)
+        self.assertEqual(len(OutboxWorker().claim_batch()), 1)
+        self.assertEqual(OutboxWorker().claim_batch(), [])
+
+    def test_expired_lease_counts_as_attempt_and_ignores_stale_result(self):
+        self.notify(self.users[0], send_email=True)
+        stale_worker = OutboxWorker()
+        stale_entries = stale_worker.claim_batch()
+        NotificationOutbox.objects.update(claimed_at=timezone.now() - timedelta(seconds=OUTBOX['LEASE_SECONDS'] + 1))
+
+        fresh = OutboxWorker().claim_batch()
+        self.assertEqual(len(fresh), 1)
+        self.assertEqual(fresh[0].attempts, 1)
+        self.assertNotEqual(fresh[0].claim_token, stale_entries[0].claim_token)
+
+        # The worker whose lease expired finishes late: its result must not overwrite the new claim
+        stale_worker._record_results([(stale_entries[0], 'timed out')], defaultdict(int))
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual((entry.status, entry.claim_token), ('processing', fresh[0].claim_token))
+
+    def test_stale_success_is_not_counted_or_marked_sent(self):
+        for user in self.users[:2]:
+            self.notify(user, send_email=True)
+        stale_worker = OutboxWorker()
+        stale_entries = stale_worker.claim_batch()
+        # Only the first entry's lease expires and is taken over by another worker
+        NotificationOutbox.objects.filter(pk=stale_entries[0].pk).update(
+            claimed_at=timezone.now() - timedelta(seconds=OUTBOX['LEASE_SECONDS'] + 1)
+        )
+        [fresh] = OutboxWorker().claim_batch()
+
+        stats = defaultdict(int)
+        stale_worker._record_results([(entry, None) for entry in stale_entries], stats)
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(
+            list(Notification.objects.filter(email_sent=True).values_list('pk', flat=True)),
+            [stale_entries[1].notification_id],
+        )
+        entry = NotificationOutbox.objects.get(pk=fresh.pk)
+        self.assertEqual((entry.status, entry.claim_token), ('processing', fresh.claim_token))
+
+    def test_entry_that_keeps_expiring_fails(self):
+        self.notify(self.users[0], send_email=True)
+        worker = OutboxWorker()
+        for _ in range(OUTBOX['MAX_ATTEMPTS']):
+            self.assertEqual(len(worker.claim_batch()), 1)
+            NotificationOutbox.objects.update(claimed_at=timezone.now() - timedelta(seconds=OUTBOX['LEASE_SECONDS'] + 1))
+        self.assertEqual(worker.claim_batch(), [])
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ('failed', OUTBOX['MAX_ATTEMPTS']))
+
+    def test_retries_with_backoff_until_failed(self):
+        notification = self.notify(self.users[0], send_email=True)
+        worker = OutboxWorker()
+        with mock.patch.object(NotificationService, 'deliver_email', side_effect=ConnectionError('SMTP down')):
+            delays = []
+            for attempt in range(1, OUTBOX['MAX_ATTEMPTS'] + 1):
+                before = timezone.now()
+                stats = worker.run_once()
+                entry = NotificationOutbox.objects.get()
+                self.assertEqual(entry.attempts, attempt)
+                self.assertEqual(entry.last_error, 'SMTP down')
+                if attempt < OUTBOX['MAX_ATTEMPTS']:
+                    self.assertEqual((stats['retried'], entry.status), (1, 'pending'))
+                    delays.append((entry.next_attempt_at - before).total_seconds())
+                    # Not due yet, so the next run claims nothing
+                    self.assertEqual(worker.run_once()['claimed'], 0)
+                    NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+                else:
+                    self.assertEqual((stats['failed'], entry.status), (1, 'failed'))
+
+        self.assertAlmostEqual(delays[0], 30, delta=3.1)
+        self.assertAlmostEqual(delays[1], 60, delta=6.1)
+        self.assertEqual(worker.run_once()['claimed'], 0)
+        self.assertEqual(len(mail.outbox), 0)
+        notification.refresh_from_db()
+        self.assertFalse(notification.email_sent)
+
+    def test_backoff_is_capped(self):
+        with self.settings(NOTIFICATION_OUTBOX={**OUTBOX, 'MAX_BACKOFF_SECONDS': 100}):
+            self.assertLessEqual(OutboxWorker.backoff(10).total_seconds(), 110)
+
+    def test_per_channel_concurrency_limits(self):
+        for user in self.users:
+            self.notify(user, send_email=True, send_sms=True, send_push=True)
+
+        lock = threading.Lock()
+        active = defaultdict(int)
+        peak = defaultdict(int)
+
+        def slow_deliver(notification, channel, connection=None):
+            with lock:
+                active[channel] += 1
+                peak[channel] = max(peak[channel], active[channel])
+            time.sleep(0.05)
+            with lock:
+                active[channel] -= 1
+
+        with mock.patch.object(NotificationService, 'deliver', side_effect=slow_deliver):
+            stats = OutboxWorker().run_once()
+
+        self.assertEqual(stats['sent'], 15)
+        for channel, limit in OUTBOX['CONCURRENCY'].items():
+            self.assertLessEqual(peak[channel], limit)
+        self.assertEqual(peak['email'], 2)
+        self.assertEqual(peak['sms'], 1)
+        self.assertEqual(Notification.objects.filter(email_sent=True, sms_sent=True, push_sent=True).count(), 5)
+
+    def test_broadcast_queues_email_in_outbox(self):
+        users = User.objects.filter(pk__in=[u.pk for u in self.users])
+        stats = NotificationService.broadcast(users, 'system', 'Hi $name', 'Hello $name', send_email=True, chunk_size=2)
+
+        self.assertEqual(stats, {'notifications': 5, 'emails_queued': 5})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(NotificationOutbox.objects.filter(channel='email', status='pending').count(), 5)
+        self.assertFalse(Notification.objects.filter(email_sent=True).exists())
+
+        self.assertEqual(OutboxWorker().run_once()['sent'], 5)
+        self.assertEqual(sorted(m.subject for m in mail.outbox), [f'Hi user{i}' for i in range(5)])
+        self.assertIn('Hello user0', next(m for m in mail.outbox if m.to == ['user0@example.com']).body)
+        self.assertEqual(Notification.objects.filter(email_sent=True).count(), 5)
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        from booking.models import Reservation
+        from property.models import Property
+
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        prop = Property.objects.create(
+            title='Test property', description='Test', price_per_night=100, bedrooms=1, bathrooms=1, guests=2,
+            country='Pakistan', country_code='PK', category='test', image='uploads/properties/test.jpg', Host=host
+        )
+        today = timezone.now().date()
+        self.reservation = Reservation.objects.create(
+            property=prop, guest=host, host=host, check_in_date=today + timedelta(days=3),
+            check_out_date=today + timedelta(days=5), guests_count=1, total_price=200, booking_fee=20,
+            host_earnings=180, status='approved'
+        )
+
+    def test_sleeps_past_reminders_leased_by_another_worker(self):
+        now = timezone.now()
+        AutomatedReminder.objects.create(
+            reservation=self.reservation, reminder_type='check_in_24h',
+            scheduled_for=now - timedelta(minutes=1), claimed_at=now, claim_token=uuid.uuid4()
+        )
+        AutomatedReminder.objects.create(
+            reservation=self.reservation, reminder_type='check_in_2h', scheduled_for=now + timedelta(minutes=10)
+        )
+
+        class Slept(Exception):
+            pass
+
+        with mock.patch('messaging.reminder_service.time.sleep', side_effect=Slept) as sleep:
+            with self.assertRaises(Slept):
+                ReminderService.run_scheduler(max_sleep=3600)
+        self.assertAlmostEqual(sleep.call_args.args[0], 600, delta=5)
+
+    def test_creating_reminders_twice_creates_each_once(self):
+        from django.db import IntegrityError, transaction
+
+        created = ReminderService.create_reminders_for_reservations([self.reservation])
+        self.assertEqual(len(created), len(ReminderService.plan_reminders(self.reservation)))
+        ReminderService.create_reminders_for_reservations([self.reservation])
+        self.assertEqual(AutomatedReminder.objects.filter(reservation=self.reservation).count(), len(created))
+        # A run that planned before the other committed still cannot duplicate
+        planned = ReminderService.plan_reminders(self.reservation)
+        AutomatedReminder.objects.bulk_create(planned, ignore_conflicts=True)
+        self.assertEqual(AutomatedReminder.objects.filter(reservation=self.reservation).count(), len(created))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AutomatedReminder.objects.create(
+                reservation=self.reservation, reminder_type='check_in_24h', scheduled_for=timezone.now()
+            )
+
+    def claim(self, reminder_type='check_in_24h'):
+        AutomatedReminder.objects.create(
+            reservation=self.reservation, reminder_type=reminder_type, scheduled_for=timezone.now() - timedelta(minutes=1)
+        )
+        return ReminderService.claim_due_reminders()
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        AutomatedReminder.objects.create(
+            reservation=self.reservation, reminder_type='check_in_24h', scheduled_for=timezone.now() - timedelta(minutes=1)
+        )
+        with mock.patch.object(NotificationService, 'send_check_in_reminder', side_effect=RuntimeError('provider down')):
+            self.assertEqual(ReminderService.process_due_reminders(), 0)
+            reminder = AutomatedReminder.objects.get()
+            self.assertEqual((reminder.attempts, reminder.is_failed, reminder.claim_token), (1, False, None))
+            self.assertGreater(reminder.next_attempt_at, timezone.now())
+            # Not claimable again until the backoff has passed
+            self.assertEqual(ReminderService.claim_due_reminders(), [])
+
+            for _ in range(ReminderService.MAX_ATTEMPTS - 1):
+                AutomatedReminder.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(ReminderService.process_due_reminders(), 0)
+
+        reminder = AutomatedReminder.objects.get()
+        self.assertEqual((reminder.attempts, reminder.is_failed), (ReminderService.MAX_ATTEMPTS, True))
+        self.assertEqual(reminder.last_error, 'provider down')
+        AutomatedReminder.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(ReminderService.claim_due_reminders(), [])
+
+    def test_unknown_type_fails_without_retry(self):
+        [reminder] = self.claim('review_request')
+        self.assertFalse(ReminderService.send_reminder(reminder))
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.attempts, reminder.is_failed), (1, True))
+
+    def test_send_after_lease_expired_does_not_overwrite_new_claim(self):
+        [stale] = self.claim()
+        AutomatedReminder.objects.update(
+            claimed_at=timezone.now() - timedelta(seconds=ReminderService.CLAIM_LEASE_SECONDS + 1)
+        )
+        [fresh] = ReminderService.claim_due_reminders()
+
+        self.assertTrue(ReminderService.send_reminder(stale))
+        reminder = AutomatedReminder.objects.get()
+        self.assertEqual((reminder.is_sent, reminder.claim_token), (False, fresh.claim_token))
+
+        self.assertTrue(ReminderService.send_reminder(fresh))
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.is_sent, reminder.attempts, reminder.claim_token), (True, 1, None))
+
+    def test_sleeps_until_retry_time(self):
+        now = timezone.now()
+        AutomatedReminder.objects.create(
+            reservation=self.reservation, reminder_type='check_in_24h', scheduled_for=now - timedelta(minutes=5),
+            attempts=1, next_attempt_at=now + timedelta(minutes=2)
+        )
+
+        class Slept(Exception):
+            pass
+
+        with mock.patch('messaging.reminder_service.time.sleep', side_effect=Slept) as sleep:
+            with self.assertRaises(Slept):
+                ReminderService.run_scheduler(max_sleep=3600)
+        self.assertAlmostEqual(sleep.call_args.args[0], 120, delta=5)
+
+    def test_threads_close_their_connection_once(self):
+        with mock.patch.object(ReminderService, 'send_reminder', return_value=True), \
+                mock.patch('messaging.reminder_service.connection') as connection:
+            self.assertEqual(ReminderService.dispatch_reminders([object()] * 10, workers=3), 10)
+        self.assertEqual(connection.close.call_count, 3)
+
+
+class ReadReceiptTests(TestCase):
+    def setUp(self):
+        from property.models import Property
+
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        prop = Property.objects.create(
+            title='Test property', description='Test', price_per_night=100, bedrooms=1, bathrooms=1, guests=2,
+            country='Pakistan', country_code='PK', category='test', image='uploads/properties/test.jpg', Host=self.host
+        )
+        self.conversation = Conversation.objects.create(property=prop, guest=self.guest, host=self.host)
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = []
+        for i in range(5):
+            message = Message.objects.create(
+                conversation=self.conversation, sender=self.guest, receiver=self.host, message=f'Message {i}'
+            )
+            # Distinct timestamps, since cursors compare created_at
+            Message.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=i))
+            message.refresh_from_db()
+            ReadReceiptService.record_new_message(message)
+            self.messages.append(message)
+
+    def mark_all_read(self, user, up_to=None):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import mark_all_read
+
+        request = APIRequestFactory().post('/', {'up_to': str(up_to.pk)} if up_to else {}, format='json')
+        force_authenticate(request, user=user)
+        return mark_all_read(request, conversation_id=self.conversation.pk)
+
+    def state(self):
+        self.conversation.refresh_from_db()
+        return (
+            self.conversation.host_unread_count,
+            self.conversation.host_last_read_message_id,
+            self.conversation.messages.filter(is_read=False).count(),
+        )
+
+    def test_mark_all_read_up_to_message(self):
+        self.assertEqual(self.state(), (5, None, 5))
+        response = self.mark_all_read(self.host, up_to=self.messages[2])
+        self.assertEqual(response.data['marked_count'], 3)
+        self.assertEqual(self.state(), (2, self.messages[2].pk, 2))
+
+        response = self.mark_all_read(self.host)
+        self.assertEqual(response.data['marked_count'], 2)
+        self.assertEqual(self.state(), (0, self.messages[4].pk, 0))
+        self.assertEqual(self.conversation.unread_count_for(self.host), 0)
+
+    def test_cursor_never_moves_backwards(self):
+        ReadReceiptService.mark_read_up_to(self.conversation, self.host, self.messages[3])
+        self.assertEqual(ReadReceiptService.mark_read_up_to(self.conversation, self.host, self.messages[1]), 0)
+        self.assertEqual(self.state(), (1, self.messages[3].pk, 1))
+
+    def test_counter_returns_to_zero_and_stays_there(self):
+        for message in self.messages:
+            message.mark_as_read()
+        self.assertEqual(self.state(), (0, self.messages[4].pk, 0))
+        self.assertEqual(self.mark_all_read(self.host).data['marked_count'], 0)
+        self.assertEqual(self.state()[0], 0)
+        # The sender's own counter is untouched
+        self.assertEqual(self.conversation.guest_unread_count, 0)
+
+    def test_only_participants_and_own_messages(self):
+        outsider = User.objects.create_user(name='Outsider', email='outsider@example.com', password='x')
+        with self.assertRaises(PermissionError):
+            ReadReceiptService.mark_read_up_to(self.conversation, outsider)
+        self.assertEqual(self.mark_all_read(outsider).status_code, 404)
+        # The guest sent these messages, so reading as the guest marks nothing
+        self.assertEqual(self.mark_all_read(self.guest).data['marked_count'], 0)
+        self.assertEqual(self.state(), (5, None, 5))
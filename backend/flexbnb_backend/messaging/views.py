@@ -1,6 +1,7 @@
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q, Count, Max
 from django.utils import timezone
 from datetime import timedelta
@@ -10,6 +11,7 @@ from useraccount.models import User
 from booking.models import HostMessage, Reservation
 from property.models import Property
 from .models import Conversation, Message, QuickReplyTemplate, Notification, AutomatedReminder
+from .read_receipt_service import ReadReceiptService
 from .serializers import (
     HostMessageSerializer, ConversationSerializer, ConversationDetailSerializer,
     MessageSerializer, QuickReplyTemplateSerializer, NotificationSerializer,
@@ -53,9 +55,9 @@ def conversations_list(request):
         if filter_type == 'unread':
             # Filter conversations with unread messages for this user
             conversations = conversations.filter(
-                messages__receiver=user,
-                messages__is_read=False
-            ).distinct()
+                Q(guest=user, guest_unread_count__gt=0) |
+                Q(host=user, host_unread_count__gt=0)
+            )
             print(f"[MESSAGING] After unread filter: {conversations.count()} conversations")
         elif filter_type == 'archived':
             # Show archived conversations
@@ -131,17 +133,8 @@ def conversation_detail(request, conversation_id):
     user_role = 'guest' if conversation.guest == user else 'host'
     print(f"[MESSAGING ACCESS CONTROL] ✅ Access granted as {user_role.upper()}")
     
-    # Mark all messages as read for this user
-    Message.objects.filter(
-        conversation=conversation,
-        receiver=user,
-        is_read=False
-    ).update(is_read=True, read_at=timezone.now())
-    
-    # Refresh conversation from DB to get updated messages
-    conversation.refresh_from_db()
-    
-    serializer = ConversationDetailSerializer(conversation)
+    # Read-only: clients move their read cursor with POST mark-all-read/
+    serializer = ConversationDetailSerializer(conversation, context={'user': user})
     return Response(serializer.data)
 
 
@@ -289,9 +282,8 @@ def create_conversation(request):
             print(f"[MESSAGING] ⚠️ WARNING: Failed to create notification: {str(e)}")
             # Don't fail the request if notification fails
         
-        # Update conversation timestamp
-        conversation.updated_at = timezone.now()
-        conversation.save()
+        # Update conversation timestamp and host's unread counter
+        ReadReceiptService.record_new_message(message)
         
         # Verify message exists in conversation
         message_count = conversation.messages.count()
@@ -301,7 +293,7 @@ def create_conversation(request):
         conversation.refresh_from_db()
         
         try:
-            serializer = ConversationDetailSerializer(conversation)
+            serializer = ConversationDetailSerializer(conversation, context={'user': user})
             response_data = serializer.data
             print(f"[MESSAGING] Response data: conversation_id={response_data.get('id')}")
             print(f"[MESSAGING] Response messages count: {len(response_data.get('messages', []))}")
@@ -468,9 +460,8 @@ def send_message(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
     
-    # Update conversation timestamp
-    conversation.updated_at = timezone.now()
-    conversation.save()
+    # Update conversation timestamp and receiver's unread counter
+    ReadReceiptService.record_new_message(message)
     
     # If quick reply, increment usage count
     if quick_reply_id:
@@ -511,39 +502,51 @@ def send_message(request):
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def mark_message_read(request, message_id):
-    """Mark a message as read"""
+    """Mark a message, and everything received before it, as read"""
     user = request.user
     
     try:
-        message = Message.objects.get(id=message_id, receiver=user)
-        message.mark_as_read()
-        serializer = MessageSerializer(message)
-        return Response(serializer.data)
+        message = Message.objects.select_related('conversation').get(id=message_id, receiver=user)
     except Message.DoesNotExist:
         return Response({'error': 'Message not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    ReadReceiptService.mark_read_up_to(message.conversation, user, message)
+    message.refresh_from_db(fields=['is_read', 'read_at'])
+    serializer = MessageSerializer(message)
+    return Response(serializer.data)
 
 
 @api_view(['POST'])
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def mark_all_read(request, conversation_id):
-    """Mark all messages in a conversation as read"""
+    """
+    Move the user's read cursor. Marks everything up to `up_to` (a message id)
+    as read, or the whole conversation when `up_to` is omitted.
+    """
     user = request.user
+    up_to = request.data.get('up_to')
     
     try:
         conversation = Conversation.objects.filter(
             Q(guest=user) | Q(host=user)
         ).get(id=conversation_id)
-        
-        Message.objects.filter(
-            conversation=conversation,
-            receiver=user,
-            is_read=False
-        ).update(is_read=True, read_at=timezone.now())
-        
-        return Response({'message': 'All messages marked as read'})
     except Conversation.DoesNotExist:
         return Response({'error': 'Conversation not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    message = None
+    if up_to:
+        try:
+            message = conversation.messages.get(id=up_to)
+        except (Message.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': 'Message not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    marked = ReadReceiptService.mark_read_up_to(conversation, user, message)
+    
+    return Response({
+        'message': 'All messages marked as read',
+        'marked_count': marked
+    })
 
 
 # ==================== QUICK REPLIES ====================
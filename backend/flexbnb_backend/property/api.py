@@ -2,13 +2,17 @@ from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg, Count
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.conf import settings
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from useraccount.auth import ClerkAuthentication
+from booking.analytics_service import PropertyAnalyticsService
+from booking.pricing import PricingEngine, pricing_setting
 from .models import Property, SavedListing, RecentlyViewed, Review
 from .forms import PropertyForm
 from .serializers import PropertiesListSerializer, PropertiesDetailSerializer
@@ -43,6 +47,7 @@ def properties_detail(request, pk):
                 property=property_obj,
                 defaults={'viewed_at': timezone.now()}
             )
+        PropertyAnalyticsService.record_view(property_obj.pk)
         
         serializer = PropertiesDetailSerializer(property_obj, many=False)
         return JsonResponse(serializer.data)
@@ -173,12 +178,18 @@ def search_properties(request):
             except ValueError:
                 pass
         
-        # Date filters (check-in/check-out) - basic implementation
-        # Note: Full date availability checking would require a Reservation model
-        check_in = request.GET.get('check_in')
-        check_out = request.GET.get('check_out')
-        # For now, we'll just pass these through but not filter
-        # In production, you'd check against reservations
+        # Date filters (check-in/check-out): results on this page get a price quote for the stay
+        try:
+            check_in = parse_date(request.GET.get('check_in') or '')
+            check_out = parse_date(request.GET.get('check_out') or '')
+        except ValueError:
+            check_in = check_out = None
+        max_nights = pricing_setting('MAX_NIGHTS')
+        if check_in and check_out and (check_out - check_in).days > max_nights:
+            return JsonResponse(
+                {'error': f'Stays longer than {max_nights} nights cannot be quoted', 'results': [], 'total': 0},
+                status=400
+            )
         
         # Amenities filters
         amenities = request.GET.getlist('amenities')  # Multi-select support
@@ -206,6 +217,14 @@ def search_properties(request):
             if amenity_filters:
                 queryset = queryset.filter(amenity_filters)
         
+        # Eco filters, served from Property's indexed sustainability columns
+        if request.GET.get('eco_only') == 'true':
+            queryset = queryset.filter(sustainability_score__isnull=False)
+        
+        green_levels = [level for level in request.GET.get('green_level', '').split(',') if level]
+        if green_levels:
+            queryset = queryset.filter(green_level__in=green_levels)
+        
         # Map bounds filtering (for interactive map search)
         # Only filter by bounds if all bounds are provided AND properties have coordinates
         min_lat = request.GET.get('min_lat')
@@ -238,6 +257,12 @@ def search_properties(request):
             queryset = queryset.order_by('-avg_rating', '-created_at')
         elif sort == 'rating_asc':
             queryset = queryset.order_by('avg_rating', '-created_at')
+        elif sort == 'sustainability':
+            # Certified properties only: a plain DESC index puts NULLs first on
+            # PostgreSQL, so it cannot serve DESC NULLS LAST, but it serves this
+            queryset = queryset.filter(sustainability_score__isnull=False).order_by(
+                '-sustainability_score', '-created_at'
+            )
         elif sort == 'popular':
             # Sort by review count and rating for popularity
             queryset = queryset.annotate(
@@ -252,10 +277,24 @@ def search_properties(request):
         paginator = Paginator(queryset, page_size)
         page_obj = paginator.get_page(page)
         
-        serializer = PropertiesListSerializer(page_obj.object_list, many=True)
+        properties = list(page_obj.object_list)
+        serializer = PropertiesListSerializer(properties, many=True)
+        results = serializer.data
+        
+        if check_in and check_out and check_out > check_in:
+            # Price the whole page in one batch
+            quotes = PricingEngine.quote_many(properties, check_in, check_out)
+            for prop, result in zip(properties, results):
+                quote = quotes[prop.pk]
+                result['quote'] = {
+                    'nights': quote['nights'],
+                    'subtotal': quote['subtotal'],
+                    'offer_savings': quote['offer_savings'],
+                    'average_nightly': (quote['subtotal'] / quote['nights']).quantize(Decimal('0.01')),
+                }
         
         return JsonResponse({
-            'results': serializer.data,
+            'results': results,
             'page': page_obj.number,
             'total_pages': paginator.num_pages,
             'total': paginator.count,
@@ -0,0 +1,249 @@
+"""
+Image derivative pipeline - resized WebP/JPEG variants of property photos under content-hashed names
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image, ImageOps
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULTS = {
+    # Derivative name -> longest edge in pixels
+    'SIZES': {'thumb': 320, 'card': 800, 'full': 1920},
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': {'webp': 80, 'jpeg': 82},
+    'DIRECTORY': 'derivatives',
+    'WORKERS': 2,
+    # Render in a process pool; False renders inline when the upload commits
+    'ASYNC': True,
+    # A failed render is retried after RETRY_BACKOFF_SECONDS, doubling per attempt, up to MAX_ATTEMPTS renders
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_SECONDS': 300,
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+SAVE_OPTIONS = {'webp': {'method': 4}, 'jpeg': {'optimize': True, 'progressive': True}}
+
+
+def image_setting(name):
+    return getattr(settings, 'IMAGE_DERIVATIVES', {}).get(name, DEFAULTS[name])
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    """First 32 hex digits of the file's SHA-256, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def derivative_name(directory, digest, edge, fmt):
+    return f'{directory}/{digest[:2]}/{digest}-{edge}.{EXTENSIONS[fmt]}'
+
+
+def render_derivatives(source_path, media_root, directory, sizes, formats, quality):
+    """
+    Render every size and format of one image. Runs in a pool process, so it
+    only touches files, never Django. Names depend only on the source bytes
+    and the target edge, so files that already exist are reused as-is.
+    Returns {'hash', 'width', 'height', 'sizes': {name: {'width', 'height', fmt: path}}}.
+    """
+    digest = content_hash(source_path)
+    largest = max(sizes.values())
+    result = {'hash': digest, 'sizes': {}}
+
+    with Image.open(source_path) as original:
+        result['width'], result['height'] = original.size
+        # Let the JPEG decoder downscale by a power of two while still covering the largest edge
+        original.draft('RGB', (largest, largest))
+        current = ImageOps.exif_transpose(original)
+        if current.mode not in ('RGB', 'L'):
+            current = current.convert('RGB')
+
+        # Largest first, each size resized from the previous one. Sizes at or
+        # above the source's own edge share one file rather than upscaling.
+        source_edge = max(current.size)
+        for name, edge in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+            edge = min(edge, source_edge)
+            names = {fmt: derivative_name(directory, digest, edge, fmt) for fmt in formats}
+            paths = {fmt: os.path.join(media_root, names[fmt]) for fmt in formats}
+            if all(os.path.exists(path) for path in paths.values()):
+                with Image.open(next(iter(paths.values()))) as done:
+                    width, height = done.size
+            else:
+                current = current.copy()
+                current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                width, height = current.size
+                for fmt, path in paths.items():
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f'{path}.{os.getpid()}.tmp'
+                    current.save(tmp, format=fmt.upper(), quality=quality.get(fmt, 80), **SAVE_OPTIONS.get(fmt, {}))
+                    os.replace(tmp, path)
+            result['sizes'][name] = {'width': width, 'height': height, **names}
+    return result
+
+
+def derivative_url(derivatives, size, fmt='jpeg'):
+    """Absolute URL of one rendered derivative, or None"""
+    from django.core.files.storage import default_storage
+
+    entry = (derivatives or {}).get('sizes', {}).get(size)
+    if entry and fmt in entry:
+        return f'{settings.WEBSITE_URL}{default_storage.url(entry[fmt])}'
+    return None
+
+
+def srcset(derivatives):
+    """{format: 'url 320w, url 800w, ...'} for <source srcset>, or None until rendered"""
+    entries = sorted((derivatives or {}).get('sizes', {}).values(), key=lambda entry: entry['width'])
+    if not entries:
+        return None
+    from django.core.files.storage import default_storage
+
+    return {
+        fmt: ', '.join(
+            f"{settings.WEBSITE_URL}{default_storage.url(entry[fmt])} {entry['width']}w"
+            for entry in entries if fmt in entry
+        )
+        for fmt in image_setting('FORMATS')
+    }
+
+
+class ImageDerivativeService:
+    """
+    Renders derivatives for models with an `image` field and an
+    `image_derivatives` JSON field (Property, PropertyImage). Work is handed
+    to a process pool once the upload commits, so neither the upload request
+    nor a page that finds an image not yet rendered waits on Pillow. The
+    result is written back with an UPDATE guarded by the source name, so a
+    replaced image never receives stale derivatives. A failed render is
+    stored as an error and retried with exponential backoff until
+    MAX_ATTEMPTS renders have failed.
+    """
+
+    _lock = threading.Lock()
+    _executor = None
+    _in_flight = set()
+
+    @classmethod
+    def needs_render(cls, instance, ignore_backoff=False):
+        """True for a new image, or one whose last render failed and is due for a retry"""
+        if not instance.image:
+            return False
+        derivatives = instance.image_derivatives or {}
+        if derivatives.get('source') != instance.image.name:
+            return True
+        if 'error' not in derivatives:
+            return False
+        attempts = derivatives.get('attempts', 1)
+        if attempts >= image_setting('MAX_ATTEMPTS'):
+            return False
+        failed_at = parse_datetime(derivatives.get('failed_at') or '')
+        if ignore_backoff or failed_at is None:
+            return True
+        backoff = timedelta(seconds=image_setting('RETRY_BACKOFF_SECONDS') * 2 ** (attempts - 1))
+        return timezone.now() >= failed_at + backoff
+
+    @staticmethod
+    def failed_attempts(instance):
+        """Renders of the current image that have already failed"""
+        derivatives = instance.image_derivatives or {}
+        if 'error' in derivatives and derivatives.get('source') == instance.image.name:
+            return derivatives.get('attempts', 1)
+        return 0
+
+    @staticmethod
+    def render_error(e, attempts):
+        """What is stored for a failed render; `attempts` counts earlier failures"""
+        return {'error': str(e) or type(e).__name__, 'attempts': attempts + 1, 'failed_at': timezone.now().isoformat()}
+
+    @classmethod
+    def executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=max(1, image_setting('WORKERS')),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return cls._executor
+
+    @staticmethod
+    def render_args(instance):
+        return (
+            instance.image.path,
+            instance.image.storage.location,
+            image_setting('DIRECTORY'),
+            image_setting('SIZES'),
+            image_setting('FORMATS'),
+            image_setting('QUALITY'),
+        )
+
+    @classmethod
+    def schedule(cls, instance):
+        """Render `instance.image` after the current transaction commits, unless current or already queued"""
+        if not cls.needs_render(instance):
+            return
+        model, pk, name = type(instance), instance.pk, instance.image.name
+        args = cls.render_args(instance)
+        attempts = cls.failed_attempts(instance)
+        key = (model._meta.label, pk, name)
+
+        def submit():
+            with cls._lock:
+                if key in cls._in_flight:
+                    return
+                cls._in_flight.add(key)
+            if not image_setting('ASYNC'):
+                try:
+                    cls.store(model, pk, name, cls._render(args, attempts))
+                finally:
+                    cls._in_flight.discard(key)
+                return
+            future = cls.executor().submit(render_derivatives, *args)
+            future.add_done_callback(lambda f: cls._finish(key, model, pk, name, attempts, f))
+
+        transaction.on_commit(submit)
+
+    @classmethod
+    def _render(cls, args, attempts):
+        try:
+            return render_derivatives(*args)
+        except Exception as e:
+            logger.warning(f"Could not render derivatives for {args[0]}: {e}")
+            return cls.render_error(e, attempts)
+
+    @classmethod
+    def _finish(cls, key, model, pk, name, attempts, future):
+        """Done-callback on the pool's management thread"""
+        try:
+            try:
+                derivatives = future.result()
+            except Exception as e:
+                logger.warning(f"Could not render derivatives for {name}: {e}")
+                derivatives = cls.render_error(e, attempts)
+            cls.store(model, pk, name, derivatives)
+        except Exception as e:
+            logger.error(f"Could not store derivatives for {model._meta.label} {pk}: {e}")
+        finally:
+            cls._in_flight.discard(key)
+            # This thread outlives requests, so don't keep its connection open
+            connection.close()
+
+    @staticmethod
+    def store(model, pk, name, derivatives):
+        """Record derivatives (or the render error) if the row still points at `name`"""
+        return model._default_manager.filter(pk=pk, image=name).update(
+            image_derivatives={'source': name, **derivatives}
+        )
@@ -0,0 +1,137 @@
+"""
+Management command to move existing uploads into content-addressed storage, one file per distinct content
+Run this with: python manage.py dedupe_media [--dry-run] [--delete-originals] [--prune]
+"""
+import os
+import shutil
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import FileField
+
+from flexbnb_backend.storage import ContentAddressedStorage, content_name, digest_from_name, file_digest, media_setting
+
+
+class Command(BaseCommand):
+    help = 'Point every FileField at content-addressed copies of its files, so identical uploads share one file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+        parser.add_argument('--delete-originals', action='store_true', help='Remove the old files once nothing references them')
+        parser.add_argument('--prune', action='store_true', help='Remove content-addressed files that nothing references')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not ContentAddressedStorage')
+        dry_run = options['dry_run']
+        started = time.perf_counter()
+
+        fields = [
+            (model, field.name)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+        ]
+
+        digests = {}
+        stats = defaultdict(int)
+        moved = set()
+        stored = set()
+        for model, field_name in fields:
+            by_name = defaultdict(list)
+            rows = model._default_manager.exclude(**{field_name: ''}).values_list('pk', field_name)
+            for pk, name in rows.iterator():
+                if digest_from_name(name) is None:
+                    by_name[name].append(pk)
+
+            with transaction.atomic():
+                for name, pks in by_name.items():
+                    path = default_storage.path(name)
+                    if not os.path.isfile(path):
+                        self.stderr.write(f'Missing file for {model._meta.label}.{field_name}: {name}')
+                        stats['missing'] += 1
+                        continue
+                    if name not in digests:
+                        with open(path, 'rb') as f:
+                            digests[name] = file_digest(iter(lambda: f.read(1024 * 1024), b''))
+                    new_name = content_name(digests[name], name)
+
+                    if new_name in stored or default_storage.exists(new_name):
+                        stats['duplicate_bytes'] += os.path.getsize(path)
+                    else:
+                        stored.add(new_name)
+                        stats['stored'] += 1
+                        if not dry_run:
+                            self._copy(path, default_storage.path(new_name))
+                    stats['rows'] += len(pks)
+                    moved.add(name)
+                    if not dry_run:
+                        model._default_manager.filter(pk__in=pks).update(**{field_name: new_name})
+                        self._retarget_derivatives(model, field_name, pks, name, new_name)
+
+        if options['delete_originals'] and not dry_run:
+            referenced = self._referenced(fields)
+            for name in moved - referenced:
+                default_storage.delete(name)
+                stats['deleted'] += 1
+        if options['prune']:
+            stats['pruned'] = self._prune(self._referenced(fields), dry_run)
+
+        elapsed = time.perf_counter() - started
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{len(moved)} files ({stats['rows']} rows) now content-addressed as {stats['stored']} new files; "
+            f"{stats['duplicate_bytes'] / 1024 / 1024:.1f} MB were duplicates. "
+            f"{stats['deleted']} originals deleted, {stats['pruned']} orphans pruned, "
+            f"{stats['missing']} missing, in {elapsed:.2f}s"
+        ))
+
+    @staticmethod
+    def _copy(source, destination):
+        """Hard-link when possible (no extra bytes on disk), else copy"""
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp = f'{destination}.{os.getpid()}.tmp'
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copy2(source, tmp)
+        os.replace(tmp, destination)
+
+    @staticmethod
+    def _retarget_derivatives(model, field_name, pks, old_name, new_name):
+        """Keep rendered image derivatives attached to the renamed source instead of re-rendering"""
+        if field_name != 'image' or not any(f.name == 'image_derivatives' for f in model._meta.concrete_fields):
+            return
+        for pk, derivatives in model._default_manager.filter(pk__in=pks).values_list('pk', 'image_derivatives'):
+            if derivatives and derivatives.get('source') == old_name:
+                model._default_manager.filter(pk=pk).update(image_derivatives={**derivatives, 'source': new_name})
+
+    @staticmethod
+    def _referenced(fields):
+        referenced = set()
+        for model, field_name in fields:
+            referenced.update(
+                model._default_manager.exclude(**{field_name: ''}).values_list(field_name, flat=True).distinct()
+            )
+        return referenced
+
+    def _prune(self, referenced, dry_run):
+        root = default_storage.path(media_setting('DIRECTORY'))
+        pruned = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                full_path = os.path.join(directory, filename)
+                name = os.path.relpath(full_path, default_storage.location).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                # Leave recent files alone: their rows may not have committed yet
+                if time.time() - os.path.getmtime(full_path) < 3600:
+                    continue
+                pruned += 1
+                if not dry_run:
+                    os.remove(full_path)
+        return pruned
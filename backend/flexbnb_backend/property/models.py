@@ -4,8 +4,33 @@ from django.conf import settings
 from django.db import models
 
 from useraccount.models import User
+from . import images
 
-class Property(models.Model):
+
+class DerivativeImageMixin(models.Model):
+    """Resized WebP/JPEG copies of `image`, rendered by property.images"""
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def derivative_url(self, size, fmt='jpeg'):
+        """URL of a rendered derivative, falling back to the original until it exists"""
+        url = images.derivative_url(self.image_derivatives, size, fmt)
+        if url is None:
+            images.ImageDerivativeService.schedule(self)
+            return self.image_url()
+        return url
+
+    def image_srcset(self):
+        """{format: srcset string}, or None while the derivatives are pending"""
+        if images.ImageDerivativeService.needs_render(self):
+            images.ImageDerivativeService.schedule(self)
+            return None
+        return images.srcset(self.image_derivatives)
+
+
+class Property(DerivativeImageMixin):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -39,6 +64,16 @@ class Property(models.Model):
     gym = models.BooleanField(default=False)
     pet_friendly = models.BooleanField(default=False)
     
+    # Denormalized from an approved GreenCertification (null when not certified)
+    sustainability_score = models.FloatField(null=True, blank=True)
+    green_level = models.CharField(max_length=20, null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-sustainability_score', '-created_at'], name='property_sustainability_idx'),
+            models.Index(fields=['green_level'], name='property_green_level_idx'),
+        ]
+    
     def image_url(self):
         if self.image:
             try:
@@ -52,7 +87,7 @@ class Property(models.Model):
         return self.title
 
 
-class PropertyImage(models.Model):
+class PropertyImage(DerivativeImageMixin):
     property = models.ForeignKey(Property, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='uploads/properties')
 
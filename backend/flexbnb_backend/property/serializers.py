@@ -10,38 +10,46 @@ class PropertiesListSerializer(serializers.ModelSerializer):
     avg_rating = serializers.SerializerMethodField()
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
+    image_url = serializers.SerializerMethodField()
     image_urls = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     green_certification = serializers.SerializerMethodField()
     
     def get_avg_rating(self, obj):
         avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
         return round(avg, 1) if avg else None
     
+    def get_image_url(self, obj):
+        """Card-sized derivative of the main image (the original until it is rendered)"""
+        return obj.derivative_url('card') if obj.image else obj.image_url()
+    
     def get_image_urls(self, obj):
-        """Get all images for the property (main image + additional images)"""
+        """Get all images for the property (main image + additional images), card-sized"""
         image_urls = []
         # Add main image if it exists
         if obj.image:
-            image_urls.append(obj.image_url())
+            image_urls.append(obj.derivative_url('card'))
         # Add all additional images
         for image in obj.images.all():
             if image.image:
-                image_urls.append(image.image_url())
+                image_urls.append(image.derivative_url('card'))
         # If no images, use placeholder
         if not image_urls:
             image_urls = ['https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800&h=600&fit=crop']
         return image_urls
     
+    def get_image_srcset(self, obj):
+        """{format: srcset} for the main image, or None while its derivatives are pending"""
+        return obj.image_srcset()
+    
     def get_green_certification(self, obj):
-        """Get green certification info if property is certified"""
-        if hasattr(obj, 'green_certification'):
-            cert = obj.green_certification
-            if cert.status == 'approved':
-                return {
-                    'status': cert.status,
-                    'level': cert.level,
-                    'sustainability_score': cert.sustainability_score
-                }
+        """Green badge from the property's denormalized columns (no certification query per row)"""
+        if obj.sustainability_score is not None:
+            return {
+                'status': 'approved',
+                'level': obj.green_level,
+                'sustainability_score': obj.sustainability_score
+            }
         return None
     
     class Meta:
@@ -54,6 +62,7 @@ class PropertiesListSerializer(serializers.ModelSerializer):
             'is_hourly_booking',
             'image_url',
             'image_urls',
+            'image_srcset',
             'latitude',
             'longitude',
             'avg_rating',
@@ -77,10 +86,18 @@ class PropertiesDetailSerializer(serializers.ModelSerializer):
     reviews = ReviewSerializer(many=True, read_only=True)
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6, read_only=True)
+    image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     green_certification = serializers.SerializerMethodField()
 
+    def get_image_url(self, obj):
+        return obj.derivative_url('full') if obj.image else obj.image_url()
+
     def get_image_urls(self, obj):
-        return [image.image_url() for image in obj.images.all()]
+        return [image.derivative_url('full') if image.image else image.image_url() for image in obj.images.all()]
+
+    def get_image_srcset(self, obj):
+        return obj.image_srcset()
     
     def get_avg_rating(self, obj):
         avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
@@ -123,6 +140,7 @@ class PropertiesDetailSerializer(serializers.ModelSerializer):
             'guests',
             'host',
             'image_urls',
+            'image_srcset',
             'latitude',
             'longitude',
             'avg_rating',
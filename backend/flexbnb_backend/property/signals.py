@@ -0,0 +1,13 @@
+"""
+Signal handlers that queue image derivative rendering for new uploads
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .images import ImageDerivativeService
+from .models import Property, PropertyImage
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+def render_image_derivatives(sender, instance, **kwargs):
+    ImageDerivativeService.schedule(instance)
@@ -1,3 +1,64 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from useraccount.models import User
+from .images import ImageDerivativeService
+from .models import Property
+
+
+IMAGES = {'MAX_ATTEMPTS': 3, 'RETRY_BACKOFF_SECONDS': 60, 'WORKERS': 1}
+
+
+@override_settings(IMAGE_DERIVATIVES=IMAGES)
+class FailedRenderRetryTests(TestCase):
+    def setUp(self):
+        self.prop = Property.objects.create(
+            title='Test property', description='Test', price_per_night=100, bedrooms=1, bathrooms=1, guests=2,
+            country='Pakistan', country_code='PK', category='test', image='uploads/properties/missing.jpg',
+            Host=User.objects.create_user(name='Host', email='host@example.com', password='x'),
+        )
+
+    def failed(self, attempts, minutes_ago):
+        self.prop.image_derivatives = {
+            'source': self.prop.image.name, 'error': 'cannot identify image file', 'attempts': attempts,
+            'failed_at': (timezone.now() - timedelta(minutes=minutes_ago)).isoformat(),
+        }
+        return self.prop
+
+    def test_failed_render_is_retried_after_backoff(self):
+        needs_render = ImageDerivativeService.needs_render
+        self.assertFalse(needs_render(self.failed(1, minutes_ago=0)))
+        self.assertTrue(needs_render(self.failed(1, minutes_ago=1)))
+        # The backoff doubles with each failed attempt
+        self.assertFalse(needs_render(self.failed(2, minutes_ago=1)))
+        self.assertTrue(needs_render(self.failed(2, minutes_ago=2)))
+        self.assertTrue(needs_render(self.failed(2, minutes_ago=0), ignore_backoff=True))
+
+    def test_gives_up_after_max_attempts(self):
+        self.assertFalse(ImageDerivativeService.needs_render(self.failed(3, minutes_ago=60 * 24), ignore_backoff=True))
+
+    def test_error_from_before_attempts_were_counted_is_retried(self):
+        self.prop.image_derivatives = {'source': self.prop.image.name, 'error': 'broken'}
+        self.assertTrue(ImageDerivativeService.needs_render(self.prop))
+        self.assertEqual(ImageDerivativeService.failed_attempts(self.prop), 1)
+
+    def test_command_retries_failed_renders_without_force(self):
+        Property.objects.filter(pk=self.prop.pk).update(image_derivatives=self.failed(1, minutes_ago=0).image_derivatives)
+
+        call_command('generate_image_derivatives', stdout=StringIO(), stderr=StringIO())
+        derivatives = Property.objects.get(pk=self.prop.pk).image_derivatives
+        self.assertEqual(derivatives['attempts'], 2)
+
+        call_command('generate_image_derivatives', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Property.objects.get(pk=self.prop.pk).image_derivatives['attempts'], 3)
+
+        out = StringIO()
+        call_command('generate_image_derivatives', stdout=out, stderr=StringIO())
+        self.assertIn('All images already have derivatives', out.getvalue())
+
+        call_command('generate_image_derivatives', '--force', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Property.objects.get(pk=self.prop.pk).image_derivatives['attempts'], 4)
@@ -5,6 +5,7 @@ from .models import (
     EcoIncentive,
     EcoIncentiveUsage,
     EnergyUsage,
+    EnergyBaseline,
     SustainableExperience
 )
 
@@ -66,6 +67,13 @@ class EnergyUsageAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(EnergyBaseline)
+class EnergyBaselineAdmin(admin.ModelAdmin):
+    list_display = ['property_obj', 'readings_count', 'last_date', 'electricity_mean', 'water_mean', 'updated_at']
+    search_fields = ['property_obj__title']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(SustainableExperience)
 class SustainableExperienceAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'city', 'rating', 'carbon_neutral', 'eco_certified', 'is_active']
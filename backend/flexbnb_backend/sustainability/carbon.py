@@ -0,0 +1,98 @@
+"""
+Carbon footprint calculator - emission factors and pure footprint functions
+"""
+from functools import lru_cache
+
+
+# kg CO2 per km per person
+TRANSPORT_FACTORS = {
+    'walk': 0,
+    'bike': 0,
+    'bus': 0.089,
+    'train': 0.041,
+    'car': 0.171,
+    'electric_car': 0.053,
+    'flight_domestic': 0.255,
+    'flight_international': 0.195,
+}
+DEFAULT_TRANSPORT_FACTOR = TRANSPORT_FACTORS['car']
+
+# kg CO2 per night per guest, and the share left at a green certified property
+ACCOMMODATION_FACTOR = 20
+GREEN_ACCOMMODATION_MULTIPLIER = 0.7
+
+KG_CO2_PER_TREE_YEAR = 21
+OFFSET_PRICE_PER_KG = 0.02
+
+HIGH_EMISSION_TRANSPORT = ('car', 'flight_domestic', 'flight_international')
+
+
+@lru_cache(maxsize=4096)
+def footprint(transport_type, distance_km, stay_duration_days, number_of_guests=1, is_green=False):
+    """
+    (transport_carbon, accommodation_carbon, total_carbon) in kg CO2.
+    Pure, so repeated quotes (search badges, recalculations) hit the cache.
+    """
+    factor = TRANSPORT_FACTORS.get(transport_type, DEFAULT_TRANSPORT_FACTOR)
+    transport = distance_km * factor * number_of_guests
+    accommodation = ACCOMMODATION_FACTOR * stay_duration_days * number_of_guests
+    if is_green:
+        accommodation *= GREEN_ACCOMMODATION_MULTIPLIER
+    return transport, accommodation, transport + accommodation
+
+
+def summary(transport_type, distance_km, stay_duration_days, number_of_guests=1, is_green=False):
+    """Rounded footprint figures as returned by the API"""
+    transport, accommodation, total = footprint(
+        transport_type, float(distance_km), int(stay_duration_days), int(number_of_guests), bool(is_green)
+    )
+    return {
+        'transport_carbon': round(transport, 2),
+        'accommodation_carbon': round(accommodation, 2),
+        'total_carbon': round(total, 2),
+        'equivalent_trees': round(total / KG_CO2_PER_TREE_YEAR, 1),
+        'is_green_property': bool(is_green),
+    }
+
+
+def recommendations(transport_type, is_green, total_carbon):
+    """Suggestions to reduce a trip's footprint"""
+    tips = []
+    if transport_type in HIGH_EMISSION_TRANSPORT:
+        tips.append({
+            'category': 'transport',
+            'message': 'Consider using train or bus for shorter distances to reduce your carbon footprint by up to 80%',
+            'impact': 'high'
+        })
+    if transport_type == 'car':
+        tips.append({
+            'category': 'transport',
+            'message': 'Switching to an electric car could reduce your transport emissions by 70%',
+            'impact': 'medium'
+        })
+    if not is_green:
+        tips.append({
+            'category': 'accommodation',
+            'message': 'Choosing a Green Stay certified property can reduce accommodation emissions by 30%',
+            'impact': 'medium'
+        })
+    tips.append({
+        'category': 'offset',
+        'message': f'Consider purchasing carbon offsets for ${round(total_carbon * OFFSET_PRICE_PER_KG, 2)} to neutralize your trip',
+        'impact': 'high'
+    })
+    return tips
+
+
+def green_property_ids(property_ids):
+    """Ids (as str) of the given properties with an approved green certification, in one query"""
+    from .models import GreenCertification
+
+    property_ids = [pk for pk in property_ids if pk]
+    if not property_ids:
+        return set()
+    return {
+        str(pk) for pk in GreenCertification.objects.filter(
+            property_obj_id__in=property_ids, status='approved'
+        ).values_list('property_obj_id', flat=True)
+    }
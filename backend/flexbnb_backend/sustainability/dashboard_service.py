@@ -0,0 +1,77 @@
+"""
+Sustainability Dashboard Service - per-host headline stats in two aggregate queries, cached
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from property.models import Property
+from .models import EnergyUsage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SustainabilityDashboardService:
+    """
+    Certification figures come from Property's denormalized sustainability
+    columns, usage figures from one conditional count over the recent
+    window. Results are cached per host and day, and invalidated when the
+    host's properties, certifications or energy readings change.
+    """
+
+    RECENT_DAYS = 7
+    CACHE_SECONDS = 60 * 15
+
+    @staticmethod
+    def cache_key(host_id, day=None):
+        return f'sustainability_dashboard:{host_id}:{day or timezone.now().date()}'
+
+    @classmethod
+    def stats(cls, host):
+        key = cls.cache_key(host.pk)
+        stats = cache.get(key)
+        if stats is None:
+            stats = cls._compute(host)
+            cache.set(key, stats, cls.CACHE_SECONDS)
+        return stats
+
+    @classmethod
+    def _compute(cls, host):
+        properties = Property.objects.filter(Host=host).aggregate(
+            total=Count('id'),
+            certified=Count('id', filter=Q(sustainability_score__isnull=False)),
+            avg_score=Avg('sustainability_score'),
+        )
+        usage = EnergyUsage.objects.filter(
+            property_obj__Host=host,
+            date__gte=timezone.now().date() - timedelta(days=cls.RECENT_DAYS)
+        ).aggregate(
+            records=Count('id'),
+            anomalies=Count('id', filter=Q(is_anomaly=True)),
+        )
+
+        total, certified = properties['total'], properties['certified']
+        return {
+            'certified_properties': certified,
+            'total_properties': total,
+            'certification_rate': round((certified / total * 100), 1) if total > 0 else 0,
+            'avg_sustainability_score': round(properties['avg_score'] or 0, 1),
+            'recent_anomalies': usage['anomalies'],
+            'total_usage_records': usage['records'],
+        }
+
+    @classmethod
+    def invalidate(cls, *host_ids):
+        """Drop the cached stats for these hosts once the current transaction commits"""
+        host_ids = {pk for pk in host_ids if pk is not None}
+        if host_ids:
+            transaction.on_commit(lambda: cache.delete_many([cls.cache_key(pk) for pk in host_ids]))
+
+    @classmethod
+    def invalidate_properties(cls, property_ids):
+        """Invalidate the hosts of the given properties, for bulk writes that bypass signals"""
+        cls.invalidate(*Property.objects.filter(pk__in=list(property_ids)).values_list('Host_id', flat=True).distinct())
@@ -0,0 +1,149 @@
+"""
+Bulk EnergyUsage ingestion for smart-meter feeds (JSON arrays or CSV uploads)
+"""
+import codecs
+import csv
+import uuid
+from datetime import date
+
+from django.db import transaction
+
+from property.models import Property
+from .anomaly_detector import EnergyAnomalyDetector
+from .dashboard_service import SustainabilityDashboardService
+from .models import EnergyUsage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+INGEST_CHUNK_SIZE = 5000
+MAX_JSON_READINGS = 100000
+MAX_CSV_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+
+UPSERT_FIELDS = [
+    'electricity_kwh', 'water_liters', 'gas_kwh', 'occupancy_rate', 'number_of_guests',
+    'outdoor_temperature', 'is_anomaly', 'ai_recommendation',
+]
+
+
+def iter_csv_rows(uploaded_file, encoding='utf-8-sig'):
+    """Yield dicts from an uploaded CSV file without reading it into memory"""
+    yield from csv.DictReader(codecs.iterdecode(uploaded_file, encoding))
+
+
+def _number(row, field, cast=float, default=None, minimum=None, maximum=None):
+    value = row.get(field)
+    if value is None or value == '':
+        if default is None:
+            raise ValueError(f'{field} is required')
+        return default
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number')
+    if number != number or number in (float('inf'), float('-inf')):
+        raise ValueError(f'{field} must be a number')
+    if minimum is not None and number < minimum:
+        raise ValueError(f'{field} must be at least {minimum}')
+    if maximum is not None and number > maximum:
+        raise ValueError(f'{field} must be at most {maximum}')
+    return number
+
+
+def parse_reading(row, property_id=None):
+    """
+    Validate one raw row (JSON object or CSV dict) into EnergyUsage field
+    values. Raises ValueError with a message naming the offending field.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Each reading must be an object')
+    property_id = str(row.get('property') or property_id or '').strip()
+    if not property_id:
+        raise ValueError('property is required')
+    try:
+        property_id = str(uuid.UUID(property_id))
+    except ValueError:
+        raise ValueError('property must be a valid id')
+    try:
+        day = date.fromisoformat(str(row.get('date') or '').strip())
+    except ValueError:
+        raise ValueError('date must be YYYY-MM-DD')
+
+    temperature = row.get('outdoor_temperature')
+    return {
+        'property_obj_id': property_id,
+        'date': day,
+        'electricity_kwh': _number(row, 'electricity_kwh', minimum=0),
+        'water_liters': _number(row, 'water_liters', minimum=0),
+        'gas_kwh': _number(row, 'gas_kwh', default=0.0, minimum=0),
+        'occupancy_rate': _number(row, 'occupancy_rate', default=0.0, minimum=0, maximum=100),
+        'number_of_guests': _number(row, 'number_of_guests', cast=int, default=0, minimum=0),
+        'outdoor_temperature': None if temperature in (None, '') else _number(row, 'outdoor_temperature'),
+    }
+
+
+class EnergyIngestionService:
+    """
+    Validates readings as they are read, then scores and upserts them in
+    chunks keyed by (property, date). A reading for an existing day replaces
+    it; within one upload the last reading for a day wins.
+    """
+
+    @classmethod
+    def ingest(cls, rows, host, property_id=None, chunk_size=INGEST_CHUNK_SIZE):
+        """
+        `rows` is any iterable of dicts. Returns counts plus the first
+        MAX_REPORTED_ERRORS row errors (1-based row numbers). If the file
+        cannot be decoded part way through, the rows read before that point
+        are still imported and `error` says where reading stopped.
+        """
+        owned = {str(pk) for pk in Property.objects.filter(Host=host).values_list('id', flat=True)}
+        result = {'received': 0, 'imported': 0, 'anomalies': 0, 'error_count': 0, 'errors': []}
+
+        chunk = {}
+        try:
+            for number, row in enumerate(rows, start=1):
+                result['received'] += 1
+                try:
+                    values = parse_reading(row, property_id)
+                    if values['property_obj_id'] not in owned:
+                        raise ValueError('Property not found or access denied')
+                except ValueError as e:
+                    result['error_count'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append({'row': number, 'error': str(e)})
+                    continue
+                chunk[(values['property_obj_id'], values['date'])] = values
+                if len(chunk) >= chunk_size:
+                    cls._write_chunk(chunk.values(), result)
+                    chunk = {}
+        except (UnicodeDecodeError, csv.Error) as e:
+            result['error'] = f"Could not read CSV after row {result['received']}: {e}"
+        if chunk:
+            cls._write_chunk(chunk.values(), result)
+        if result['imported']:
+            # bulk_create sends no post_save signals
+            SustainabilityDashboardService.invalidate(host.pk)
+
+        logger.info(
+            f"Ingested {result['imported']} energy readings for host {host.pk} "
+            f"({result['error_count']} rejected, {result['anomalies']} anomalies)"
+        )
+        return result
+
+    @staticmethod
+    def _write_chunk(values, result):
+        readings = [EnergyUsage(**v) for v in values]
+        with transaction.atomic():
+            EnergyAnomalyDetector.score(readings)
+            EnergyUsage.objects.bulk_create(
+                readings,
+                update_conflicts=True,
+                unique_fields=['property_obj', 'date'],
+                update_fields=UPSERT_FIELDS,
+                batch_size=1000,
+            )
+        result['imported'] += len(readings)
+        result['anomalies'] += sum(r.is_anomaly for r in readings)
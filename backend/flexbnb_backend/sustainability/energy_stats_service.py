@@ -0,0 +1,70 @@
+"""
+Energy Stats Service - database-side usage statistics per property
+"""
+from django.db.models import Avg, Count, F, Q, StdDev, Sum, Window
+from django.db.models.expressions import RowRange
+from .models import EnergyUsage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class EnergyStatsService:
+    """Aggregates EnergyUsage in the database"""
+
+    ROLLING_DAYS = 7
+
+    @staticmethod
+    def summary(queryset):
+        """Totals, averages and per-guest figures for a set of readings in one aggregate query"""
+        with_guests = Q(number_of_guests__gt=0)
+        stats = queryset.order_by().aggregate(
+            records_count=Count('id'),
+            total_electricity=Sum('electricity_kwh'),
+            total_water=Sum('water_liters'),
+            avg_electricity=Avg('electricity_kwh'),
+            avg_water=Avg('water_liters'),
+            stddev_electricity=StdDev('electricity_kwh'),
+            stddev_water=StdDev('water_liters'),
+            total_guests=Sum('number_of_guests', filter=with_guests),
+            anomaly_count=Count('id', filter=Q(is_anomaly=True)),
+        )
+        if not stats['records_count']:
+            return {}
+
+        total_guests = stats['total_guests'] or 0
+        return {
+            'total_electricity_kwh': round(stats['total_electricity'], 2),
+            'total_water_liters': round(stats['total_water'], 2),
+            'avg_electricity_per_day': round(stats['avg_electricity'], 2),
+            'avg_water_per_day': round(stats['avg_water'], 2),
+            'stddev_electricity_per_day': round(stats['stddev_electricity'] or 0, 2),
+            'stddev_water_per_day': round(stats['stddev_water'] or 0, 2),
+            'avg_electricity_per_guest': round(stats['total_electricity'] / total_guests, 2) if total_guests > 0 else 0,
+            'avg_water_per_guest': round(stats['total_water'] / total_guests, 2) if total_guests > 0 else 0,
+            'anomaly_count': stats['anomaly_count'],
+            'records_count': stats['records_count'],
+        }
+
+    @classmethod
+    def rolling_averages(cls, property_id, start_date):
+        """Per-day readings since `start_date` with trailing ROLLING_DAYS averages computed by a window function"""
+        frame = RowRange(start=-(cls.ROLLING_DAYS - 1), end=0)
+        window = {'partition_by': [F('property_obj')], 'order_by': F('date').asc(), 'frame': frame}
+        rows = (
+            EnergyUsage.objects.filter(property_obj_id=property_id, date__gte=start_date)
+            .annotate(
+                rolling_electricity=Window(Avg('electricity_kwh'), **window),
+                rolling_water=Window(Avg('water_liters'), **window),
+            )
+            .order_by('date')
+            .values('date', 'rolling_electricity', 'rolling_water')
+        )
+        return [
+            {
+                'date': row['date'],
+                'electricity_kwh': round(row['rolling_electricity'], 2),
+                'water_liters': round(row['rolling_water'], 2),
+            }
+            for row in rows
+        ]
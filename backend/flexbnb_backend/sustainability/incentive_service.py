@@ -0,0 +1,148 @@
+"""
+Incentive Eligibility Service - which eco incentives apply to a stay, with cached per-user usage counts
+"""
+from bisect import bisect_right
+from datetime import datetime, time as dt_time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from property.models import Property
+from .models import EcoIncentive, EcoIncentiveUsage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncentiveEligibilityService:
+    """
+    Decides which incentives a stay qualifies for. Active incentives are kept
+    in a cached index sorted by window start, so the incentives live at a
+    moment are a bisect plus an end check. Per-user usage counts are cached
+    and dropped whenever a usage is recorded or removed.
+    """
+
+    INDEX_KEY = 'eco_incentive_index'
+    INDEX_CACHE_SECONDS = 60 * 60
+    USAGE_CACHE_SECONDS = 60 * 60 * 24
+
+    # Reasons an incentive does not apply, in the order they are checked
+    NOT_ACTIVE = 'not_active'
+    STAY_TOO_SHORT = 'stay_too_short'
+    REQUIRES_GREEN_PROPERTY = 'requires_green_property'
+    USES_EXHAUSTED = 'uses_exhausted'
+
+    # ---- Active window index ----
+
+    @classmethod
+    def interval_index(cls):
+        """(starts, incentives) for active incentives, both ordered by valid_from"""
+        index = cache.get(cls.INDEX_KEY)
+        if index is None:
+            incentives = [
+                {
+                    'id': str(incentive.pk),
+                    'name': incentive.name,
+                    'type': incentive.type,
+                    'value': incentive.value,
+                    'percentage': incentive.percentage,
+                    'requires_green_property': incentive.requires_green_property,
+                    'min_stay_nights': incentive.min_stay_nights,
+                    'max_uses_per_user': incentive.max_uses_per_user,
+                    'valid_from': incentive.valid_from,
+                    'valid_until': incentive.valid_until,
+                }
+                for incentive in EcoIncentive.objects.filter(is_active=True).order_by('valid_from')
+            ]
+            index = ([i['valid_from'] for i in incentives], incentives)
+            cache.set(cls.INDEX_KEY, index, cls.INDEX_CACHE_SECONDS)
+        return index
+
+    @classmethod
+    def active_at(cls, moment):
+        """Incentives whose validity window contains `moment`"""
+        starts, incentives = cls.interval_index()
+        return [i for i in incentives[:bisect_right(starts, moment)] if i['valid_until'] >= moment]
+
+    @classmethod
+    def invalidate_index(cls):
+        transaction.on_commit(lambda: cache.delete(cls.INDEX_KEY))
+
+    # ---- Per-user usage counters ----
+
+    @staticmethod
+    def usage_key(user_id):
+        return f'eco_incentive_usage:{user_id}'
+
+    @classmethod
+    def usage_counts(cls, user):
+        """{incentive_id: times used} for `user`, from cache after the first grouped query"""
+        key = cls.usage_key(user.pk)
+        counts = cache.get(key)
+        if counts is None:
+            counts = {
+                str(incentive_id): uses
+                for incentive_id, uses in EcoIncentiveUsage.objects.filter(user=user)
+                .order_by().values('incentive_id').annotate(uses=Count('id')).values_list('incentive_id', 'uses')
+            }
+            cache.set(key, counts, cls.USAGE_CACHE_SECONDS)
+        return counts
+
+    @classmethod
+    def invalidate_usage(cls, *user_ids):
+        """
+        Drop cached counts once the transaction commits; the next read
+        recounts. (A read-modify-write bump could lose concurrent increments
+        and let a user exceed max_uses_per_user.)
+        """
+        keys = [cls.usage_key(pk) for pk in user_ids if pk is not None]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    # ---- Eligibility ----
+
+    @staticmethod
+    def stay_start(check_in):
+        return timezone.make_aware(datetime.combine(check_in, dt_time.min))
+
+    @classmethod
+    def reason_ineligible(cls, incentive, nights, is_green, used=0):
+        """None when `incentive` (already known to be active) applies, else the first failing rule"""
+        if nights < incentive['min_stay_nights']:
+            return cls.STAY_TOO_SHORT
+        if incentive['requires_green_property'] and not is_green:
+            return cls.REQUIRES_GREEN_PROPERTY
+        if used >= incentive['max_uses_per_user']:
+            return cls.USES_EXHAUSTED
+        return None
+
+    @classmethod
+    def evaluate(cls, properties, check_in, nights, user=None, types=None):
+        """
+        Eligible incentives per property for the same stay, for a whole page
+        of properties at once: {property_id: [incentive, ...]}. Each incentive
+        carries `remaining_uses` when `user` is given. Uses the properties'
+        denormalized sustainability columns, so no certification queries.
+        """
+        incentives = [
+            i for i in cls.active_at(cls.stay_start(check_in))
+            if types is None or i['type'] in types
+        ]
+        used = cls.usage_counts(user) if user is not None and incentives else {}
+
+        eligible = {}
+        for prop in properties:
+            is_green = prop.sustainability_score is not None
+            eligible[prop.pk] = [
+                {**i, 'remaining_uses': i['max_uses_per_user'] - used.get(i['id'], 0)}
+                for i in incentives
+                if cls.reason_ineligible(i, nights, is_green, used.get(i['id'], 0)) is None
+            ]
+        return eligible
+
+    @classmethod
+    def evaluate_ids(cls, property_ids, check_in, nights, user=None, types=None):
+        properties = Property.objects.filter(pk__in=property_ids).only('id', 'sustainability_score')
+        return cls.evaluate(properties, check_in, nights, user=user, types=types)
@@ -0,0 +1,94 @@
+"""
+Benchmark bulk energy usage ingestion (JSON rows and CSV uploads)
+Run this with: python manage.py bench_energy_ingestion --readings 100000 --properties 50
+
+Synthetic data is created inside a transaction that is rolled back at the end.
+"""
+import csv
+import io
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from property.models import Property
+from sustainability.energy_ingestion import EnergyIngestionService, iter_csv_rows
+from sustainability.models import EnergyUsage
+from useraccount.models import User
+
+FIELDS = ['property', 'date', 'electricity_kwh', 'water_liters', 'occupancy_rate', 'number_of_guests', 'outdoor_temperature']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark readings per second through the bulk ingestion service'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readings', type=int, default=100000)
+        parser.add_argument('--properties', type=int, default=50)
+
+    def handle(self, *args, **options):
+        count = options['readings']
+        rng = random.Random(7)
+
+        with transaction.atomic():
+            host, properties = self.seed(options['properties'])
+            rows = self.rows(properties, count, rng)
+
+            started = time.perf_counter()
+            result = EnergyIngestionService.ingest(rows, host)
+            self.report('JSON rows (insert)', result, time.perf_counter() - started)
+
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+            upload = io.BytesIO(buffer.getvalue().encode())
+
+            started = time.perf_counter()
+            result = EnergyIngestionService.ingest(iter_csv_rows(upload), host)
+            self.report('CSV upload (upsert)', result, time.perf_counter() - started)
+
+            self.stdout.write(f'{EnergyUsage.objects.filter(property_obj__in=properties).count():,} readings stored')
+            transaction.set_rollback(True)
+
+    def report(self, label, result, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:<20} {result["imported"]:,} readings in {elapsed:.2f}s '
+            f'({result["imported"] / elapsed:,.0f} readings/s, {result["anomalies"]:,} anomalies, '
+            f'{result["error_count"]} rejected)'
+        ))
+
+    @staticmethod
+    def rows(properties, count, rng):
+        start = date.today() - timedelta(days=count // len(properties) + 1)
+        rows = []
+        for i in range(count):
+            day, prop = divmod(i, len(properties))
+            occupancy = rng.choice([0, 50, 100])
+            rows.append({
+                'property': str(properties[prop].pk),
+                'date': (start + timedelta(days=day)).isoformat(),
+                # Usage follows occupancy; about 1% of days spike
+                'electricity_kwh': round(rng.uniform(18, 22) * (0.3 + 0.7 * occupancy / 100) * (3 if rng.random() < 0.01 else 1), 2),
+                'water_liters': round(rng.uniform(180, 220) * (0.3 + 0.7 * occupancy / 100), 1),
+                'occupancy_rate': occupancy,
+                'number_of_guests': rng.randint(0, 4),
+                'outdoor_temperature': round(rng.uniform(0, 35), 1),
+            })
+        return rows
+
+    @staticmethod
+    def seed(property_count):
+        host = User.objects.create(email='energy-bench-host@example.com', name='Bench Host', password=make_password(None))
+        properties = Property.objects.bulk_create([
+            Property(
+                title=f'Bench property {i}', description='Benchmark', price_per_night=100,
+                bedrooms=1, bathrooms=1, guests=2, country='Pakistan', country_code='PK',
+                category='bench', image='uploads/properties/bench.jpg', Host=host
+            )
+            for i in range(property_count)
+        ])
+        return host, properties
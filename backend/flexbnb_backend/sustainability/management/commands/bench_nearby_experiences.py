@@ -0,0 +1,105 @@
+"""
+Benchmark nearest-experience search against the per-row Python haversine loop
+Run this with: python manage.py bench_nearby_experiences --experiences 1000000 --radius-km 25 --limit 20
+
+Synthetic data is created inside a transaction that is rolled back at the end.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sustainability.models import SustainableExperience
+from sustainability.nearby_service import NearbyExperienceService
+from sustainability.views import haversine_distance
+
+
+# (latitude, longitude) of cities experiences are scattered around
+CENTERS = [
+    (24.86, 67.01), (31.55, 74.34), (33.68, 73.05), (51.51, -0.13), (40.71, -74.01),
+    (48.86, 2.35), (35.68, 139.69), (-33.87, 151.21), (25.20, 55.27), (41.01, 28.98),
+]
+CATEGORIES = [choice for choice, _ in SustainableExperience.CATEGORY_CHOICES]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark radius/top-K nearby experience search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--experiences', type=int, default=1000000)
+        parser.add_argument('--radius-km', type=float, default=25)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--skip-legacy', action='store_true', help='Skip the full-scan Python loop')
+
+    def handle(self, *args, **options):
+        radius_km = options['radius_km']
+        limit = options['limit']
+        rng = random.Random(42)
+        points = [
+            (lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.1, 0.1))
+            for lat, lon in (rng.choice(CENTERS) for _ in range(options['queries']))
+        ]
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options['experiences'], rng)
+            self.stdout.write(f'Seeded {options["experiences"]:,} experiences in {time.perf_counter() - started:.2f}s')
+            experiences = SustainableExperience.objects.filter(is_active=True)
+
+            started = time.perf_counter()
+            for lat, lon in points:
+                nearest = NearbyExperienceService.nearest(experiences, lat, lon, radius_km=radius_km, limit=limit)
+            self.report('Bounding box + top-K', len(points), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for lat, lon in points:
+                NearbyExperienceService.nearest(experiences, lat, lon, limit=limit)
+            self.report('Expanding top-K', len(points), time.perf_counter() - started)
+
+            if not options['skip_legacy']:
+                lat, lon = points[-1]
+                started = time.perf_counter()
+                legacy = self.legacy(experiences, lat, lon, radius_km)[:limit]
+                self.report('Python loop + sort', 1, time.perf_counter() - started)
+
+                if [e.distance_from_property for e in legacy] != [e.distance_from_property for e in nearest]:
+                    self.stdout.write(self.style.WARNING('Distances differ from the Python loop'))
+
+            transaction.set_rollback(True)
+
+    def report(self, label, queries, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:<22} {queries} queries in {elapsed:.2f}s ({elapsed / queries * 1000:,.1f} ms/query)'
+        ))
+
+    @staticmethod
+    def legacy(experiences, lat, lon, radius_km):
+        """The unfiltered path: every row into Python, one haversine call each, full sort"""
+        experiences_list = list(experiences)
+        for exp in experiences_list:
+            exp.distance_from_property = haversine_distance(lat, lon, exp.latitude, exp.longitude)
+        experiences_list = [e for e in experiences_list if e.distance_from_property <= radius_km]
+        experiences_list.sort(key=lambda x: x.distance_from_property)
+        return experiences_list
+
+    @staticmethod
+    def seed(count, rng):
+        batch = []
+        for i in range(count):
+            if i % 5 == 0:
+                lat, lon = rng.uniform(-60, 70), rng.uniform(-180, 180)
+            else:
+                center_lat, center_lon = rng.choice(CENTERS)
+                lat, lon = center_lat + rng.gauss(0, 1.5), center_lon + rng.gauss(0, 1.5)
+            batch.append(SustainableExperience(
+                name=f'Bench experience {i}', description='Benchmark', category=CATEGORIES[i % len(CATEGORIES)],
+                city='Bench', country='Bench', latitude=max(-90, min(90, lat)),
+                longitude=(lon + 180) % 360 - 180, rating=rng.uniform(0, 5),
+            ))
+            if len(batch) == 5000:
+                SustainableExperience.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            SustainableExperience.objects.bulk_create(batch)
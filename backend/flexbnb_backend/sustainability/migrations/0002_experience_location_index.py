@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sustainability', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sustainableexperience',
+            index=models.Index(fields=['latitude', 'longitude'], name='experience_lat_lng_idx'),
+        ),
+    ]
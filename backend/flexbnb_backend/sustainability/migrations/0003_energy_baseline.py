@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0004_property_air_conditioning_property_breakfast_and_more'),
+        ('sustainability', '0002_experience_location_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnergyBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('readings_count', models.IntegerField(default=0)),
+                ('last_date', models.DateField(blank=True, help_text='Date of the latest reading folded into the state', null=True)),
+                ('electricity_mean', models.FloatField(default=0)),
+                ('electricity_var', models.FloatField(default=0)),
+                ('water_mean', models.FloatField(default=0)),
+                ('water_var', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('property_obj', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='energy_baseline', to='property.property')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+PRACTICE_FIELDS = (
+    'energy_saving', 'water_conservation', 'recycling_program', 'reduced_plastic',
+    'renewable_energy', 'organic_amenities', 'local_sourcing', 'green_transportation',
+)
+
+
+def backfill(apps, schema_editor):
+    GreenCertification = apps.get_model('sustainability', 'GreenCertification')
+    Property = apps.get_model('property', 'Property')
+    for cert in GreenCertification.objects.filter(status='approved').iterator():
+        score = sum(getattr(cert, field) for field in PRACTICE_FIELDS) / len(PRACTICE_FIELDS) * 100
+        Property.objects.filter(pk=cert.property_obj_id).update(sustainability_score=score, green_level=cert.level)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0005_property_sustainability_columns'),
+        ('sustainability', '0003_energy_baseline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
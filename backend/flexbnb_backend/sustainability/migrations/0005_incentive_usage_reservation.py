@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_reservation_host_created_index'),
+        ('sustainability', '0004_backfill_property_sustainability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ecoincentiveusage',
+            name='reservation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='incentive_usage', to='booking.reservation'),
+        ),
+    ]
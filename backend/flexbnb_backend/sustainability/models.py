@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from useraccount.models import User
 from property.models import Property
+from . import carbon
 import uuid
 
 
@@ -60,20 +61,30 @@ class GreenCertification(models.Model):
     def __str__(self):
         return f"{self.property_obj.title} - {self.status} ({self.level or 'N/A'})"
     
+    PRACTICE_FIELDS = (
+        'energy_saving',
+        'water_conservation',
+        'recycling_program',
+        'reduced_plastic',
+        'renewable_energy',
+        'organic_amenities',
+        'local_sourcing',
+        'green_transportation',
+    )
+    
     @property
     def sustainability_score(self):
         """Calculate sustainability score based on practices (0-100)"""
-        practices = [
-            self.energy_saving,
-            self.water_conservation,
-            self.recycling_program,
-            self.reduced_plastic,
-            self.renewable_energy,
-            self.organic_amenities,
-            self.local_sourcing,
-            self.green_transportation,
-        ]
+        practices = [getattr(self, field) for field in self.PRACTICE_FIELDS]
         return (sum(practices) / len(practices)) * 100
+    
+    def sync_property(self):
+        """Copy the score and level onto the property's indexed columns (cleared unless approved)"""
+        approved = self.status == 'approved'
+        Property.objects.filter(pk=self.property_obj_id).update(
+            sustainability_score=self.sustainability_score if approved else None,
+            green_level=self.level if approved else None,
+        )
 
 
 class CarbonFootprint(models.Model):
@@ -118,49 +129,20 @@ class CarbonFootprint(models.Model):
     def __str__(self):
         return f"Carbon Calc - {self.user.email if self.user else 'Anonymous'} - {self.total_carbon}kg CO2"
     
-    def calculate_carbon(self):
+    def calculate_carbon(self, is_green=None):
         """
-        Calculate carbon footprint based on transport and accommodation
-        CO2 emission factors (kg CO2 per km per person):
-        - Walking/Bike: 0
-        - Bus: 0.089
-        - Train: 0.041
-        - Car: 0.171
-        - Electric Car: 0.053
-        - Domestic Flight: 0.255
-        - International Flight: 0.195
-        
-        Accommodation: ~20kg CO2 per night per guest (average)
-        Green certified properties: -30% reduction
+        Calculate carbon footprint based on transport and accommodation.
+        Factors live in sustainability.carbon; green certified properties get
+        a 30% accommodation reduction. Pass `is_green` when it is already
+        known to skip the certification lookup.
         """
-        # Transport CO2 factors
-        transport_factors = {
-            'walk': 0,
-            'bike': 0,
-            'bus': 0.089,
-            'train': 0.041,
-            'car': 0.171,
-            'electric_car': 0.053,
-            'flight_domestic': 0.255,
-            'flight_international': 0.195,
-        }
-        
-        # Calculate transport carbon
-        factor = transport_factors.get(self.transport_type, 0.171)
-        self.transport_carbon = self.distance_km * factor * self.number_of_guests
-        
-        # Calculate accommodation carbon (20kg CO2 per night per guest)
-        base_accommodation = 20 * self.stay_duration_days * self.number_of_guests
-        
-        # Apply green certification discount if property is certified
-        if self.property_obj and hasattr(self.property_obj, 'green_certification'):
-            cert = self.property_obj.green_certification
-            if cert.status == 'approved':
-                base_accommodation *= 0.7  # 30% reduction for green properties
-        
-        self.accommodation_carbon = base_accommodation
-        self.total_carbon = self.transport_carbon + self.accommodation_carbon
+        if is_green is None:
+            is_green = bool(self.property_obj_id) and str(self.property_obj_id) in carbon.green_property_ids([self.property_obj_id])
         
+        self.transport_carbon, self.accommodation_carbon, self.total_carbon = carbon.footprint(
+            self.transport_type, float(self.distance_km), int(self.stay_duration_days),
+            int(self.number_of_guests), is_green
+        )
         return self.total_carbon
 
 
@@ -211,6 +193,10 @@ class EcoIncentiveUsage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='eco_incentive_usage')
     incentive = models.ForeignKey(EcoIncentive, on_delete=models.CASCADE, related_name='usage_records')
     property_obj = models.ForeignKey(Property, on_delete=models.SET_NULL, null=True, blank=True)
+    # The booking the discount was applied to; the use is given back if it is declined or cancelled
+    reservation = models.ForeignKey(
+        'booking.Reservation', on_delete=models.CASCADE, null=True, blank=True, related_name='incentive_usage'
+    )
     
     used_at = models.DateTimeField(auto_now_add=True)
     amount_saved = models.DecimalField(max_digits=10, decimal_places=2)
@@ -264,6 +250,27 @@ class EnergyUsage(models.Model):
         return {'electricity': 0, 'water': 0}
 
 
+class EnergyBaseline(models.Model):
+    """
+    Streaming anomaly-detection state per property: exponentially weighted
+    mean and variance of occupancy/temperature-normalized daily usage
+    """
+    property_obj = models.OneToOneField(Property, on_delete=models.CASCADE, related_name='energy_baseline')
+    
+    readings_count = models.IntegerField(default=0)
+    last_date = models.DateField(null=True, blank=True, help_text="Date of the latest reading folded into the state")
+    
+    electricity_mean = models.FloatField(default=0)
+    electricity_var = models.FloatField(default=0)
+    water_mean = models.FloatField(default=0)
+    water_var = models.FloatField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.property_obj.title} - baseline ({self.readings_count} readings)"
+
+
 class SustainableExperience(models.Model):
     """
     Local eco-friendly activities and experiences
@@ -312,6 +319,10 @@ class SustainableExperience(models.Model):
     
     class Meta:
         ordering = ['-rating', 'name']
+        indexes = [
+            # Bounding-box prefilter for nearby searches
+            models.Index(fields=['latitude', 'longitude'], name='experience_lat_lng_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.city}"
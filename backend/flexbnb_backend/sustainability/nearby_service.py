@@ -0,0 +1,107 @@
+"""
+Nearby Experience Service - radius/top-K search over SustainableExperience coordinates
+"""
+import math
+
+import numpy as np
+from django.db.models import Q
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distances in km from one point to arrays of points"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Q filter for the lat/lng box enclosing the circle. Splits the longitude
+    range when the box crosses the antimeridian and drops it near the poles.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    q = Q(latitude__gte=lat - dlat, latitude__lte=lat + dlat)
+
+    cos_lat = math.cos(math.radians(lat))
+    if lat + dlat >= 90 or lat - dlat <= -90 or cos_lat < 1e-6:
+        return q
+    dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+    if dlon >= 180:
+        return q
+
+    west, east = lon - dlon, lon + dlon
+    if west < -180:
+        return q & (Q(longitude__gte=west + 360) | Q(longitude__lte=east))
+    if east > 180:
+        return q & (Q(longitude__gte=west) | Q(longitude__lte=east - 360))
+    return q & Q(longitude__gte=west, longitude__lte=east)
+
+
+class NearbyExperienceService:
+    """
+    Finds the experiences closest to a point. Candidates are narrowed by a
+    bounding box in SQL, distances for the survivors are computed in one
+    NumPy pass, and only the top `limit` are selected and loaded.
+    """
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 200
+    MAX_RADIUS_KM = 20000
+
+    # Without a radius, search widening circles until one holds `limit`
+    # experiences; the last circle bounds the search, so no request scans
+    # every experience
+    EXPANDING_RADII_KM = (25, 100, 400, 1600)
+
+    @classmethod
+    def nearest(cls, queryset, lat, lon, radius_km=None, limit=DEFAULT_LIMIT):
+        """
+        Returns up to `limit` experiences from `queryset`, nearest first, each
+        with `distance_from_property` set (km). Experiences without
+        coordinates are skipped. Without `radius_km`, nothing farther than
+        the largest of EXPANDING_RADII_KM is returned.
+        """
+        candidates = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+        if radius_km is not None:
+            ids, distances, positions = cls._within(candidates, lat, lon, radius_km)
+        else:
+            # Every experience inside a circle is closer than any outside it,
+            # so the first circle with `limit` hits holds the global top-K
+            for radius in cls.EXPANDING_RADII_KM:
+                ids, distances, positions = cls._within(candidates, lat, lon, radius)
+                if len(positions) >= limit:
+                    break
+
+        if len(positions) > limit:
+            positions = positions[np.argpartition(distances[positions], limit - 1)[:limit]]
+        positions = positions[np.argsort(distances[positions], kind='stable')]
+
+        by_id = queryset.in_bulk([ids[i] for i in positions])
+        experiences = []
+        for i in positions:
+            experience = by_id[ids[i]]
+            experience.distance_from_property = round(float(distances[i]), 2)
+            experiences.append(experience)
+
+        logger.debug(f"Nearby experiences: {len(distances)} candidates, {len(experiences)} returned")
+        return experiences
+
+    @staticmethod
+    def _within(candidates, lat, lon, radius_km):
+        """(ids, distances, positions within radius_km) for the bounding-box survivors"""
+        candidates = candidates.filter(bounding_box(lat, lon, radius_km))
+        rows = list(candidates.order_by().values_list('id', 'latitude', 'longitude'))
+        if not rows:
+            return (), np.empty(0), np.empty(0, dtype=np.intp)
+        ids, lats, lons = zip(*rows)
+        distances = haversine_km(lat, lon, np.array(lats, dtype=float), np.array(lons, dtype=float))
+        return ids, distances, np.flatnonzero(distances <= radius_km)
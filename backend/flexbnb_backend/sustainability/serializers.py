@@ -80,6 +80,7 @@ class CarbonFootprintCalculateSerializer(serializers.Serializer):
     distance_km = serializers.FloatField(min_value=0)
     stay_duration_days = serializers.IntegerField(min_value=1)
     number_of_guests = serializers.IntegerField(min_value=1, default=1)
+    save_to_history = serializers.BooleanField(default=False, help_text="Store the calculation in the user's history")
 
 
 class EcoIncentiveSerializer(serializers.ModelSerializer):
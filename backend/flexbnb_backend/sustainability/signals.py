@@ -0,0 +1,41 @@
+"""
+Signal handlers that keep Property's denormalized sustainability columns and cached sustainability data fresh
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from property.models import Property
+from .dashboard_service import SustainabilityDashboardService
+from .incentive_service import IncentiveEligibilityService
+from .models import EcoIncentive, EcoIncentiveUsage, EnergyUsage, GreenCertification
+
+
+@receiver(post_save, sender=GreenCertification)
+def sync_property_sustainability(sender, instance, **kwargs):
+    instance.sync_property()
+    SustainabilityDashboardService.invalidate(instance.host_id)
+
+
+@receiver(post_delete, sender=GreenCertification)
+def clear_property_sustainability(sender, instance, **kwargs):
+    Property.objects.filter(pk=instance.property_obj_id).update(sustainability_score=None, green_level=None)
+    SustainabilityDashboardService.invalidate(instance.host_id)
+
+
+@receiver([post_save, post_delete], sender=EnergyUsage)
+def invalidate_dashboard_for_usage(sender, instance, **kwargs):
+    SustainabilityDashboardService.invalidate_properties([instance.property_obj_id])
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_dashboard_for_property(sender, instance, **kwargs):
+    SustainabilityDashboardService.invalidate(instance.Host_id)
+
+
+@receiver([post_save, post_delete], sender=EcoIncentive)
+def invalidate_incentive_index(sender, instance, **kwargs):
+    IncentiveEligibilityService.invalidate_index()
+
+
+@receiver([post_save, post_delete], sender=EcoIncentiveUsage)
+def invalidate_incentive_usage(sender, instance, **kwargs):
+    IncentiveEligibilityService.invalidate_usage(instance.user_id)
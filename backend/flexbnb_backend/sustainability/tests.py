@@ -0,0 +1,514 @@
+import json
+from datetime import date, timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from property.models import Property
+from useraccount.models import User
+from .models import EnergyUsage, SustainableExperience
+
+
+def create_property(host, **fields):
+    return Property.objects.create(**{
+        'title': 'Test property', 'description': 'Test', 'price_per_night': 100,
+        'bedrooms': 1, 'bathrooms': 1, 'guests': 2, 'country': 'Pakistan', 'country_code': 'PK',
+        'category': 'test', 'image': 'uploads/properties/test.jpg', 'Host': host,
+        **fields,
+    })
+
+
+def api_call(view, user=None, method='get', path='/', data=None, format='json', **kwargs):
+    factory = APIRequestFactory()
+    request = factory.get(path, data) if method == 'get' else getattr(factory, method)(path, data, format=format)
+    if user is not None:
+        force_authenticate(request, user=user)
+    return view(request, **kwargs)
+
+
+class EnergyBulkIngestionTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.prop = create_property(self.host)
+        self.start = date(2026, 1, 1)
+
+    def readings(self, days, electricity=10.0, **fields):
+        return [
+            {'date': str(self.start + timedelta(days=i)), 'electricity_kwh': electricity, 'water_liters': 100, **fields}
+            for i in range(days)
+        ]
+
+    def post(self, data, format='json'):
+        from .views import energy_usage_bulk
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return api_call(energy_usage_bulk, self.host, 'post', '/api/sustainability/energy-usage/bulk/', data, format)
+
+    def csv_upload(self, content):
+        return {'property': str(self.prop.pk), 'file': SimpleUploadedFile('readings.csv', content, 'text/csv')}
+
+    def test_json_array(self):
+        response = self.post(self.readings(3, property=str(self.prop.pk)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['received'], response.data['imported']), (3, 3))
+        self.assertEqual(EnergyUsage.objects.filter(property_obj=self.prop).count(), 3)
+
+    def test_property_with_readings(self):
+        response = self.post({'property': str(self.prop.pk), 'readings': self.readings(2)})
+        self.assertEqual(response.data['imported'], 2)
+
+    def test_csv_upload(self):
+        content = b'date,electricity_kwh,water_liters\n2026-01-01,10,100\n2026-01-02,12,90\n'
+        response = self.post(self.csv_upload(content), format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual(EnergyUsage.objects.get(date=date(2026, 1, 2)).electricity_kwh, 12)
+
+    def test_row_errors_are_reported_and_good_rows_kept(self):
+        rows = self.readings(2) + [{'date': '2026-13-01', 'electricity_kwh': 1, 'water_liters': 1}]
+        rows[1]['electricity_kwh'] = -5
+        response = self.post({'property': str(self.prop.pk), 'readings': rows})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['imported'], response.data['error_count']), (1, 2))
+        self.assertEqual(response.data['errors'], [
+            {'row': 2, 'error': 'electricity_kwh must be at least 0'},
+            {'row': 3, 'error': 'date must be YYYY-MM-DD'},
+        ])
+
+    def test_foreign_property_is_rejected(self):
+        other = create_property(User.objects.create_user(name='Other', email='other@example.com', password='x'))
+        response = self.post({'property': str(other.pk), 'readings': self.readings(2)})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['imported'], 0)
+        self.assertEqual(response.data['errors'][0]['error'], 'Property not found or access denied')
+        self.assertFalse(EnergyUsage.objects.exists())
+
+    def test_reupload_updates_existing_days(self):
+        self.post({'property': str(self.prop.pk), 'readings': self.readings(3)})
+        response = self.post({'property': str(self.prop.pk), 'readings': self.readings(3, electricity=25.0)})
+        self.assertEqual(response.data['imported'], 3)
+        self.assertEqual(
+            list(EnergyUsage.objects.filter(property_obj=self.prop).values_list('electricity_kwh', flat=True)),
+            [25.0] * 3
+        )
+
+    def test_undecodable_csv_reports_rows_already_imported(self):
+        content = b'date,electricity_kwh,water_liters\n2026-01-01,10,100\n2026-01-02,12,90\n2026-01-03,\xff\xfe,90\n'
+        response = self.post(self.csv_upload(content), format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertIn('Could not read CSV after row 2', response.data['error'])
+        self.assertEqual(EnergyUsage.objects.count(), 2)
+
+
+class NearbyExperienceTests(TestCase):
+    def experience(self, name, lat, lon):
+        return SustainableExperience.objects.create(
+            name=name, description='Test', category='outdoor', city='Test', country='Test', latitude=lat, longitude=lon
+        )
+
+    def nearest(self, lat, lon, **kwargs):
+        from .nearby_service import NearbyExperienceService
+
+        return NearbyExperienceService.nearest(SustainableExperience.objects.all(), lat, lon, **kwargs)
+
+    def test_ranks_nearest_first_with_distances(self):
+        self.experience('far', 33.7, 73.2)
+        self.experience('near', 33.69, 73.05)
+        self.experience('middle', 33.6, 73.0)
+        self.experience('no coordinates', None, None)
+
+        results = self.nearest(33.68, 73.04, limit=2)
+        self.assertEqual([e.name for e in results], ['near', 'middle'])
+        self.assertLess(results[0].distance_from_property, results[1].distance_from_property)
+        self.assertEqual([e.name for e in self.nearest(33.68, 73.04, radius_km=5)], ['near'])
+
+    def test_search_crosses_the_antimeridian(self):
+        self.experience('east of the line', -17.0, 179.9)
+        self.experience('west of the line', -17.0, -179.9)
+        self.experience('far away', -17.0, 170.0)
+
+        results = self.nearest(-17.0, 179.95, radius_km=50)
+        self.assertEqual({e.name for e in results}, {'east of the line', 'west of the line'})
+        self.assertLess(max(e.distance_from_property for e in results), 20)
+        self.assertEqual(
+            [e.name for e in self.nearest(-17.0, -179.95, limit=2)], ['west of the line', 'east of the line']
+        )
+
+    def test_without_radius_search_stops_at_the_largest_circle(self):
+        self.experience('near', 0.0, 0.1)
+        self.experience('other side of the world', 0.0, 179.0)
+
+        results = self.nearest(0.0, 0.0, limit=5)
+        self.assertEqual([e.name for e in results], ['near'])
+
+
+class EnergyStatsTests(TestCase):
+    def setUp(self):
+        self.prop = create_property(User.objects.create_user(name='Host', email='host@example.com', password='x'))
+        self.start = date(2026, 1, 1)
+        EnergyUsage.objects.bulk_create([
+            EnergyUsage(
+                property_obj=self.prop, date=self.start + timedelta(days=i), electricity_kwh=10 * (i + 1),
+                water_liters=100, number_of_guests=2 if i % 2 else 0, is_anomaly=i == 9,
+            )
+            for i in range(10)
+        ])
+
+    def test_summary(self):
+        from .energy_stats_service import EnergyStatsService
+
+        stats = EnergyStatsService.summary(EnergyUsage.objects.filter(property_obj=self.prop))
+        self.assertEqual(stats['records_count'], 10)
+        self.assertEqual(stats['total_electricity_kwh'], 550)
+        self.assertEqual(stats['avg_electricity_per_day'], 55)
+        self.assertEqual(stats['total_water_liters'], 1000)
+        self.assertEqual(stats['stddev_water_per_day'], 0)
+        # Ten readings, five of them with two guests
+        self.assertEqual(stats['avg_electricity_per_guest'], 55)
+        self.assertEqual(stats['anomaly_count'], 1)
+        self.assertEqual(EnergyStatsService.summary(EnergyUsage.objects.none()), {})
+
+    def test_rolling_averages(self):
+        from .energy_stats_service import EnergyStatsService
+
+        rows = EnergyStatsService.rolling_averages(self.prop.pk, self.start + timedelta(days=2))
+        self.assertEqual([row['date'] for row in rows], [self.start + timedelta(days=i) for i in range(2, 10)])
+        # The window only covers readings since start_date: days 3..9 for the last row
+        self.assertEqual(rows[0]['electricity_kwh'], 30)
+        self.assertEqual(rows[-1]['electricity_kwh'], 70)
+
+
+class EnergyAnomalyDetectorTests(TestCase):
+    def setUp(self):
+        self.prop = create_property(User.objects.create_user(name='Host', email='host@example.com', password='x'))
+        self.start = date(2026, 1, 1)
+
+    def reading(self, day, electricity, water=100.0):
+        return EnergyUsage(
+            property_obj=self.prop, date=self.start + timedelta(days=day), electricity_kwh=electricity,
+            water_liters=water, occupancy_rate=50 + day % 3 * 10, number_of_guests=2,
+            outdoor_temperature=10 + day % 5,
+        )
+
+    def ingest(self, readings):
+        from .anomaly_detector import EnergyAnomalyDetector
+
+        EnergyAnomalyDetector.score(readings)
+        EnergyUsage.objects.bulk_create(readings)
+
+    def baseline(self):
+        from .models import EnergyBaseline
+
+        baseline = EnergyBaseline.objects.get(property_obj=self.prop)
+        return (
+            baseline.readings_count, baseline.last_date, baseline.electricity_mean, baseline.electricity_var,
+            baseline.water_mean, baseline.water_var,
+        )
+
+    def test_live_scoring_matches_rescore(self):
+        from .anomaly_detector import EnergyAnomalyDetector
+
+        electricity = [20 + (day * 7) % 5 for day in range(45)]
+        electricity[25] = 90
+        readings = [self.reading(day, value, water=300 if day == 40 else 100) for day, value in enumerate(electricity)]
+        # Arrive in uneven batches, as the bulk endpoint and single posts would send them
+        for start, end in ((0, 1), (1, 10), (10, 26), (26, 27), (27, 45)):
+            self.ingest(readings[start:end])
+
+        live = dict(EnergyUsage.objects.values_list('date', 'ai_recommendation'))
+        flagged = set(EnergyUsage.objects.filter(is_anomaly=True).values_list('date', flat=True))
+        self.assertEqual(flagged, {self.start + timedelta(days=25), self.start + timedelta(days=40)})
+        live_baseline = self.baseline()
+
+        rows, changed = EnergyAnomalyDetector.rescore([self.prop.pk])
+        self.assertEqual((rows, changed), (45, 0))
+        self.assertEqual(dict(EnergyUsage.objects.values_list('date', 'ai_recommendation')), live)
+        replayed = self.baseline()
+        self.assertEqual(replayed[:2], live_baseline[:2])
+        for live_value, replayed_value in zip(live_baseline[2:], replayed[2:]):
+            self.assertAlmostEqual(live_value, replayed_value, places=6)
+
+    def test_late_readings_do_not_move_the_baseline(self):
+        self.ingest([self.reading(day, 20.0) for day in range(1, 15)])
+        before = self.baseline()
+
+        late = self.reading(0, 95.0)
+        self.ingest([late])
+        self.assertEqual(self.baseline(), before)
+        self.assertTrue(late.is_anomaly)
+
+
+class CarbonFootprintTests(TestCase):
+    def setUp(self):
+        from .models import GreenCertification
+
+        self.user = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.green = create_property(host)
+        self.plain = create_property(host)
+        GreenCertification.objects.create(property_obj=self.green, host=host, status='approved', energy_saving=True)
+        self.trip = {'transport_type': 'train', 'distance_km': 100, 'stay_duration_days': 2, 'number_of_guests': 2}
+
+    def calculate(self, user=None, **fields):
+        from .views import calculate_carbon_footprint
+
+        return api_call(calculate_carbon_footprint, user, 'post', '/api/sustainability/carbon-footprint/calculate/', {
+            **self.trip, **fields
+        })
+
+    def batch(self, data):
+        from .views import calculate_carbon_footprint_batch
+
+        return api_call(calculate_carbon_footprint_batch, None, 'post', '/api/sustainability/carbon-footprint/batch/', data)
+
+    def test_batch_matches_single_calculations(self):
+        from .models import CarbonFootprint
+
+        response = self.batch({'defaults': self.trip, 'trips': [
+            {'property_id': str(self.green.pk)},
+            {'property_id': str(self.plain.pk)},
+            {'transport_type': 'car', 'distance_km': 50},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        green, plain, car = response.data['results']
+        self.assertEqual((green['accommodation_carbon'], plain['accommodation_carbon']), (56.0, 80.0))
+        self.assertTrue(green['is_green_property'])
+        self.assertEqual(car['transport_carbon'], 17.1)
+        self.assertEqual(car['property_id'], None)
+
+        single = self.calculate(property_id=str(self.green.pk)).data
+        for field in ('transport_carbon', 'accommodation_carbon', 'total_carbon', 'equivalent_trees'):
+            self.assertEqual(single[field], green[field])
+        self.assertFalse(CarbonFootprint.objects.exists())
+
+    def test_batch_rejects_bad_input(self):
+        self.assertEqual(self.batch({'trips': []}).status_code, 400)
+        self.assertEqual(self.batch({'trips': [{**self.trip}] * 201}).status_code, 400)
+        response = self.batch({'trips': [self.trip, {**self.trip, 'distance_km': -1}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('distance_km', response.data['errors'][1])
+
+    def test_saved_only_when_asked_by_a_signed_in_user(self):
+        from .models import CarbonFootprint
+
+        self.assertFalse(self.calculate(self.user).data['is_saved'])
+        self.assertFalse(self.calculate(save_to_history=True).data['is_saved'])
+        self.assertFalse(CarbonFootprint.objects.exists())
+
+        response = self.calculate(self.user, save_to_history=True, property_id=str(self.green.pk))
+        self.assertTrue(response.data['is_saved'])
+        saved = CarbonFootprint.objects.get()
+        self.assertEqual((saved.user, saved.property_obj), (self.user, self.green))
+        self.assertEqual(saved.total_carbon, response.data['total_carbon'])
+
+
+class PropertySustainabilityColumnsTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+
+    def certify(self, prop, **fields):
+        from .models import GreenCertification
+
+        return GreenCertification.objects.create(property_obj=prop, host=self.host, **fields)
+
+    def columns(self, prop):
+        prop.refresh_from_db()
+        return prop.sustainability_score, prop.green_level
+
+    def test_columns_follow_the_certification(self):
+        prop = create_property(self.host)
+        certification = self.certify(prop, status='pending', level='silver', energy_saving=True, recycling_program=True)
+        self.assertEqual(self.columns(prop), (None, None))
+
+        certification.status = 'approved'
+        certification.save()
+        self.assertEqual(self.columns(prop), (25.0, 'silver'))
+
+        certification.renewable_energy = True
+        certification.level = 'gold'
+        certification.save()
+        self.assertEqual(self.columns(prop), (37.5, 'gold'))
+
+        certification.status = 'expired'
+        certification.save()
+        self.assertEqual(self.columns(prop), (None, None))
+
+    def test_deleting_the_certification_clears_the_columns(self):
+        prop = create_property(self.host)
+        certification = self.certify(prop, status='approved', level='bronze', energy_saving=True)
+        self.assertEqual(self.columns(prop), (12.5, 'bronze'))
+        certification.delete()
+        self.assertEqual(self.columns(prop), (None, None))
+
+    def test_sustainability_sort_lists_certified_properties_best_first(self):
+        from property.api import search_properties
+
+        bronze, gold, _ = (create_property(self.host, title=title) for title in ('bronze', 'gold', 'uncertified'))
+        self.certify(bronze, status='approved', level='bronze', energy_saving=True)
+        self.certify(gold, status='approved', level='gold', energy_saving=True, renewable_energy=True, local_sourcing=True)
+
+        response = api_call(search_properties, None, 'get', '/api/properties/search/', {'sort': 'sustainability'})
+        self.assertEqual([p['title'] for p in json.loads(response.content)['results']], ['gold', 'bronze'])
+
+
+class IncentiveEligibilityTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+        from .models import GreenCertification
+
+        cache.clear()
+        self.now = timezone.now()
+        host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        self.guest = User.objects.create_user(name='Guest', email='guest@example.com', password='x')
+        self.green = create_property(host, title='green')
+        self.plain = create_property(host, title='plain')
+        with self.captureOnCommitCallbacks(execute=True):
+            GreenCertification.objects.create(property_obj=self.green, host=host, status='approved', energy_saving=True)
+            self.any_stay = self.incentive('any stay', requires_green_property=False, max_uses_per_user=2)
+            self.green_only = self.incentive('green only')
+            self.long_stay = self.incentive('long stay', requires_green_property=False, min_stay_nights=5)
+            self.incentive('inactive', requires_green_property=False, is_active=False)
+            self.incentive('next year', requires_green_property=False, valid_from=self.now + timedelta(days=365))
+        self.green.refresh_from_db()
+
+    def incentive(self, name, **fields):
+        from .models import EcoIncentive
+
+        return EcoIncentive.objects.create(**{
+            'name': name, 'description': 'Test', 'type': 'discount', 'value': 10,
+            'valid_from': self.now - timedelta(days=30), 'valid_until': self.now + timedelta(days=30), **fields,
+        })
+
+    def eligible(self, nights=2, user=None):
+        from .incentive_service import IncentiveEligibilityService
+
+        check_in = self.now.date() + timedelta(days=7)
+        result = IncentiveEligibilityService.evaluate([self.green, self.plain], check_in, nights, user=user)
+        return {
+            pk: {i['name']: i.get('remaining_uses') for i in incentives} for pk, incentives in result.items()
+        }
+
+    def use(self, incentive):
+        from .models import EcoIncentiveUsage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return EcoIncentiveUsage.objects.create(user=self.guest, incentive=incentive, amount_saved=10)
+
+    def test_rules(self):
+        eligible = self.eligible()
+        self.assertEqual(set(eligible[self.green.pk]), {'any stay', 'green only'})
+        self.assertEqual(set(eligible[self.plain.pk]), {'any stay'})
+        self.assertEqual(set(self.eligible(nights=5)[self.plain.pk]), {'any stay', 'long stay'})
+
+    def test_reasons(self):
+        from .incentive_service import IncentiveEligibilityService as service
+
+        incentive = {'min_stay_nights': 3, 'requires_green_property': True, 'max_uses_per_user': 1}
+        self.assertEqual(service.reason_ineligible(incentive, 2, True), service.STAY_TOO_SHORT)
+        self.assertEqual(service.reason_ineligible(incentive, 3, False), service.REQUIRES_GREEN_PROPERTY)
+        self.assertEqual(service.reason_ineligible(incentive, 3, True, used=1), service.USES_EXHAUSTED)
+        self.assertIsNone(service.reason_ineligible(incentive, 3, True))
+
+    def test_remaining_uses_count_down_and_exhaust(self):
+        self.assertEqual(self.eligible(user=self.guest)[self.green.pk], {'any stay': 2, 'green only': 1})
+        self.use(self.any_stay)
+        usage = self.use(self.green_only)
+        self.assertEqual(self.eligible(user=self.guest)[self.green.pk], {'any stay': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usage.delete()
+        self.assertEqual(self.eligible(user=self.guest)[self.green.pk], {'any stay': 1, 'green only': 1})
+
+    def test_usage_counts_are_cached_until_a_usage_changes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .incentive_service import IncentiveEligibilityService
+
+        self.use(self.any_stay)
+        self.assertEqual(IncentiveEligibilityService.usage_counts(self.guest), {str(self.any_stay.pk): 1})
+        with CaptureQueriesContext(connection) as queries:
+            IncentiveEligibilityService.usage_counts(self.guest)
+        self.assertEqual(len(queries), 0)
+
+        self.use(self.any_stay)
+        self.assertEqual(IncentiveEligibilityService.usage_counts(self.guest), {str(self.any_stay.pk): 2})
+
+    def test_index_is_rebuilt_when_an_incentive_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.long_stay.min_stay_nights = 1
+            self.long_stay.save()
+        self.assertIn('long stay', self.eligible()[self.plain.pk])
+
+
+class SustainabilityDashboardTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.host = User.objects.create_user(name='Host', email='host@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prop = create_property(self.host)
+            create_property(self.host)
+
+    def stats(self):
+        from .dashboard_service import SustainabilityDashboardService
+
+        return SustainabilityDashboardService.stats(self.host)
+
+    def test_stats_are_cached(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.assertEqual(self.stats()['total_properties'], 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.stats()
+        self.assertEqual(len(queries), 0)
+
+    def test_certification_and_property_changes_invalidate(self):
+        from .models import GreenCertification
+
+        self.assertEqual(self.stats()['certified_properties'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            GreenCertification.objects.create(
+                property_obj=self.prop, host=self.host, status='approved', energy_saving=True, recycling_program=True
+            )
+        stats = self.stats()
+        self.assertEqual((stats['certified_properties'], stats['certification_rate']), (1, 50.0))
+        self.assertEqual(stats['avg_sustainability_score'], 25.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_property(self.host)
+        self.assertEqual(self.stats()['total_properties'], 3)
+
+    def test_energy_readings_invalidate(self):
+        from django.utils import timezone
+
+        self.assertEqual(self.stats()['total_usage_records'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            EnergyUsage.objects.create(
+                property_obj=self.prop, date=timezone.now().date(), electricity_kwh=10, water_liters=100, is_anomaly=True
+            )
+        self.assertEqual((self.stats()['total_usage_records'], self.stats()['recent_anomalies']), (1, 1))
+
+        # Bulk ingestion bypasses post_save and invalidates explicitly
+        from .energy_ingestion import EnergyIngestionService
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EnergyIngestionService.ingest([{
+                'property': str(self.prop.pk), 'date': str(timezone.now().date() - timedelta(days=1)),
+                'electricity_kwh': 10, 'water_liters': 100,
+            }], self.host)
+        self.assertEqual(self.stats()['total_usage_records'], 2)
+
+    def test_other_hosts_are_not_invalidated(self):
+        from django.core.cache import cache
+        from .dashboard_service import SustainabilityDashboardService
+
+        self.stats()
+        other = User.objects.create_user(name='Other', email='other@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_property(other)
+        self.assertIsNotNone(cache.get(SustainabilityDashboardService.cache_key(self.host.pk)))
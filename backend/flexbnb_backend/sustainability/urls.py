@@ -9,14 +9,17 @@ urlpatterns = [
     
     # Carbon Footprint
     path('carbon-footprint/calculate/', views.calculate_carbon_footprint, name='calculate-carbon-footprint'),
+    path('carbon-footprint/batch/', views.calculate_carbon_footprint_batch, name='calculate-carbon-footprint-batch'),
     path('carbon-footprint/my-history/', views.my_carbon_history, name='my-carbon-history'),
     
     # Eco Incentives
     path('eco-incentives/', views.eco_incentives_list, name='eco-incentives-list'),
     path('eco-incentives/my-usage/', views.my_eco_incentives, name='my-eco-incentives'),
+    path('eco-incentives/eligibility/', views.eco_incentives_eligibility, name='eco-incentives-eligibility'),
     
     # Energy & Water Monitoring
     path('energy-usage/', views.energy_usage_list, name='energy-usage-list'),
+    path('energy-usage/bulk/', views.energy_usage_bulk, name='energy-usage-bulk'),
     
     # Sustainable Experiences
     path('sustainable-experiences/', views.sustainable_experiences_list, name='sustainable-experiences-list'),
@@ -1,9 +1,14 @@
+import uuid
+
 from rest_framework import status, permissions, viewsets
-from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, parser_classes, action
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.response import Response
 from django.db.models import Q, Avg, Sum, Count
 from django.utils import timezone
-from django.conf import settings
+from django.utils.dateparse import parse_date
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from datetime import timedelta
 from math import radians, cos, sin, asin, sqrt
 
@@ -28,6 +33,13 @@ from .serializers import (
     EnergyUsageStatsSerializer,
     SustainableExperienceSerializer
 )
+from . import carbon
+from .anomaly_detector import EnergyAnomalyDetector
+from .dashboard_service import SustainabilityDashboardService
+from .energy_ingestion import EnergyIngestionService, MAX_CSV_UPLOAD_BYTES, MAX_JSON_READINGS, iter_csv_rows
+from .energy_stats_service import EnergyStatsService
+from .incentive_service import IncentiveEligibilityService
+from .nearby_service import NearbyExperienceService
 
 
 # ==================== GREEN CERTIFICATION ====================
@@ -119,99 +131,92 @@ def green_certification_detail(request, property_id):
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.AllowAny])
 def calculate_carbon_footprint(request):
-    """Calculate carbon footprint for a trip"""
-    import traceback
+    """
+    Calculate carbon footprint for a trip. Stored in the user's history only
+    when `save_to_history` is true and the user is signed in.
+    """
     try:
         serializer = CarbonFootprintCalculateSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         data = serializer.validated_data
+        property_id = data.get('property_id')
+        is_green = bool(property_id) and str(property_id) in carbon.green_property_ids([property_id])
         
-        # Create temporary carbon footprint object to calculate
-        property_obj = None
-        if data.get('property_id'):
-            try:
-                property_obj = Property.objects.get(id=data.get('property_id'))
-            except Property.DoesNotExist:
-                pass  # Property not found, continue without it
-        
-        # Create CarbonFootprint instance (don't save yet)
-        carbon_calc = CarbonFootprint(
-            user=request.user if (hasattr(request, 'user') and request.user.is_authenticated) else None,
-            property_obj=property_obj,
-            transport_type=data['transport_type'],
-            distance_km=data['distance_km'],
-            stay_duration_days=data['stay_duration_days'],
-            number_of_guests=data['number_of_guests']
+        response_data = carbon.summary(
+            data['transport_type'], data['distance_km'], data['stay_duration_days'],
+            data['number_of_guests'], is_green
+        )
+        response_data['recommendations'] = carbon.recommendations(
+            data['transport_type'], is_green, response_data['total_carbon']
         )
         
-        # Calculate carbon
-        carbon_calc.calculate_carbon()
-        
-        # Save if user is authenticated
+        # Save only on request, for signed-in users
         is_saved = False
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            try:
-                carbon_calc.save()
-                is_saved = True
-            except Exception as save_error:
-                print(f"[CARBON CALC] Error saving: {save_error}")
-                # Continue without saving
-        
-        # Prepare response with recommendations
-        response_data = {
-            'transport_carbon': round(carbon_calc.transport_carbon, 2),
-            'accommodation_carbon': round(carbon_calc.accommodation_carbon, 2),
-            'total_carbon': round(carbon_calc.total_carbon, 2),
-            'equivalent_trees': round(carbon_calc.total_carbon / 21, 1),  # ~21kg CO2/tree/year
-            'recommendations': get_carbon_recommendations(carbon_calc),
-            'is_saved': is_saved
-        }
+        if data['save_to_history'] and request.user.is_authenticated:
+            carbon_calc = CarbonFootprint(
+                user=request.user,
+                property_obj=Property.objects.filter(id=property_id).first() if property_id else None,
+                transport_type=data['transport_type'],
+                distance_km=data['distance_km'],
+                stay_duration_days=data['stay_duration_days'],
+                number_of_guests=data['number_of_guests']
+            )
+            carbon_calc.calculate_carbon(is_green=is_green)
+            carbon_calc.save()
+            is_saved = True
         
+        response_data['is_saved'] = is_saved
         return Response(response_data, status=status.HTTP_200_OK)
     except Exception as e:
-        error_traceback = traceback.format_exc()
-        print(f"[CARBON CALC] Error: {str(e)}")
-        print(f"[CARBON CALC] Traceback: {error_traceback}")
-        return Response({'error': str(e), 'detail': error_traceback if settings.DEBUG else 'An error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def get_carbon_recommendations(carbon_calc):
-    """Generate recommendations to reduce carbon footprint"""
-    recommendations = []
-    
-    # Transport recommendations
-    if carbon_calc.transport_type in ['car', 'flight_domestic', 'flight_international']:
-        recommendations.append({
-            'category': 'transport',
-            'message': 'Consider using train or bus for shorter distances to reduce your carbon footprint by up to 80%',
-            'impact': 'high'
-        })
-    
-    if carbon_calc.transport_type == 'car':
-        recommendations.append({
-            'category': 'transport',
-            'message': 'Switching to an electric car could reduce your transport emissions by 70%',
-            'impact': 'medium'
-        })
-    
-    # Accommodation recommendations
-    if not (carbon_calc.property_obj and hasattr(carbon_calc.property_obj, 'green_certification')):
-        recommendations.append({
-            'category': 'accommodation',
-            'message': 'Choosing a Green Stay certified property can reduce accommodation emissions by 30%',
-            'impact': 'medium'
-        })
-    
-    # General recommendations
-    recommendations.append({
-        'category': 'offset',
-        'message': f'Consider purchasing carbon offsets for ${round(carbon_calc.total_carbon * 0.02, 2)} to neutralize your trip',
-        'impact': 'high'
-    })
-    
-    return recommendations
+MAX_CARBON_BATCH = 200
+
+
+@api_view(['POST'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.AllowAny])
+def calculate_carbon_footprint_batch(request):
+    """
+    Footprints for many trip options or properties in one call (e.g. search
+    page badges). Body: {"defaults": {...}, "trips": [{...}, ...]}, where each
+    trip takes the calculate fields and falls back to `defaults`. Nothing is saved.
+    """
+    try:
+        defaults = request.data.get('defaults') or {}
+        trips = request.data.get('trips')
+        if not isinstance(defaults, dict) or not isinstance(trips, list) or not trips:
+            return Response({'error': 'trips must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(trips) > MAX_CARBON_BATCH:
+            return Response({'error': f'At most {MAX_CARBON_BATCH} trips per request'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = CarbonFootprintCalculateSerializer(
+            data=[{**defaults, **trip} if isinstance(trip, dict) else trip for trip in trips], many=True
+        )
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # One certification query for the whole batch
+        green = carbon.green_property_ids([trip.get('property_id') for trip in serializer.validated_data])
+        results = []
+        for trip in serializer.validated_data:
+            property_id = trip.get('property_id')
+            result = carbon.summary(
+                trip['transport_type'], trip['distance_km'], trip['stay_duration_days'],
+                trip['number_of_guests'], bool(property_id) and str(property_id) in green
+            )
+            result.update({
+                'property_id': str(property_id) if property_id else None,
+                'transport_type': trip['transport_type'],
+            })
+            results.append(result)
+        
+        return Response({'results': results})
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
@@ -246,7 +251,7 @@ def my_carbon_history(request):
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.AllowAny])
 def eco_incentives_list(request):
-    """List all active eco incentives"""
+    """List all active eco incentives, with remaining uses for a signed-in user"""
     try:
         now = timezone.now()
         incentives = EcoIncentive.objects.filter(
@@ -256,7 +261,61 @@ def eco_incentives_list(request):
         )
         
         serializer = EcoIncentiveSerializer(incentives, many=True)
-        return Response(serializer.data)
+        data = serializer.data
+        if request.user.is_authenticated:
+            used = IncentiveEligibilityService.usage_counts(request.user)
+            for incentive in data:
+                incentive['remaining_uses'] = max(incentive['max_uses_per_user'] - used.get(str(incentive['id']), 0), 0)
+        return Response(data)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+MAX_ELIGIBILITY_PROPERTIES = 100
+
+
+@api_view(['GET'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.AllowAny])
+def eco_incentives_eligibility(request):
+    """
+    Incentives that apply to a stay at each of up to 100 properties (a search
+    page), evaluated in one batch:
+    ?property_ids=a,b,c&check_in=YYYY-MM-DD&check_out=YYYY-MM-DD.
+    Usage limits are applied when the user is signed in.
+    """
+    try:
+        property_ids = [pk for pk in request.query_params.get('property_ids', '').split(',') if pk]
+        try:
+            check_in = parse_date(request.query_params.get('check_in', ''))
+            check_out = parse_date(request.query_params.get('check_out', ''))
+            for pk in property_ids:
+                uuid.UUID(pk)
+        except ValueError:
+            check_in = None
+        if not property_ids or not check_in or not check_out or check_out <= check_in:
+            return Response({'error': 'property_ids and a valid check_in/check_out range are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(property_ids) > MAX_ELIGIBILITY_PROPERTIES:
+            return Response({'error': f'At most {MAX_ELIGIBILITY_PROPERTIES} properties per request'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        user = request.user if request.user.is_authenticated else None
+        eligible = IncentiveEligibilityService.evaluate_ids(property_ids, check_in, (check_out - check_in).days, user=user)
+        return Response({
+            'results': {
+                str(property_id): [
+                    {
+                        'id': incentive['id'],
+                        'name': incentive['name'],
+                        'type': incentive['type'],
+                        'value': incentive['value'],
+                        'percentage': incentive['percentage'],
+                        'remaining_uses': incentive['remaining_uses'],
+                    }
+                    for incentive in incentives
+                ]
+                for property_id, incentives in eligible.items()
+            }
+        })
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -298,8 +357,8 @@ def energy_usage_list(request):
             
             # Verify property ownership
             try:
-                property_obj = Property.objects.get(id=property_id, host=request.user)
-            except Property.DoesNotExist:
+                property_obj = Property.objects.get(id=property_id, Host=request.user)
+            except (Property.DoesNotExist, ValidationError):
                 return Response({'error': 'Property not found or access denied'}, status=status.HTTP_403_FORBIDDEN)
             
             # Get date range
@@ -307,35 +366,37 @@ def energy_usage_list(request):
             start_date = timezone.now().date() - timedelta(days=days)
             
             usage_records = EnergyUsage.objects.filter(
-                property=property_obj,
+                property_obj=property_obj,
                 date__gte=start_date
-            ).order_by('-date')
+            ).select_related('property_obj').order_by('-date')
             
             serializer = EnergyUsageSerializer(usage_records, many=True)
             
-            # Calculate statistics
-            stats = calculate_energy_stats(usage_records)
-            
             return Response({
                 'usage_records': serializer.data,
-                'statistics': stats
+                'statistics': EnergyStatsService.summary(usage_records),
+                'rolling_averages': EnergyStatsService.rolling_averages(property_obj.id, start_date)
             })
         
         elif request.method == 'POST':
             # Verify property ownership
             property_id = request.data.get('property')
             try:
-                property_obj = Property.objects.get(id=property_id, host=request.user)
-            except Property.DoesNotExist:
+                property_obj = Property.objects.get(id=property_id, Host=request.user)
+            except (Property.DoesNotExist, ValidationError):
                 return Response({'error': 'Property not found or access denied'}, status=status.HTTP_403_FORBIDDEN)
             
             serializer = EnergyUsageSerializer(data=request.data)
             if serializer.is_valid():
-                usage = serializer.save()
+                usage = EnergyUsage(property_obj=property_obj, **serializer.validated_data)
                 
-                # Run AI analysis
-                analyze_energy_usage(usage)
-                usage.save()
+                # Score against the property's streaming baseline, then save once
+                try:
+                    with transaction.atomic():
+                        EnergyAnomalyDetector.score([usage])
+                        usage.save()
+                except IntegrityError:
+                    return Response({'error': 'A reading for this property and date already exists'}, status=status.HTTP_400_BAD_REQUEST)
                 
                 response_serializer = EnergyUsageSerializer(usage)
                 return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -344,82 +405,39 @@ def energy_usage_list(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def calculate_energy_stats(usage_records):
-    """Calculate energy usage statistics"""
-    if not usage_records:
-        return {}
-    
-    total_electricity = sum(u.electricity_kwh for u in usage_records)
-    total_water = sum(u.water_liters for u in usage_records)
-    total_guests = sum(u.number_of_guests for u in usage_records if u.number_of_guests > 0)
-    
-    guest_count = len([u for u in usage_records if u.number_of_guests > 0])
-    
-    return {
-        'total_electricity_kwh': round(total_electricity, 2),
-        'total_water_liters': round(total_water, 2),
-        'avg_electricity_per_day': round(total_electricity / len(usage_records), 2),
-        'avg_water_per_day': round(total_water / len(usage_records), 2),
-        'avg_electricity_per_guest': round(total_electricity / total_guests, 2) if total_guests > 0 else 0,
-        'avg_water_per_guest': round(total_water / total_guests, 2) if total_guests > 0 else 0,
-        'anomaly_count': len([u for u in usage_records if u.is_anomaly]),
-        'records_count': len(usage_records)
-    }
-
-
-def analyze_energy_usage(usage):
+@api_view(['POST'])
+@authentication_classes([ClerkAuthentication])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+def energy_usage_bulk(request):
     """
-    AI-based analysis of energy usage
-    This is a simplified version - in production, you'd use actual ML models
+    Bulk-ingest smart-meter readings for the host's properties. Accepts a JSON
+    array of readings, {"property": id, "readings": [...]}, or a CSV upload
+    in `file` (with an optional `property` field for single-property files).
+    Readings are upserted by (property, date) and scored once per batch.
     """
-    # Get historical average for this property
-    historical = EnergyUsage.objects.filter(
-        property_obj=usage.property_obj,
-        date__lt=usage.date
-    ).order_by('-date')[:30]
-    
-    if historical.count() < 7:
-        # Not enough historical data
-        return
-    
-    # Calculate averages
-    avg_electricity = sum(h.electricity_kwh for h in historical) / historical.count()
-    avg_water = sum(h.water_liters for h in historical) / historical.count()
-    
-    # Detect anomalies (usage > 50% above average)
-    recommendations = []
-    
-    if usage.electricity_kwh > avg_electricity * 1.5:
-        usage.is_anomaly = True
-        recommendations.append("⚡ High electricity usage detected!")
-        recommendations.append("• Check for appliances left on")
-        recommendations.append("• Consider upgrading to LED lights")
-        recommendations.append("• Set thermostat to energy-saving mode")
-    
-    if usage.water_liters > avg_water * 1.5:
-        usage.is_anomaly = True
-        recommendations.append("💧 High water usage detected!")
-        recommendations.append("• Check for leaks in pipes and faucets")
-        recommendations.append("• Install low-flow showerheads")
-        recommendations.append("• Educate guests about water conservation")
-    
-    # General recommendations based on usage per guest
-    if usage.number_of_guests > 0:
-        elec_per_guest = usage.electricity_kwh / usage.number_of_guests
-        water_per_guest = usage.water_liters / usage.number_of_guests
+    try:
+        property_id = request.data.get('property') if hasattr(request.data, 'get') else None
+        uploaded = request.FILES.get('file')
         
-        if elec_per_guest > 20:  # High electricity per guest
-            recommendations.append("💡 Consider installing smart thermostats and motion sensors")
+        if uploaded is not None:
+            if uploaded.size > MAX_CSV_UPLOAD_BYTES:
+                return Response({'error': f'CSV uploads are limited to {MAX_CSV_UPLOAD_BYTES // (1024 * 1024)} MB'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = iter_csv_rows(uploaded)
+        else:
+            rows = request.data if isinstance(request.data, list) else request.data.get('readings')
+            if not isinstance(rows, list) or not rows:
+                return Response({'error': 'Send a JSON array of readings, a readings list or a CSV file'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(rows) > MAX_JSON_READINGS:
+                return Response({'error': f'At most {MAX_JSON_READINGS} readings per request'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if water_per_guest > 200:  # High water per guest
-            recommendations.append("🚿 Consider water-efficient appliances and fixtures")
-    
-    # Positive feedback
-    if not usage.is_anomaly and historical.count() >= 30:
-        recommendations.append("✅ Great job! Your usage is within normal ranges")
-        recommendations.append("🌱 Keep up the sustainable practices")
-    
-    usage.ai_recommendation = "\n".join(recommendations)
+        result = EnergyIngestionService.ingest(rows, request.user, property_id=property_id)
+        
+        if 'error' in result or (not result['imported'] and result['error_count']):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 # ==================== SUSTAINABLE EXPERIENCES ====================
@@ -428,7 +446,12 @@ def analyze_energy_usage(usage):
 @authentication_classes([ClerkAuthentication])
 @permission_classes([permissions.AllowAny])
 def sustainable_experiences_list(request):
-    """List sustainable experiences, optionally filtered by location"""
+    """
+    List sustainable experiences, optionally filtered by location.
+    With latitude/longitude plus radius_km and/or limit, returns the nearest
+    experiences first (at most `limit`, within `radius_km`, or within
+    1600 km when no radius is given).
+    """
     try:
         experiences = SustainableExperience.objects.filter(is_active=True)
         
@@ -453,7 +476,29 @@ def sustainable_experiences_list(request):
         property_lat = request.query_params.get('latitude')
         property_lon = request.query_params.get('longitude')
         
-        if property_lat and property_lon:
+        radius_km = request.query_params.get('radius_km')
+        limit = request.query_params.get('limit')
+        
+        if property_lat and property_lon and (radius_km or limit):
+            # Nearest-first search: bounding box in SQL, vectorized distances, top-K
+            try:
+                property_lat = float(property_lat)
+                property_lon = float(property_lon)
+                radius_km = float(radius_km) if radius_km else None
+                limit = int(limit) if limit else NearbyExperienceService.DEFAULT_LIMIT
+            except ValueError:
+                return Response({'error': 'latitude, longitude, radius_km and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+            if not (-90 <= property_lat <= 90 and -180 <= property_lon <= 180):
+                return Response({'error': 'latitude or longitude out of range'}, status=status.HTTP_400_BAD_REQUEST)
+            if radius_km is not None and not 0 < radius_km <= NearbyExperienceService.MAX_RADIUS_KM:
+                return Response({'error': f'radius_km must be between 0 and {NearbyExperienceService.MAX_RADIUS_KM}'}, status=status.HTTP_400_BAD_REQUEST)
+            limit = max(1, min(limit, NearbyExperienceService.MAX_LIMIT))
+            
+            experiences_list = NearbyExperienceService.nearest(
+                experiences, property_lat, property_lon, radius_km=radius_km, limit=limit
+            )
+            serializer = SustainableExperienceSerializer(experiences_list, many=True)
+        elif property_lat and property_lon:
             try:
                 property_lat = float(property_lat)
                 property_lon = float(property_lon)
@@ -511,37 +556,7 @@ def haversine_distance(lat1, lon1, lat2, lon2):
 def sustainability_dashboard_stats(request):
     """Get overall sustainability statistics for host"""
     try:
-        user = request.user
-        
-        # Count green certified properties
-        certified_properties = GreenCertification.objects.filter(
-            host=user,
-            status='approved'
-        ).count()
-        
-        # Get total properties
-        total_properties = Property.objects.filter(host=user).count()
-        
-        # Calculate average sustainability score
-        certifications = GreenCertification.objects.filter(host=user, status='approved')
-        avg_score = sum(c.sustainability_score for c in certifications) / len(certifications) if certifications else 0
-        
-        # Get recent energy usage trend
-        recent_usage = EnergyUsage.objects.filter(
-            property__host=user,
-            date__gte=timezone.now().date() - timedelta(days=7)
-        )
-        
-        anomaly_count = recent_usage.filter(is_anomaly=True).count()
-        
-        return Response({
-            'certified_properties': certified_properties,
-            'total_properties': total_properties,
-            'certification_rate': round((certified_properties / total_properties * 100), 1) if total_properties > 0 else 0,
-            'avg_sustainability_score': round(avg_score, 1),
-            'recent_anomalies': anomaly_count,
-            'total_usage_records': recent_usage.count()
-        })
+        return Response(SustainabilityDashboardService.stats(request.user))
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 